@@ -1,2 +0,0 @@
-﻿# -*- coding: utf-8-unix -*-
-__author__ = 'pef'
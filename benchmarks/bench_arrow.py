@@ -0,0 +1,44 @@
+# -*- coding: utf-8-unix -*-
+"""
+Arrow export throughput : AbsArrowBuilder vs. decoding plain values and converting them with
+pyarrow (RecordBatch.from_pylist), which has to infer the types of the values.
+
+Usage : python benchmarks/bench_arrow.py [NB_RECORDS] [NB_ELEMENTS]
+"""
+import os
+import sys
+import time
+
+import pyarrow
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs.AbsArrow import AbsArrowBuilder
+from pyabs.AdvancedBinaryStructure import *
+from bench_values import SPEC, make_payload
+
+
+def main():
+    l_nb_records = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    l_nb_elements = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    l_records = [make_payload(l_nb_elements)] * l_nb_records
+
+    def values_from_pylist():
+        return pyarrow.RecordBatch.from_pylist([AbsFactory.decode_values(SPEC, l_record)
+                                                for l_record in l_records])
+
+    def arrow_builder():
+        l_builder = AbsArrowBuilder(SPEC)
+        l_builder.add_all(l_records)
+        return l_builder.finish()
+
+    for l_function in [values_from_pylist, arrow_builder]:
+        l_start = time.time()
+        l_batch = l_function()
+        l_elapsed = time.time() - l_start
+        assert l_batch.num_rows == l_nb_records
+        print('%-20s %8.0f records/s' % (l_function.__name__, l_nb_records / l_elapsed))
+
+
+if __name__ == '__main__':
+    main()
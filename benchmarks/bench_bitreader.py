@@ -0,0 +1,53 @@
+# -*- coding: utf-8-unix -*-
+"""
+Reading consecutive bitfields through a BitReader vs. extracting each of them at its bitwise address.
+
+Usage : python benchmarks/bench_bitreader.py [NB_FIELDS]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs import HexUtils
+
+# Bitfield widths, as found in a typical packed record
+WIDTHS = [4, 1, 11, 3, 5, 8, 13, 19]
+
+
+def per_field(data, widths):
+    l_values = []
+    l_offset = 0
+    for l_width in widths:
+        l_values.append(HexUtils.extract_uint(data, l_offset, l_width))
+        l_offset += l_width
+    return l_values
+
+
+def with_reader(data, widths):
+    l_reader = HexUtils.BitReader(data)
+    return [l_reader.read_uint(l_width) for l_width in widths]
+
+
+def best_time(function):
+    l_timer = timeit.Timer(function)
+    (l_nb_runs, _) = l_timer.autorange() if hasattr(l_timer, 'autorange') else (5, None)
+    return min(l_timer.repeat(3, l_nb_runs)) / l_nb_runs
+
+
+def main():
+    l_nb_fields = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    l_widths = (WIDTHS * (l_nb_fields // len(WIDTHS) + 1))[:l_nb_fields]
+    l_nb_bytes = (sum(l_widths) + 7) // 8
+    l_data = HexUtils.byte_view(bytearray([(i * 37) & 0xFF for i in range(l_nb_bytes)]))
+    assert per_field(l_data, l_widths) == with_reader(l_data, l_widths)
+
+    l_per_field = best_time(lambda: per_field(l_data, l_widths))
+    l_reader = best_time(lambda: with_reader(l_data, l_widths))
+    print('%d fields : %8.3f ms per field, %8.3f ms with a BitReader (x%.1f)'
+          % (l_nb_fields, l_per_field * 1000, l_reader * 1000, l_per_field / l_reader))
+
+
+if __name__ == '__main__':
+    main()
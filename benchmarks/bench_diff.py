@@ -0,0 +1,60 @@
+# -*- coding: utf-8-unix -*-
+"""
+Comparing two snapshots of a large state message : AbsFactory.diff vs. decoding both snapshots
+and comparing their flat values.
+
+Usage : python benchmarks/bench_diff.py [NB_ELEMENTS]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs import HexUtils
+from pyabs.AdvancedBinaryStructure import *
+
+SPEC = [
+    ('seq', 32),
+    ('state', [('mode', 4), ('level', 12)]),
+    [DYN_ARRAY, 'channels', NB_ELTS, 16, [('id', 16), ('valid', 1), ('gain', 7), ('level', 16)]],
+    [DYN_ARRAY, 'comment', SIZE_EXCL, 8, AbsFieldAscii],
+]
+
+
+def make_snapshot(nb_elements, seq, changed_element):
+    l_elements = []
+    for i in range(nb_elements):
+        l_level = 0x1234 if i != changed_element else 0x4321
+        l_elements.append('%04X' % i + '85' + '%04X' % l_level)
+    return HexUtils.hex_str_to_bytes('%08X' % seq + '1FFF' + '%04X' % nb_elements +
+                                     ''.join(l_elements) + '03414243')
+
+
+def decoded_diff(data_a, data_b):
+    l_values_a = AbsFactory.decode_values(SPEC, data_a, flat=True)
+    l_values_b = AbsFactory.decode_values(SPEC, data_b, flat=True)
+    return [(l_path, l_value, l_values_b[l_path]) for (l_path, l_value) in l_values_a.items()
+            if l_values_b[l_path] != l_value]
+
+
+def best_time(function):
+    l_timer = timeit.Timer(function)
+    (l_nb_runs, _) = l_timer.autorange() if hasattr(l_timer, 'autorange') else (5, None)
+    return min(l_timer.repeat(3, l_nb_runs)) / l_nb_runs
+
+
+def main():
+    l_nb_elements = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    l_data_a = make_snapshot(l_nb_elements, 1, -1)
+    l_data_b = make_snapshot(l_nb_elements, 2, l_nb_elements // 2)
+    assert AbsFactory.diff(SPEC, l_data_a, l_data_b) == decoded_diff(l_data_a, l_data_b)
+
+    l_decoded = best_time(lambda: decoded_diff(l_data_a, l_data_b))
+    l_diff = best_time(lambda: AbsFactory.diff(SPEC, l_data_a, l_data_b))
+    print('%d elements, 2 changes : %8.3f ms decoding both, %8.3f ms with diff (x%.1f)'
+          % (l_nb_elements, l_decoded * 1000, l_diff * 1000, l_decoded / l_diff))
+
+
+if __name__ == '__main__':
+    main()
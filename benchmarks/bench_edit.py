@@ -0,0 +1,70 @@
+# -*- coding: utf-8-unix -*-
+"""
+Refreshing a large decoded payload after a small edit : AdvancedBinaryStructure.edit vs. decoding
+the edited payload again.
+
+Usage : python benchmarks/bench_edit.py [NB_ELEMENTS]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs.AdvancedBinaryStructure import *
+
+SPEC = [
+    ('version', 8),
+    [DYN_ARRAY, 'records', NB_ELTS, 32, [
+        ('id', 32), ('flags', 8), ('level', 24), ('name', 64, AbsFieldAscii)]],
+    [DYN_ARRAY, 'notes', NB_ELTS, 16, [[DYN_ARRAY, 'text', SIZE_EXCL, 8, AbsFieldAscii]]],
+    ('crc', 32),
+]
+
+
+def make_payload(nb_elements):
+    l_records = ''.join(['%08X' % i + '01' + '001234' + '4142434445464748'
+                         for i in range(nb_elements)])
+    l_notes = ''.join(['03' + '414243' for _ in range(nb_elements // 10)])
+    return ('01' + '%08X' % nb_elements + l_records + '%04X' % (nb_elements // 10) + l_notes +
+            'CAFEDECA')
+
+
+def best_time(function):
+    l_timer = timeit.Timer(function)
+    (l_nb_runs, _) = l_timer.autorange() if hasattr(l_timer, 'autorange') else (5, None)
+    return min(l_timer.repeat(3, l_nb_runs)) / l_nb_runs
+
+
+def main():
+    l_nb_elements = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    l_hex_str = make_payload(l_nb_elements)
+    l_middle = 5 + (l_nb_elements // 2) * 16 + 5
+    l_notes = 5 + l_nb_elements * 16
+    for (l_name, l_edit) in [
+            ('level of a record', (l_middle, '00FFFF', None)),
+            ('one more note', (l_notes, '%04X' % (l_nb_elements // 10 + 1) + '0158', l_notes + 2)),
+            ('longer note', (l_notes + 2, '0558595A5B5C', l_notes + 6))]:
+        (l_start, l_new, l_end) = l_edit
+        l_end = l_start + len(l_new) // 2 if l_end is None else l_end
+        l_edited = l_hex_str[:l_start * 2] + l_new + l_hex_str[l_end * 2:]
+
+        l_abs = AdvancedBinaryStructure(l_hex_str, SPEC)
+        l_abs.edit(l_start, l_new, l_end)
+        assert l_abs.to_compact() == AdvancedBinaryStructure(l_edited, SPEC).to_compact()
+
+        def edit():
+            # The previous tree is left unchanged by edit : restore it for the next run
+            l_abs.edit(l_start, l_new, l_end)
+            l_abs.update(l_saved)
+
+        l_abs = AdvancedBinaryStructure(l_hex_str, SPEC)
+        l_saved = dict(l_abs)
+        l_decode = best_time(lambda: AdvancedBinaryStructure(l_edited, SPEC))
+        l_edit = best_time(edit)
+        print('%d bytes, %-18s : %9.3f ms decoding again, %8.3f ms with edit (x%.0f)'
+              % (len(l_hex_str) // 2, l_name, l_decode * 1000, l_edit * 1000, l_decode / l_edit))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8-unix -*-
+"""
+Keeping 5% of the messages, selected on their tagged type : decoding every message and testing its
+type vs. filtering while decoding (AbsFactory.decode_values WHERE).
+
+Usage : python benchmarks/bench_filter.py [NB_MESSAGES]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs import HexUtils
+from pyabs.AdvancedBinaryStructure import *
+
+SPEC = [
+    ('msg-type', 8, TAGGED),
+    ('seq', 32),
+    [SWITCH, 'msg-type', {
+        1: ('heartbeat', [('timestamp', 64)]),
+        2: ('samples', [
+            ('flags', 8),
+            [DYN_ARRAY, 'values', NB_ELTS, 16, [('channel', 4), ('valid', 1), ('level', 11)]],
+        ]),
+    }],
+    [DYN_ARRAY, 'comment', SIZE_EXCL, 8, AbsFieldAscii],
+]
+
+WHERE = {'msg-type': lambda value: value == 1}
+
+
+def make_messages(nb_messages):
+    l_messages = []
+    for i in range(nb_messages):
+        if i % 20 == 0:
+            l_messages.append('01' + '%08X' % i + '0102030405060708' + '00')
+        else:
+            l_messages.append('02' + '%08X' % i + '80' + '0020' + 'A7FF' * 32 + '03414243')
+    return [HexUtils.hex_str_to_bytes(l_message) for l_message in l_messages]
+
+
+def decode_then_filter(messages):
+    l_values = [AbsFactory.decode_values(SPEC, l_message) for l_message in messages]
+    return [l_value for l_value in l_values if WHERE['msg-type'](l_value['msg-type'])]
+
+
+def filter_while_decoding(messages):
+    l_values = [AbsFactory.decode_values(SPEC, l_message, where=WHERE) for l_message in messages]
+    return [l_value for l_value in l_values if l_value is not FILTERED]
+
+
+def best_time(function):
+    l_timer = timeit.Timer(function)
+    (l_nb_runs, _) = l_timer.autorange() if hasattr(l_timer, 'autorange') else (5, None)
+    return min(l_timer.repeat(3, l_nb_runs)) / l_nb_runs
+
+
+def main():
+    l_nb_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    l_messages = make_messages(l_nb_messages)
+    assert decode_then_filter(l_messages) == filter_while_decoding(l_messages)
+
+    l_decoded = best_time(lambda: decode_then_filter(l_messages))
+    l_filtered = best_time(lambda: filter_while_decoding(l_messages))
+    print('%d messages : %8.3f ms decoding then filtering, %8.3f ms filtering while decoding '
+          '(x%.1f)' % (l_nb_messages, l_decoded * 1000, l_filtered * 1000, l_decoded / l_filtered))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8-unix -*-
+"""
+Converting an hexadecimal string into words : one int() per word vs. HexUtils.hex_str_to_array.
+
+Usage : python benchmarks/bench_hex.py [NB_BYTES]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs import HexUtils
+
+
+def per_word(hex_str, width):
+    l_nb_digits = width // 4
+    return [int(hex_str[i:i + l_nb_digits], 16) for i in range(0, len(hex_str), l_nb_digits)]
+
+
+def best_time(function):
+    l_timer = timeit.Timer(function)
+    (l_nb_runs, _) = l_timer.autorange() if hasattr(l_timer, 'autorange') else (5, None)
+    return min(l_timer.repeat(3, l_nb_runs)) / l_nb_runs
+
+
+def main():
+    l_nb_bytes = int(sys.argv[1]) if len(sys.argv) > 1 else 1 << 16
+    l_hex_str = ''.join(['%02X' % ((i * 37) & 0xFF) for i in range(l_nb_bytes)])
+    for l_width in [8, 16, 32, 64]:
+        assert per_word(l_hex_str, l_width) == HexUtils.hex_str_to_array(l_hex_str, l_width).tolist()
+        l_per_word = best_time(lambda: per_word(l_hex_str, l_width))
+        l_array = best_time(lambda: HexUtils.hex_str_to_array(l_hex_str, l_width))
+        l_list = best_time(lambda: HexUtils.hex_str_to_array(l_hex_str, l_width).tolist())
+        print('%d bytes, %2d-bits words : %8.3f ms per word, %8.3f ms as an array (x%.1f), '
+              '%8.3f ms as a list (x%.1f)'
+              % (l_nb_bytes, l_width, l_per_word * 1000, l_array * 1000, l_per_word / l_array,
+                 l_list * 1000, l_per_word / l_list))
+
+
+if __name__ == '__main__':
+    main()
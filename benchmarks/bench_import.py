@@ -0,0 +1,73 @@
+# -*- coding: utf-8-unix -*-
+"""
+Time spent importing pyabs in a fresh interpreter, as paid by each short-lived worker process.
+
+Usage : python benchmarks/bench_import.py [-n NB_RUNS] [PYTHON ...]
+
+For each given interpreter (only the current one by default), the median wall-clock time of
+'import pyabs' is printed, minus the one of an interpreter doing nothing. When the interpreter
+supports it (python 3.7+), the cumulative time of each pyabs module is also reported, as measured
+by '-X importtime'.
+"""
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+STATEMENTS = [
+    ('import pyabs', 'import pyabs'),
+    ('first pprint', "import pyabs; pyabs.AdvancedBinaryStructure.AdvancedBinaryStructure("
+                     "'CA', [('a', 8)])"
+                     ".pprint(stream=open(__import__('os').devnull, 'w'))"),
+]
+
+
+def run(interpreter, args):
+    l_env = dict(os.environ)
+    l_env['PYTHONPATH'] = ROOT
+    l_start = time.time()
+    l_process = subprocess.Popen([interpreter] + args, env=l_env, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE)
+    (_, l_stderr) = l_process.communicate()
+    return time.time() - l_start, l_stderr.decode('ascii', 'replace')
+
+
+def median_time(interpreter, statement, nb_runs):
+    l_times = sorted([run(interpreter, ['-c', statement])[0] for _ in range(nb_runs)])
+    return l_times[len(l_times) // 2]
+
+
+def import_times(interpreter):
+    """Cumulative import time of each pyabs module, in microseconds (empty if not supported)."""
+    l_stderr = run(interpreter, ['-X', 'importtime', '-c', STATEMENTS[0][1]])[1]
+    l_times = []
+    for l_line in l_stderr.splitlines():
+        l_columns = l_line.split('|')
+        if l_line.startswith('import time:') and len(l_columns) == 3 and \
+                l_columns[2].strip().startswith('pyabs'):
+            l_times.append((l_columns[2].strip(), int(l_columns[1])))
+    return l_times
+
+
+def main():
+    l_args = sys.argv[1:]
+    l_nb_runs = 20
+    if len(l_args) >= 2 and l_args[0] == '-n':
+        l_nb_runs = int(l_args[1])
+        l_args = l_args[2:]
+    l_interpreters = l_args if len(l_args) > 0 else [sys.executable]
+
+    for l_interpreter in l_interpreters:
+        print(l_interpreter)
+        l_baseline = median_time(l_interpreter, 'pass', l_nb_runs)
+        for (l_name, l_statement) in STATEMENTS:
+            l_time = median_time(l_interpreter, l_statement, l_nb_runs) - l_baseline
+            print('  %-30s %8.1f ms' % (l_name, l_time * 1000))
+        for (l_module, l_time) in import_times(l_interpreter):
+            print('  %-30s %8.1f ms (-X importtime)' % (l_module, l_time / 1000.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8-unix -*-
+"""
+Processing the elements of a huge Dynamic Array : AbsFactory.iter_elements vs. decoding the whole
+array (AbsFactory.decode_values), both into plain values. Peak memory is measured with tracemalloc,
+time without it.
+
+Usage : python3 benchmarks/bench_iter.py [NB_ELEMENTS] (python 3 only : tracemalloc is needed)
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs.AdvancedBinaryStructure import *
+
+SPEC = [
+    ('version', 8),
+    [DYN_ARRAY, 'entries', NB_ELTS, 32, [('time', 32), ('level', 4), ('code', 12)]],
+]
+
+
+def sum_decoded(data):
+    l_entries = AbsFactory.decode_values(SPEC, data)['entries']['data']
+    return sum([l_entry['code'] for l_entry in l_entries])
+
+
+def sum_iterated(data):
+    l_sum = 0
+    for l_chunk in AbsFactory.iter_elements(SPEC, data, 'entries', values=True, chunk_size=1024):
+        l_sum += sum([l_entry['code'] for l_entry in l_chunk])
+    return l_sum
+
+
+def run(function, data):
+    tracemalloc.start()
+    function(data)
+    l_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    l_start = timeit.default_timer()
+    l_result = function(data)
+    return l_result, timeit.default_timer() - l_start, l_peak
+
+
+def main():
+    l_nb_elements = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    l_data = bytes(bytearray([1]) + bytearray.fromhex('%08X' % l_nb_elements) +
+                   bytearray.fromhex('0000CAFE1234') * l_nb_elements)
+    (l_decoded, l_decoded_time, l_decoded_peak) = run(sum_decoded, l_data)
+    (l_iterated, l_iterated_time, l_iterated_peak) = run(sum_iterated, l_data)
+    assert l_decoded == l_iterated
+    print('%d elements (%d bytes) : decode_values %8.0f ms, peak %8.1f MB ; '
+          'iter_elements %8.0f ms, peak %6.2f MB'
+          % (l_nb_elements, len(l_data), l_decoded_time * 1000, l_decoded_peak / 1e6,
+             l_iterated_time * 1000, l_iterated_peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8-unix -*-
+"""
+Framing a stream of messages : measuring each message vs. fully decoding it.
+
+Usage : python benchmarks/bench_measure.py [NB_MESSAGES]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs import HexUtils
+from pyabs.AdvancedBinaryStructure import *
+
+SPEC = [
+    ('msg-type', 8, TAGGED),
+    ('seq', 32),
+    [SWITCH, 'msg-type', {
+        1: ('heartbeat', [('timestamp', 64)]),
+        2: ('samples', [
+            ('flags', 8),
+            [DYN_ARRAY, 'values', NB_ELTS, 16, [('channel', 4), ('valid', 1), ('level', 11)]],
+        ]),
+    }],
+    [DYN_ARRAY, 'comment', SIZE_EXCL, 8, AbsFieldAscii],
+]
+
+
+def make_stream(nb_messages):
+    l_messages = []
+    for i in range(nb_messages):
+        if i % 2 == 0:
+            l_messages.append('01' + '%08X' % i + '0102030405060708' + '00')
+        else:
+            l_messages.append('02' + '%08X' % i + '80' + '0020' + 'A7FF' * 32 + '03414243')
+    return HexUtils.hex_str_to_bytes(''.join(l_messages))
+
+
+def split(data, width_of):
+    """Return the bit offsets of the messages in DATA."""
+    l_offsets = []
+    l_offset = 0
+    while l_offset < len(data) * 8:
+        l_offsets.append(l_offset)
+        l_byte_addr = l_offset // 8
+        l_offset += width_of(data[l_byte_addr:])
+    return l_offsets
+
+
+ROOT_SPEC = ('root', SPEC)
+
+
+def decoded_width(data):
+    return AbsFactory.make(ROOT_SPEC, data).bit_width()
+
+
+def best_time(function):
+    l_timer = timeit.Timer(function)
+    (l_nb_runs, _) = l_timer.autorange() if hasattr(l_timer, 'autorange') else (5, None)
+    return min(l_timer.repeat(3, l_nb_runs)) / l_nb_runs
+
+
+def main():
+    l_nb_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    l_data = HexUtils.byte_view(make_stream(l_nb_messages))
+    assert split(l_data, decoded_width) == \
+        split(l_data, lambda data: AbsFactory.measure(SPEC, data))
+
+    l_tree = best_time(lambda: split(l_data, decoded_width))
+    l_measure = best_time(lambda: split(l_data, lambda data: AbsFactory.measure(SPEC, data)))
+    print('%d messages : %8.3f ms with full decoding, %8.3f ms with measure (x%.1f)'
+          % (l_nb_messages, l_tree * 1000, l_measure * 1000, l_tree / l_measure))
+
+
+if __name__ == '__main__':
+    main()
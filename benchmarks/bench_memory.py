@@ -0,0 +1,66 @@
+# -*- coding: utf-8-unix -*-
+"""
+Memory footprint of a decoded tree : memory_footprint() vs. a tracemalloc measurement.
+
+Usage : python3 benchmarks/bench_memory.py [NB_ELEMENTS] (python 3 only : tracemalloc is needed)
+"""
+import gc
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs.AdvancedBinaryStructure import *
+
+SPEC = [
+    ('seq', 32),
+    ('name', 64, AbsFieldAscii),
+    [DYN_ARRAY, 'samples', NB_ELTS, 16, [('channel', 4), ('valid', 1), ('level', 11)]],
+    [DYN_ARRAY, 'payload', SIZE_EXCL, 8, AbsFieldRawData],
+]
+
+
+def make_data(nb_elements):
+    return '00000001' + '4341464544454341' + '%04X' % nb_elements + 'A7FF' * nb_elements + \
+        '04CAFEDECA'
+
+
+def traced_size(data):
+    """Return the tree decoded from DATA, and the memory allocated while decoding it."""
+    gc.collect()
+    tracemalloc.start()
+    l_before = tracemalloc.take_snapshot()
+    l_abs = AdvancedBinaryStructure(data, SPEC)
+    l_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return l_abs, sum([l_stat.size_diff for l_stat in l_after.compare_to(l_before, 'filename')])
+
+
+def best_time(function):
+    l_timer = timeit.Timer(function)
+    (l_nb_runs, _) = l_timer.autorange() if hasattr(l_timer, 'autorange') else (5, None)
+    return min(l_timer.repeat(3, l_nb_runs)) / l_nb_runs
+
+
+def main():
+    l_nb_elements = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    l_data = make_data(l_nb_elements)
+    (l_abs, l_traced) = traced_size(l_data)
+    l_footprint = l_abs.memory_footprint()
+    # The input string was allocated before decoding
+    l_counted = l_footprint['total'] - sys.getsizeof(l_data)
+    print('%d elements : %d bytes counted, %d bytes traced (%+.1f%%)'
+          % (l_nb_elements, l_counted, l_traced, 100.0 * (l_counted - l_traced) / l_traced))
+    print('  ' + ', '.join(['%s %d' % l_item for l_item in l_footprint.items()]))
+
+    l_decode_time = best_time(lambda: AdvancedBinaryStructure(l_data, SPEC))
+    l_time = best_time(lambda: l_abs.memory_footprint())
+    l_traced_time = best_time(lambda: traced_size(l_data))
+    print('  decoding %8.3f ms, then memory_footprint %8.3f ms ; decoding traced by tracemalloc '
+          '%8.3f ms' % (l_decode_time * 1000, l_time * 1000, l_traced_time * 1000))
+
+
+if __name__ == '__main__':
+    main()
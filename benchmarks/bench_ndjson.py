@@ -0,0 +1,51 @@
+# -*- coding: utf-8-unix -*-
+"""
+NDJSON export throughput, compared with the raw plain values decoding rate and with the former
+approach (building the tree, walking it and dumping it with json).
+
+Usage : python benchmarks/bench_ndjson.py [NB_RECORDS] [NB_ELEMENTS]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs.AbsExport import AbsNdjsonWriter
+from pyabs.AdvancedBinaryStructure import *
+from bench_values import SPEC, make_payload, walk
+
+
+class NullStream(object):
+    def write(self, data):
+        pass
+
+
+def main():
+    l_nb_records = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    l_nb_elements = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    l_records = [make_payload(l_nb_elements)] * l_nb_records
+    l_stream = NullStream()
+
+    def decode_only():
+        for l_record in l_records:
+            AbsFactory.decode_values(SPEC, l_record)
+
+    def ndjson():
+        AbsNdjsonWriter(l_stream, SPEC).write_all(l_records)
+
+    def tree_walk_json():
+        for l_record in l_records:
+            l_stream.write(json.dumps(walk(AdvancedBinaryStructure(l_record, SPEC)['decoded_data'])))
+            l_stream.write('\n')
+
+    for l_function in [decode_only, ndjson, tree_walk_json]:
+        l_start = time.time()
+        l_function()
+        l_elapsed = time.time() - l_start
+        print('%-16s %8.0f records/s' % (l_function.__name__, l_nb_records / l_elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8-unix -*-
+"""
+Decoding many structs into AbsRecord objects vs. OrderedDicts : time and memory.
+
+Usage : python benchmarks/bench_records.py [NB_ELEMENTS]
+
+The memory is measured with tracemalloc (python 3.4+), and estimated with sys.getsizeof otherwise.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs import HexUtils
+from pyabs.AdvancedBinaryStructure import *
+
+from bench_values import SPEC, make_payload
+
+
+def deep_size(value):
+    """Rough size of VALUE and of everything it holds, in bytes."""
+    l_size = sys.getsizeof(value)
+    if hasattr(value, '_values'):
+        # The tuple of an AbsRecord
+        l_size += sys.getsizeof(value._values)
+    if isinstance(value, list):
+        l_size += sum([deep_size(l_item) for l_item in value])
+    elif hasattr(value, 'items'):
+        l_size += sum([deep_size(l_item) for (_, l_item) in value.items()])
+    return l_size
+
+
+def memory(function):
+    try:
+        import tracemalloc
+    except ImportError:
+        return deep_size(function())
+    tracemalloc.start()
+    l_start = tracemalloc.get_traced_memory()[0]
+    l_result = function()
+    l_size = tracemalloc.get_traced_memory()[0] - l_start
+    tracemalloc.stop()
+    del l_result
+    return l_size
+
+
+def best_time(function):
+    return min(timeit.repeat(function, number=1, repeat=5))
+
+
+def main():
+    l_nb_elements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    l_data = HexUtils.hex_str_to_bytes(make_payload(l_nb_elements))
+    assert AbsFactory.decode_values(SPEC, l_data, records=True) == \
+        AbsFactory.decode_values(SPEC, l_data)
+
+    print('%d elements' % l_nb_elements)
+    l_results = []
+    for l_records in [False, True]:
+        l_function = lambda: AbsFactory.decode_values(SPEC, l_data, records=l_records)
+        l_results.append((best_time(l_function), memory(l_function)))
+        print('%-12s %8.1f ms %8.1f MB' % ('records' if l_records else 'OrderedDict',
+                                          l_results[-1][0] * 1000, l_results[-1][1] / 1e6))
+    print('saved        %7.0f %% %7.0f %%' % (100 * (1 - l_results[1][0] / l_results[0][0]),
+                                              100 * (1 - float(l_results[1][1]) / l_results[0][1])))
+
+
+if __name__ == '__main__':
+    main()
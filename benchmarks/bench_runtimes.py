@@ -0,0 +1,74 @@
+# -*- coding: utf-8-unix -*-
+"""
+Decoding speed of the same workloads under several python interpreters.
+
+Usage : python benchmarks/bench_runtimes.py [-n NB_ELEMENTS] [PYTHON ...]
+
+Each given interpreter (only the current one by default) runs the workloads in a child process, and
+the timings are printed side by side, e.g. :
+
+    python benchmarks/bench_runtimes.py python2.7 python3
+"""
+import json
+import os
+import subprocess
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_values import SPEC, make_payload
+
+
+def workloads(nb_elements):
+    from pyabs import HexUtils
+    from pyabs.AdvancedBinaryStructure import AdvancedBinaryStructure, AbsFactory
+
+    l_payload = make_payload(nb_elements)
+    l_data = HexUtils.hex_str_to_bytes(l_payload)
+    l_nb_bits = len(l_data) * 8
+    return [
+        ('hex_str_to_bytes', lambda: HexUtils.hex_str_to_bytes(l_payload)),
+        ('extract', lambda: [HexUtils.extract(l_data, l_offset, 29)
+                             for l_offset in range(0, l_nb_bits - 29, 29)]),
+        ('extract_uint', lambda: [HexUtils.extract_uint(l_data, l_offset, 11)
+                                  for l_offset in range(0, l_nb_bits - 11, 11)]),
+        ('tree', lambda: AdvancedBinaryStructure(l_payload, SPEC)),
+        ('decode_values', lambda: AbsFactory.decode_values(SPEC, l_payload)),
+    ]
+
+
+def run_child(nb_elements):
+    l_results = {'version': '%d.%d.%d' % sys.version_info[:3]}
+    for (l_name, l_function) in workloads(nb_elements):
+        l_timer = timeit.Timer(l_function)
+        (l_nb_runs, _) = l_timer.autorange() if hasattr(l_timer, 'autorange') else (5, None)
+        l_results[l_name] = min(l_timer.repeat(3, l_nb_runs)) / l_nb_runs
+    sys.stdout.write(json.dumps(l_results))
+
+
+def main():
+    l_args = sys.argv[1:]
+    l_nb_elements = 200
+    if len(l_args) >= 2 and l_args[0] == '-n':
+        l_nb_elements = int(l_args[1])
+        l_args = l_args[2:]
+    if l_args[:1] == ['--child']:
+        run_child(l_nb_elements)
+        return
+
+    l_interpreters = l_args if len(l_args) > 0 else [sys.executable]
+    l_results = []
+    for l_interpreter in l_interpreters:
+        l_output = subprocess.check_output([l_interpreter, os.path.abspath(__file__),
+                                            '-n', str(l_nb_elements), '--child'])
+        l_results.append(json.loads(l_output.decode('ascii')))
+
+    print('%d elements' % l_nb_elements)
+    print('%-18s' % 'python' + ''.join(['%14s' % r['version'] for r in l_results]))
+    for (l_name, _) in workloads(1):
+        print('%-18s' % l_name + ''.join(['%11.3f ms' % (r[l_name] * 1000) for r in l_results]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8-unix -*-
+"""
+Recovering the messages of a corrupted stream : AbsScanner vs. decoding at every byte offset.
+
+Usage : python benchmarks/bench_scanner.py [NB_MESSAGES]
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs import HexUtils
+from pyabs.AdvancedBinaryStructure import *
+from pyabs.AbsScanner import AbsScanner
+
+MAGIC = 0xA55A
+
+SPEC = [
+    ('magic', 16),
+    ('seq', 32),
+    [DYN_ARRAY, 'samples', NB_ELTS, 8, [('channel', 4), ('level', 12)]],
+]
+
+
+def is_valid(values):
+    return values['magic'] == MAGIC
+
+
+def make_stream(nb_messages):
+    """Messages separated by random garbage."""
+    l_random = random.Random(0)
+    l_parts = []
+    for i in range(nb_messages):
+        l_parts.append('%04X%08X%02X' % (MAGIC, i, 8) + '1234' * 8)
+        l_parts.append(''.join(['%02X' % l_random.randint(0, 255)
+                                for _ in range(l_random.randint(0, 20))]))
+    return HexUtils.hex_str_to_bytes(''.join(l_parts))
+
+
+def brute_force(data):
+    """Try to decode a message at each byte offset."""
+    l_root = ('root', SPEC)
+    l_offsets = []
+    l_position = 0
+    while l_position < len(data):
+        try:
+            l_message = AbsFactory.make(l_root, data[l_position:])
+            if AbsFactory.decode_values(SPEC, data[l_position:])['magic'] == MAGIC:
+                l_offsets.append(l_position)
+                l_position += l_message.bit_width() // 8
+                continue
+        except (AbsDecodingError, HexUtils.HexUtilsError):
+            pass
+        l_position += 1
+    return l_offsets
+
+
+def best_time(function):
+    return min(timeit.repeat(function, number=1, repeat=3))
+
+
+def main():
+    l_nb_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    l_data = make_stream(l_nb_messages)
+    l_byte_view = HexUtils.byte_view(l_data)
+    l_scanners = [
+        ('predicate', AbsScanner(SPEC, predicate=is_valid)),
+        ('sync', AbsScanner(SPEC, sync=b'\xA5\x5A', predicate=is_valid)),
+    ]
+    l_expected = brute_force(l_byte_view)
+    for (_, l_scanner) in l_scanners:
+        assert [m.byte_offset for m in l_scanner.scan(l_data).messages] == l_expected
+
+    l_brute_force = best_time(lambda: brute_force(l_byte_view))
+    print('%d messages, %d bytes : %8.1f ms decoding at every offset'
+          % (l_nb_messages, len(l_data), l_brute_force * 1000))
+    for (l_name, l_scanner) in l_scanners:
+        l_time = best_time(lambda: l_scanner.scan(l_data))
+        print('%-10s %8.1f ms (x%.1f)' % (l_name, l_time * 1000, l_brute_force / l_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8-unix -*-
+"""
+Splitting a stream of back-to-back messages : measuring each message vs. using the static size of
+the spec (see AbsFactory.size_info), which fixes the width of fixed-width messages and lets the
+reader wait for enough data before measuring the others.
+
+Usage : python benchmarks/bench_size.py [NB_MESSAGES]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs import HexUtils
+from pyabs.AdvancedBinaryStructure import *
+from pyabs.AbsCli import split_stream
+from pyabs.AbsValueDecoder import AbsMeasurer
+
+FIXED_SPEC = [('seq', 32), ('kind', 8, TAGGED), ('level', 12), ('gain', 4), ('crc', 16)]
+VARIABLE_SPEC = [('seq', 32), ('level', 16), [DYN_ARRAY, 'name', SIZE_EXCL, 8, AbsFieldAscii]]
+
+
+def measured_split(chunks, node):
+    # Measures every message, peeking at each chunk end until the message is complete
+    l_measurer = AbsMeasurer()
+    l_buffer = bytearray()
+    l_offset = 0
+    for l_chunk in chunks:
+        l_buffer.extend(l_chunk)
+        while True:
+            try:
+                l_bit_width = l_measurer.measure(node, l_buffer, l_offset)
+            except HexUtils.HexUtilsInputSizeError:
+                break
+            l_end = l_offset + l_bit_width
+            if l_end > len(l_buffer) * 8:
+                break
+            yield l_buffer[l_offset // 8:(l_end + 7) // 8], l_offset % 8
+            l_offset = l_end
+        del l_buffer[:l_offset // 8]
+        l_offset %= 8
+
+
+def best_time(function):
+    l_timer = timeit.Timer(function)
+    (l_nb_runs, _) = l_timer.autorange() if hasattr(l_timer, 'autorange') else (5, None)
+    return min(l_timer.repeat(3, l_nb_runs)) / l_nb_runs
+
+
+def main():
+    l_nb_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for (l_name, l_spec, l_message) in [
+            ('fixed', FIXED_SPEC, bytes(bytearray(range(9)))),
+            ('variable', VARIABLE_SPEC, bytes(bytearray(range(6))) + b'\x03ABCD')]:
+        l_node = AbsFactory.compile(l_spec, root=True)
+        l_data = l_message * l_nb_messages
+        l_chunks = [l_data[i:i + 4096] for i in range(0, len(l_data), 4096)]
+        assert list(split_stream(l_chunks, l_node)) == list(measured_split(l_chunks, l_node))
+
+        l_measured = best_time(lambda: sum(1 for _ in measured_split(l_chunks, l_node)))
+        l_static = best_time(lambda: sum(1 for _ in split_stream(l_chunks, l_node)))
+        print('%-8s %d messages : %8.3f ms measuring each, %8.3f ms with size_info (x%.1f)'
+              % (l_name, l_nb_messages, l_measured * 1000, l_static * 1000,
+                 l_measured / l_static))
+
+
+if __name__ == '__main__':
+    main()
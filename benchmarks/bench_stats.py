@@ -0,0 +1,84 @@
+# -*- coding: utf-8-unix -*-
+"""
+Statistics of a few fields over many messages : AbsAggregator vs. decoding each message into plain
+values and reducing them.
+
+Usage : python benchmarks/bench_stats.py [NB_MESSAGES]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs import HexUtils
+from pyabs.AdvancedBinaryStructure import *
+from pyabs.AbsStats import AbsAggregator
+
+SPEC = [
+    ('msg-type', 8, TAGGED),
+    ('seq', 32),
+    [SWITCH, 'msg-type', {
+        1: ('heartbeat', [('timestamp', 64)]),
+        2: ('samples', [
+            ('flags', 8),
+            [DYN_ARRAY, 'values', NB_ELTS, 16, [('channel', 4), ('valid', 1), ('level', 11)]],
+        ]),
+    }],
+    [DYN_ARRAY, 'comment', SIZE_EXCL, 8, AbsFieldAscii],
+]
+
+
+def make_messages(nb_messages):
+    l_messages = []
+    for i in range(nb_messages):
+        if i % 2 == 0:
+            l_messages.append('01' + '%08X' % i + '0102030405060708' + '00')
+        else:
+            l_messages.append('02' + '%08X' % i + '80' + '0020' + 'A7FF' * 32 + '03414243')
+    return [HexUtils.hex_str_to_bytes(l_message) for l_message in l_messages]
+
+
+def aggregate(messages):
+    l_aggregator = AbsAggregator(SPEC)
+    l_aggregator.add('msg-type', 'histogram')
+    l_aggregator.add('seq', 'max')
+    l_aggregator.add('samples.values.length', 'mean')
+    l_aggregator.feed_all(messages)
+    l_results = l_aggregator.results()
+    return (l_results['msg-type']['histogram'], l_results['seq']['max'],
+            l_results['samples.values.length']['mean'])
+
+
+def decode_and_reduce(messages):
+    l_histogram = {}
+    l_max_seq = None
+    l_lengths = []
+    for l_message in messages:
+        l_values = AbsFactory.decode_values(SPEC, l_message)
+        l_histogram[l_values['msg-type']] = l_histogram.get(l_values['msg-type'], 0) + 1
+        l_max_seq = l_values['seq'] if l_max_seq is None else max(l_max_seq, l_values['seq'])
+        if 'samples' in l_values:
+            l_lengths.append(l_values['samples']['values']['length'])
+    return sorted(l_histogram.items()), l_max_seq, float(sum(l_lengths)) / len(l_lengths)
+
+
+def best_time(function):
+    l_timer = timeit.Timer(function)
+    (l_nb_runs, _) = l_timer.autorange() if hasattr(l_timer, 'autorange') else (5, None)
+    return min(l_timer.repeat(3, l_nb_runs)) / l_nb_runs
+
+
+def main():
+    l_nb_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    l_messages = make_messages(l_nb_messages)
+    assert aggregate(l_messages) == decode_and_reduce(l_messages)
+
+    l_decoded = best_time(lambda: decode_and_reduce(l_messages))
+    l_aggregated = best_time(lambda: aggregate(l_messages))
+    print('%d messages : %8.3f ms decoding and reducing, %8.3f ms with AbsAggregator (x%.1f)'
+          % (l_nb_messages, l_decoded * 1000, l_aggregated * 1000, l_decoded / l_aggregated))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8-unix -*-
+"""
+Byte-aligned integer runs decoded with a single struct unpack vs. one field at a time.
+
+Usage : python benchmarks/bench_struct_runs.py [NB_RECORDS]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs.AdvancedBinaryStructure import *
+
+# A typical header : byte-aligned big- and little-endian integers, then a few bitfields
+RECORD_SPEC = [
+    ('msg-id', 16),
+    ('seq', 32),
+    ('timestamp', 64),
+    ('length', 16, AbsFieldIntegerLE),
+    ('crc', 32, AbsFieldIntegerLE),
+    ('version', 4),
+    ('flags', 4),
+]
+
+SPEC = [
+    [DYN_ARRAY, 'records', NB_ELTS, 16, RECORD_SPEC],
+]
+
+
+def make_payload(nb_records):
+    return '%04X' % nb_records + '0102030405060708090A0B0C0D0E0F10111213141F' * nb_records
+
+
+def without_runs(function):
+    """Run FUNCTION with the layout optimiser disabled."""
+    l_struct_layout = AbsFactory.struct_layout
+    AbsFactory.struct_layout = staticmethod(lambda specs: (None,) * len(specs))
+    AbsFactory._compiled_roots.clear()
+    try:
+        return function()
+    finally:
+        AbsFactory.struct_layout = staticmethod(l_struct_layout)
+        AbsFactory._compiled_roots.clear()
+
+
+def best_time(function):
+    l_timer = timeit.Timer(function)
+    (l_nb_runs, _) = l_timer.autorange() if hasattr(l_timer, 'autorange') else (5, None)
+    return min(l_timer.repeat(3, l_nb_runs)) / l_nb_runs
+
+
+def main():
+    l_nb_records = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    l_payload = make_payload(l_nb_records)
+    l_workloads = [
+        ('tree', lambda: AdvancedBinaryStructure(l_payload, SPEC)),
+        ('decode_values', lambda: AbsFactory.decode_values(SPEC, l_payload)),
+    ]
+    assert AbsFactory.decode_values(SPEC, l_payload) == \
+        without_runs(lambda: AbsFactory.decode_values(SPEC, l_payload))
+
+    for (l_name, l_function) in l_workloads:
+        l_per_field = without_runs(lambda: best_time(l_function))
+        l_runs = best_time(l_function)
+        print('%-14s %4d records : %8.3f ms per field, %8.3f ms with runs (x%.1f)'
+              % (l_name, l_nb_records, l_per_field * 1000, l_runs * 1000, l_per_field / l_runs))
+
+
+if __name__ == '__main__':
+    main()
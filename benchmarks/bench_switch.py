@@ -0,0 +1,68 @@
+# -*- coding: utf-8-unix -*-
+"""
+Decoding an opcode-driven message, whose Switch field lists one branch per opcode vs. one branch per
+range of opcodes (see AbsSwitchTable).
+
+Usage : python benchmarks/bench_switch.py [NB_INSTRUCTIONS]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs import HexUtils
+from pyabs.AdvancedBinaryStructure import *
+
+SHORT = ('operand', 8)
+LONG = ('operand', 16)
+NONE = 'operand'
+
+
+def make_spec(with_ranges):
+    if with_ranges:
+        l_branches = {0x00: NONE, (0x01, 0x7F): SHORT, (0x80, 0xEF): LONG, DEFAULT: NONE}
+    else:
+        l_branches = dict([(i, NONE if i == 0 or i >= 0xF0 else SHORT if i < 0x80 else LONG)
+                           for i in range(256)])
+    return [[DYN_ARRAY, 'program', NB_ELTS, 16, [
+        ('opcode', 8, TAGGED),
+        [SWITCH, 'opcode', l_branches],
+    ]]]
+
+
+def make_program(nb_instructions):
+    l_instructions = []
+    for i in range(nb_instructions):
+        l_opcode = (i * 37) % 256
+        if l_opcode == 0 or l_opcode >= 0xF0:
+            l_instructions.append('%02X' % l_opcode)
+        elif l_opcode < 0x80:
+            l_instructions.append('%02X' % l_opcode + '12')
+        else:
+            l_instructions.append('%02X' % l_opcode + '1234')
+    return HexUtils.hex_str_to_bytes('%04X' % nb_instructions + ''.join(l_instructions))
+
+
+def best_time(function):
+    l_timer = timeit.Timer(function)
+    (l_nb_runs, _) = l_timer.autorange() if hasattr(l_timer, 'autorange') else (5, None)
+    return min(l_timer.repeat(3, l_nb_runs)) / l_nb_runs
+
+
+def main():
+    l_nb_instructions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    l_data = make_program(l_nb_instructions)
+    l_keys = make_spec(False)
+    l_ranges = make_spec(True)
+    assert AbsFactory.decode_values(l_keys, l_data) == AbsFactory.decode_values(l_ranges, l_data)
+
+    for (l_name, l_spec) in [('explicit keys', l_keys), ('ranges', l_ranges)]:
+        l_tree = best_time(lambda: AdvancedBinaryStructure(l_data, l_spec))
+        l_values = best_time(lambda: AbsFactory.decode_values(l_spec, l_data))
+        print('%d instructions, %-13s : %8.3f ms as a tree, %8.3f ms as values'
+              % (l_nb_instructions, l_name, l_tree * 1000, l_values * 1000))
+
+
+if __name__ == '__main__':
+    main()
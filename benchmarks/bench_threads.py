@@ -0,0 +1,48 @@
+# -*- coding: utf-8-unix -*-
+"""
+Decoding a stream of messages with AbsBatchDecoder, with an increasing number of threads.
+
+Usage : python benchmarks/bench_threads.py [NB_MESSAGES]
+
+Run it under both a regular and a free-threaded (python3.13t) interpreter : the threads only decode
+in parallel on the latter.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs import HexUtils
+from pyabs.AdvancedBinaryStructure import *
+from pyabs.AbsBatchDecoder import AbsBatchDecoder
+
+from bench_values import SPEC, make_payload
+
+
+def best_time(function):
+    return min(timeit.repeat(function, number=1, repeat=3))
+
+
+def main():
+    l_nb_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    l_data = HexUtils.hex_str_to_bytes(make_payload(16) * l_nb_messages)
+    l_gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('python %d.%d.%d, GIL %s, %d CPUs, %d messages'
+          % (sys.version_info[:3] + ('enabled' if l_gil else 'disabled',
+                                     AbsBatchDecoder(SPEC)._nb_threads, l_nb_messages)))
+
+    l_reference = None
+    for l_nb_threads in [1, 2, 4, 8]:
+        with AbsBatchDecoder(SPEC, nb_threads=l_nb_threads) as l_decoder:
+            l_values = l_decoder.decode_stream(l_data)
+            assert l_reference is None or l_values == l_reference
+            l_reference = l_values
+            l_time = best_time(lambda: l_decoder.decode_stream(l_data))
+        if l_nb_threads == 1:
+            l_single = l_time
+        print('%2d threads : %8.1f ms (x%.2f)' % (l_nb_threads, l_time * 1000, l_single / l_time))
+
+
+if __name__ == '__main__':
+    main()
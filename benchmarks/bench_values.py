@@ -0,0 +1,72 @@
+# -*- coding: utf-8-unix -*-
+"""
+Plain values decoding vs. building the field objects tree and walking it.
+
+Usage : python benchmarks/bench_values.py [NB_ELEMENTS]
+"""
+import collections
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyabs.AdvancedBinaryStructure import *
+
+SPEC = [
+    ('msg-type', 8, TAGGED),
+    [SWITCH, 'msg-type', {
+        1: ('body', [
+            ('seq', 16),
+            ('flags', 8),
+            [DYN_ARRAY, 'samples', NB_ELTS, 16, [
+                ('channel', 4),
+                ('valid', 1),
+                ('level', 11),
+                ('label', 16, AbsFieldAscii),
+            ]],
+        ]),
+    }],
+]
+
+
+def make_payload(nb_elements):
+    return '01' + '1234' + '80' + '%04X' % nb_elements + 'A7FF4142' * nb_elements
+
+
+def walk(field):
+    """What consumers had to write : turn the field objects tree into plain values."""
+    if isinstance(field, AbsFieldDynArray):
+        return collections.OrderedDict([(l_key, walk(l_value) if l_key != 'data' else
+                                         [walk(l_element) for l_element in l_value])
+                                        for (l_key, l_value) in field.items()])
+    elif isinstance(field, AbsFieldStruct):
+        return collections.OrderedDict([(l_key, walk(l_value))
+                                        for (l_key, l_value) in field.items()])
+    else:
+        return field.value()
+
+
+def tree_then_walk(payload):
+    return walk(AdvancedBinaryStructure(payload, SPEC)['decoded_data'])
+
+
+def values(payload):
+    return AbsFactory.decode_values(SPEC, payload)
+
+
+def main():
+    l_nb_elements = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    l_payload = make_payload(l_nb_elements)
+    assert tree_then_walk(l_payload) == values(l_payload)
+
+    for l_function in [tree_then_walk, values]:
+        l_timer = timeit.Timer(lambda: l_function(l_payload))
+        (l_nb_runs, _) = l_timer.autorange() if hasattr(l_timer, 'autorange') else (5, None)
+        l_best = min(l_timer.repeat(3, l_nb_runs)) / l_nb_runs
+        print('%-16s %4d elements : %8.3f ms' % (l_function.__name__, l_nb_elements,
+                                                 l_best * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Streaming iteration over the elements of a Dynamic Array field.
+
+AbsFactory.iter_elements yields the elements of one Dynamic Array field of a spec one by one, as
+they are decoded from the data : the array itself is never built, so that only the current element
+is kept alive, however large the array is. The array is given by the dotted path of its field id,
+through the Struct fields containing it :
+
+>>> l_spec = [
+...     ('version', 8),
+...     ('log', [
+...         ('source', 16, AbsFieldAscii),
+...         [DYN_ARRAY, 'entries', NB_ELTS, 16, [('level', 4), ('code', 12)]],
+...     ]),
+...     ('checksum', 8),
+... ]
+>>> l_data = '01' + '4142' + '0004' + '1001' + '2002' + '3003' + '4004' + 'FF'
+>>> for l_entry in AbsFactory.iter_elements(l_spec, l_data, 'log.entries', start=1, stop=3):
+...     print('%d %d' % (l_entry['level'].value(), l_entry['code'].value()))
+2 2
+3 3
+
+The fields preceding the array are measured rather than decoded (see AbsFactory.measure), and so
+are the elements preceding START. With VALUES, the elements are decoded into plain python values
+(see AbsFactory.decode_values). With CHUNK_SIZE, lists of (at most) CHUNK_SIZE elements are yielded
+rather than single elements :
+
+>>> for l_chunk in AbsFactory.iter_elements(l_spec, l_data, 'log.entries', values=True,
+...                                         chunk_size=3):
+...     print([l_entry['code'] for l_entry in l_chunk])
+[1, 2, 3]
+[4]
+
+The data itself is not copied : it may be a memory-mapped file (see the mmap module), so that the
+elements of arrays larger than the memory can be processed.
+"""
+try:
+    from .AdvancedBinaryStructure import *
+    from .AbsValueDecoder import AbsMeasurer, AbsValueDecoder
+    from . import HexUtils
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+    from AbsValueDecoder import AbsMeasurer, AbsValueDecoder
+    import HexUtils
+
+
+class AbsArrayReader(object):
+    """Yields the elements of the Dynamic Array field at PATH of the root struct NODE, see
+    AbsFactory.iter_elements.
+
+    PATH is the dotted path of the field id of the array (with SEPARATOR), through the ids of the
+    Struct fields containing it, or of the Switch branches selecting them. An AbsFieldSpecError
+    exception is raised if no such Dynamic Array field can be found in the spec.
+    """
+    def __init__(self, node, path, separator='.', values=False):
+        self._node = node
+        self._path = path.split(separator)
+        if not self._has_path(node, self._path):
+            raise AbsFieldSpecError
+        self._measurer = AbsMeasurer()
+        self._decoder = AbsValueDecoder() if values else None
+
+    @staticmethod
+    def _has_path(node, path):
+        for l_child in node.children:
+            for l_branch in AbsArrayReader._branches(l_child):
+                if l_branch.id != path[0]:
+                    continue
+                elif len(path) == 1 and l_branch.spec_type == SPEC_DYN_ARRAY:
+                    return True
+                elif len(path) > 1 and l_branch.spec_type == SPEC_STRUCT and \
+                        AbsArrayReader._has_path(l_branch, path[1:]):
+                    return True
+        return False
+
+    @staticmethod
+    def _branches(node):
+        """Return the nodes which NODE may be decoded as (its branches, if it is a Switch)."""
+        if node.spec_type != SPEC_SWITCH:
+            return [node]
+        return [l_node for (_, l_branch) in node.branches.items()
+                for l_node in AbsArrayReader._branches(l_branch)]
+
+    def _locate(self, data, offset):
+        """Return the node and the bit offset of the Dynamic Array field in DATA, decoded from
+        OFFSET according to the root struct."""
+        l_context = {}
+        l_node = self._node
+        for l_id in self._path:
+            for l_child in l_node.children:
+                while l_child.spec_type == SPEC_SWITCH:
+                    l_child = AbsValueDecoder._select_branch(l_child, l_context)
+                if l_child.id == l_id:
+                    l_node = l_child
+                    break
+                offset += self._measurer._measure(l_child, data, offset, l_context)
+            else:
+                # The array lies in a Switch branch which is not selected by the data
+                raise AbsDecodingError
+        return l_node, offset
+
+    def iter_elements(self, data, offset=0, start=0, stop=None, chunk_size=None):
+        """Yield the elements of the array (from index START to STOP excluded, if given) in DATA,
+        decoded from OFFSET according to the root struct, or lists of CHUNK_SIZE of them."""
+        if chunk_size is None:
+            return self._iter_elements(HexUtils.byte_view(data), offset, start, stop)
+        else:
+            return self._iter_chunks(HexUtils.byte_view(data), offset, start, stop, chunk_size)
+
+    def _iter_chunks(self, data, offset, start, stop, chunk_size):
+        l_chunk = []
+        for l_element in self._iter_elements(data, offset, start, stop):
+            l_chunk.append(l_element)
+            if len(l_chunk) == chunk_size:
+                yield l_chunk
+                l_chunk = []
+        if l_chunk:
+            yield l_chunk
+
+    def _iter_elements(self, data, offset, start, stop):
+        (l_node, l_offset) = self._locate(data, offset)
+        l_header = HexUtils.extract_uint(data, l_offset, l_node.header_bit_width)
+        # The elements end after a number of them, or at a given offset
+        if l_node.header_type == NB_ELTS:
+            l_nb_elements = l_header
+            l_end_offset = None
+        elif l_node.header_type == SIZE_INCL:
+            l_nb_elements = None
+            l_end_offset = l_offset + l_header * l_node.header_bit_width
+        elif l_node.header_type == SIZE_EXCL:
+            l_nb_elements = None
+            l_end_offset = l_offset + (l_header + 1) * l_node.header_bit_width
+        else:
+            raise AbsDecodingError
+        if stop is not None:
+            l_nb_elements = stop if l_nb_elements is None else min(stop, l_nb_elements)
+        l_offset += l_node.header_bit_width
+
+        def has_next(i, offset):
+            return (l_nb_elements is None or i < l_nb_elements) and \
+                (l_end_offset is None or offset < l_end_offset)
+
+        # Skip the elements preceding START
+        l_element = l_node.element
+        i = 0
+        if l_element.fixed_width == 0 and l_end_offset is not None and l_offset < l_end_offset:
+            # Elements never reach the end of the array
+            raise AbsDecodingError
+        elif l_element.fixed_width:
+            i = start
+            if l_nb_elements is not None:
+                i = min(i, l_nb_elements)
+            if l_end_offset is not None:
+                i = min(i, max(0, -((l_offset - l_end_offset) // l_element.fixed_width)))
+            l_offset += i * l_element.fixed_width
+        while i < start and has_next(i, l_offset):
+            l_offset += self._measurer._measure(l_element, data, l_offset, {})
+            i += 1
+
+        # Each element has its own context
+        if self._decoder is None:
+            l_reader = HexUtils.BitReader(data, l_offset)
+        else:
+            l_decoder = self._decoder._decoders[l_element.spec_type]
+        while has_next(i, l_offset):
+            if self._decoder is None:
+                l_value = AbsFactory._make_typed(l_element.spec, l_element.spec_type, l_reader, 0,
+                                                 None)
+                l_offset = l_reader.position
+            else:
+                (l_value, l_bit_width) = l_decoder(l_element, data, l_offset, None, None)
+                l_offset += l_bit_width
+            yield l_value
+            i += 1
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
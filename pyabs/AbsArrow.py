@@ -0,0 +1,459 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Export of decoded records to Apache Arrow.
+
+AbsArrowBuilder decodes records straight into Arrow columns, and returns them as a RecordBatch :
+no AdvancedBinaryStructure tree nor plain python values are built for the records. The columns
+follow the spec :
+- Integer fields go to unsigned integer columns (of 8, 16, 32 or 64 bits), Boolean fields to boolean
+  columns, ASCII fields to string columns, Raw Data fields to binary columns (the values of other
+  helper classes are converted by pyarrow),
+- Struct fields go to struct columns,
+- Dynamic Array fields go to list columns, of their elements (the header is not kept : the number
+  of elements is the length of the list),
+- the branches of Switch fields go to the columns of their ids, which are null for the records
+  selecting another branch. The branches sharing the same id with different types go to a
+  (dense) union column.
+
+>>> l_spec = [
+...     ('type', 8, TAGGED),
+...     ('name', 16, AbsFieldAscii),
+...     [SWITCH, 'type', {1: ('level', 12), 2: ('level', [('low', 8), ('high', 8)]),
+...                       3: ('payload', 16, AbsFieldRawData)}],
+...     [DYN_ARRAY, 'samples', NB_ELTS, 8, [('valid', 1), ('value', 7)]],
+... ]
+>>> l_builder = AbsArrowBuilder(l_spec)
+>>> l_builder.add_all(['01' + '4142' + '0FF' + '01' + '85' + '0',
+...                    '02' + '4344' + '1020' + '00',
+...                    '03' + '4546' + 'CAFE' + '02' + '8102'])
+3
+>>> l_batch = l_builder.finish()
+>>> l_batch.schema.names
+['type', 'name', 'level', 'payload', 'samples']
+>>> print(l_batch.schema.field('samples').type)
+list<item: struct<valid: bool, value: uint8>>
+>>> l_rows = l_batch.to_pylist()
+>>> l_rows[0]['name'], l_rows[0]['level'], l_rows[0]['payload'], l_rows[0]['samples']
+('AB', 255, None, [{'valid': True, 'value': 5}])
+>>> l_rows[1]['level'], l_rows[2]['payload']
+({'low': 16, 'high': 32}, b'\\xca\\xfe')
+
+A record which cannot be decoded raises an exception, and is not added to the batch. The records
+can be filtered on some of their fields (see AbsFilter) : add tells whether the record was added.
+
+>>> l_builder = AbsArrowBuilder(l_spec, where={'type': lambda value: value != 2})
+>>> l_builder.add('02' + '4344' + '1020' + '00'), len(l_builder)
+(False, 0)
+
+pyarrow is an optional dependency : the module can be imported without it, but an ImportError
+exception is raised when an AbsArrowBuilder is created.
+"""
+try:
+    import pyarrow
+except ImportError:
+    # Optional : only needed by AbsArrowBuilder
+    pyarrow = None
+
+try:
+    from .AdvancedBinaryStructure import *
+    from .AbsValueDecoder import AbsFilter, AbsValueDecoder
+    from . import HexUtils
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+    from AbsValueDecoder import AbsFilter, AbsValueDecoder
+    import HexUtils
+
+
+class AbsArrowBuilder(object):
+    """Decodes records into the columns of an Arrow RecordBatch, see the AbsArrow module.
+
+    spec
+        The top-level field spec of the records (see AdvancedBinaryStructure).
+
+    where
+        If given, a {path: predicate} dict : the records rejected by the predicates are not added
+        (see AbsFilter).
+    """
+    def __init__(self, spec, where=None):
+        if pyarrow is None:
+            raise ImportError('AbsArrowBuilder needs pyarrow')
+        self._node = AbsFactory.compile(spec, root=True)
+        self._filter = None if where is None else AbsFilter(where, node=self._node)
+        # Raw data fields are decoded into bytes
+        self._columns = _AbsArrowStruct(AbsValueDecoder(raw_format='bytes'), [self._node])
+
+    def __len__(self):
+        return self._columns.length()
+
+    def add(self, data, offset=0):
+        """Decode DATA (an hexadecimal string or a list of bytes) into a new row, and tell whether
+        it has been added (not filtered)."""
+        if type(data) == str:
+            l_data = HexUtils.hex_str_to_bytes(data)
+        else:
+            l_data = HexUtils.byte_view(data)
+        if self._filter is not None and not self._filter.accepts(self._node, l_data, offset):
+            return False
+        l_length = self._columns.length()
+        try:
+            self._columns.append(self._node, l_data, offset, None)
+        except Exception:
+            # Drop the part of the row already added
+            self._columns.truncate(l_length)
+            raise
+        return True
+
+    def add_all(self, records):
+        """Add each record of the RECORDS iterable, and return the number of added records."""
+        l_nb_records = 0
+        for l_data in records:
+            if self.add(l_data):
+                l_nb_records += 1
+        return l_nb_records
+
+    def finish(self):
+        """Return the RecordBatch of the rows added so far, and start a new one."""
+        l_names = self._columns.names
+        l_arrays = [l_column.finish() for l_column in self._columns.columns]
+        self._columns.truncate(0)
+        return pyarrow.RecordBatch.from_arrays(l_arrays, l_names)
+
+
+def _sources(node):
+    """Return the nodes which NODE may be decoded as (its branches, if it is a Switch)."""
+    if node.spec_type != SPEC_SWITCH:
+        return [node]
+    return [l_node for (_, l_branch) in node.branches.items() for l_node in _sources(l_branch)]
+
+
+def _columns(nodes):
+    """Return the columns of the Struct NODES (all of the same type) : an ordered list of
+    (name, [source node, ...]), the sources being the children (or their Switch branches)."""
+    l_columns = []
+    l_indexes = {}
+    for l_node in nodes:
+        for l_child in l_node.children:
+            for l_source in _sources(l_child):
+                if l_source.id not in l_indexes:
+                    l_indexes[l_source.id] = len(l_columns)
+                    l_columns.append((l_source.id, []))
+                l_columns[l_indexes[l_source.id]][1].append(l_source)
+    return l_columns
+
+
+def _type_key(node):
+    """Return a hashable key, equal for the nodes decoded into the same type of column."""
+    if node.spec_type == SPEC_STRUCT:
+        return 'struct', tuple([(l_name, tuple(sorted(set([repr(_type_key(s)) for s in l_sources]))))
+                                for (l_name, l_sources) in _columns([node])])
+    elif node.spec_type == SPEC_DYN_ARRAY:
+        return 'list', _type_key(node.element)
+    else:
+        return node.spec_type, node.bit_width, node.helper_class
+
+
+def _make_column(decoder, nodes):
+    """Return the column of the values of NODES (all of the same type)."""
+    if nodes[0].spec_type == SPEC_STRUCT:
+        return _AbsArrowStruct(decoder, nodes)
+    elif nodes[0].spec_type == SPEC_DYN_ARRAY:
+        return _AbsArrowList(decoder, nodes)
+    else:
+        return _AbsArrowLeaf(decoder, nodes[0])
+
+
+def _make_struct_column(decoder, sources):
+    """Return the column of a Struct field, whose values come from the SOURCES nodes : a union
+    column if they are not all of the same type."""
+    l_groups = []
+    l_keys = {}
+    for l_source in sources:
+        l_key = _type_key(l_source)
+        if l_key not in l_keys:
+            l_keys[l_key] = len(l_groups)
+            l_groups.append([])
+        l_groups[l_keys[l_key]].append(l_source)
+    if len(l_groups) == 1:
+        return _make_column(decoder, l_groups[0])
+    return _AbsArrowUnion(decoder, l_groups)
+
+
+class _AbsArrowLeaf(object):
+    """Column of the values of Boolean, Integer, Helper Class and Placeholder fields."""
+    def __init__(self, decoder, node):
+        self._decode = decoder._decoders[node.spec_type]
+        if node.spec_type == SPEC_BOOLEAN:
+            self._type = pyarrow.bool_()
+        elif node.spec_type == SPEC_INTEGER or node.helper_class is AbsFieldIntegerLE:
+            self._type = [l_type for (l_bit_width, l_type) in [
+                (8, pyarrow.uint8()), (16, pyarrow.uint16()), (32, pyarrow.uint32()),
+                (64, pyarrow.uint64())] if node.bit_width <= l_bit_width][0]
+        elif node.helper_class is AbsFieldAscii:
+            self._type = pyarrow.string()
+        elif node.helper_class is AbsFieldRawData:
+            self._type = pyarrow.binary()
+        elif node.spec_type == SPEC_PLACEHOLDER:
+            self._type = pyarrow.null()
+        else:
+            # The values of user-defined helper classes may be of any type
+            self._type = None
+        self.values = []
+
+    def length(self):
+        return len(self.values)
+
+    def append(self, node, data, offset, context):
+        (l_value, l_bit_width) = self._decode(node, data, offset, context, None)
+        self.values.append(l_value)
+        return l_value, l_bit_width
+
+    def append_null(self):
+        self.values.append(None)
+
+    def truncate(self, length):
+        del self.values[length:]
+
+    def finish(self):
+        return pyarrow.array(self.values, type=self._type)
+
+
+class _AbsArrowStruct(object):
+    """Column of the values of Struct fields, given by their NODES (all of the same type)."""
+    def __init__(self, decoder, nodes):
+        l_columns = _columns(nodes)
+        self.names = [l_name for (l_name, _) in l_columns]
+        self.columns = [_make_struct_column(decoder, l_sources) for (_, l_sources) in l_columns]
+        # {id(node): (node, column, union type code)} for each source node of each column
+        self._targets = {}
+        for (l_column, (_, l_sources)) in zip(self.columns, l_columns):
+            for l_source in l_sources:
+                l_code = l_column.code(l_source) if isinstance(l_column, _AbsArrowUnion) else None
+                self._targets[id(l_source)] = (l_source, l_column, l_code)
+        # The values of runs of integers go straight to their columns, unless they are unions
+        self._runs = all([self._targets[id(l_child)][2] is None
+                          for l_node in nodes for l_child in l_node.children
+                          if l_child.spec_type != SPEC_SWITCH])
+        # Without Switch fields, each row fills each column once : no need to keep track of them
+        self._is_static = all([l_child.spec_type != SPEC_SWITCH
+                               for l_node in nodes for l_child in l_node.children]) and \
+            all([len(l_node.children) == len(self.columns) for l_node in nodes])
+        self._null_mask = []
+
+    def length(self):
+        return len(self._null_mask)
+
+    def append(self, node, data, offset, context):
+        l_context = {} if context is None else context
+        l_filled = None if self._is_static else set()
+        l_targets = self._targets
+        l_offset = offset
+        l_children = node.children
+        i = 0
+        while i < len(l_children):
+            l_run = node.runs[i]
+            if l_run is not None and self._runs and l_run.can_unpack(data, l_offset):
+                # Byte-aligned run of integers : decode them all at once
+                l_values = l_run.unpack(data, l_offset)
+                for (l_child, l_value) in zip(l_children[i:i + len(l_values)], l_values):
+                    l_column = l_targets[id(l_child)][1]
+                    if l_filled is not None:
+                        self._fill(l_column, l_filled)
+                    l_column.values.append(l_value)
+                    if l_child.is_tagged:
+                        self._add_tag(l_context, l_child, l_value)
+                l_offset += l_run.bit_width
+                i += len(l_values)
+                continue
+
+            l_child = l_children[i]
+            i += 1
+            while l_child.spec_type == SPEC_SWITCH:
+                l_child = AbsValueDecoder._select_branch(l_child, l_context)
+            (_, l_column, l_code) = l_targets[id(l_child)]
+            if l_filled is not None:
+                self._fill(l_column, l_filled)
+            if l_code is None:
+                (l_value, l_bit_width) = l_column.append(l_child, data, l_offset, l_context)
+            else:
+                (l_value, l_bit_width) = l_column.append_code(l_code, l_child, data, l_offset,
+                                                              l_context)
+            if l_child.is_tagged:
+                self._add_tag(l_context, l_child, l_value)
+            l_offset += l_bit_width
+
+        if l_filled is not None and len(l_filled) < len(self.columns):
+            # The columns of the branches which have not been selected
+            for l_column in self.columns:
+                if id(l_column) not in l_filled:
+                    l_column.append_null()
+        self._null_mask.append(False)
+        return None, l_offset - offset
+
+    @staticmethod
+    def _fill(column, filled):
+        # Fields of the same id (from different Switch fields) cannot share the same row
+        if id(column) in filled:
+            raise AbsDecodingError
+        filled.add(id(column))
+
+    @staticmethod
+    def _add_tag(context, node, value):
+        if node.id in context:
+            raise AbsDecodingError
+        context[node.id] = value
+
+    def append_null(self):
+        for l_column in self.columns:
+            l_column.append_null()
+        self._null_mask.append(True)
+
+    def truncate(self, length):
+        del self._null_mask[length:]
+        for l_column in self.columns:
+            l_column.truncate(length)
+
+    def finish(self):
+        if not self.columns:
+            return pyarrow.array([None if l_null else {} for l_null in self._null_mask],
+                                 type=pyarrow.struct([]))
+        l_arrays = [l_column.finish() for l_column in self.columns]
+        l_fields = [pyarrow.field(l_name, l_array.type)
+                    for (l_name, l_array) in zip(self.names, l_arrays)]
+        if any(self._null_mask):
+            l_mask = pyarrow.array(self._null_mask, type=pyarrow.bool_())
+        else:
+            l_mask = None
+        return pyarrow.StructArray.from_arrays(l_arrays, fields=l_fields, mask=l_mask)
+
+
+class _AbsArrowList(object):
+    """Column of the elements of Dynamic Array fields, given by their NODES (all of the same
+    type)."""
+    def __init__(self, decoder, nodes):
+        self._elements = _make_column(decoder, [l_node.element for l_node in nodes])
+        self._offsets = [0]
+        self._null_mask = []
+
+    def length(self):
+        return len(self._null_mask)
+
+    def append(self, node, data, offset, context):
+        l_header = HexUtils.extract_uint(data, offset, node.header_bit_width)
+        l_offset = offset + node.header_bit_width
+        if node.header_type == NB_ELTS:
+            l_nb_elements = l_header
+            l_end_offset = None
+        elif node.header_type == SIZE_INCL:
+            l_nb_elements = None
+            l_end_offset = offset + l_header * node.header_bit_width
+        elif node.header_type == SIZE_EXCL:
+            l_nb_elements = None
+            l_end_offset = offset + (l_header + 1) * node.header_bit_width
+        else:
+            raise AbsDecodingError
+
+        # Each element has its own context
+        l_element = node.element
+        i = 0
+        while (i < l_nb_elements) if l_end_offset is None else (l_offset < l_end_offset):
+            l_offset += self._elements.append(l_element, data, l_offset, None)[1]
+            i += 1
+        self._offsets.append(self._offsets[-1] + i)
+        self._null_mask.append(False)
+        return None, l_offset - offset
+
+    def append_null(self):
+        self._offsets.append(self._offsets[-1])
+        self._null_mask.append(True)
+
+    def truncate(self, length):
+        del self._null_mask[length:]
+        del self._offsets[length + 1:]
+        self._elements.truncate(self._offsets[-1])
+
+    def finish(self):
+        l_offsets = pyarrow.array(self._offsets, type=pyarrow.int32())
+        l_values = self._elements.finish()
+        if any(self._null_mask):
+            l_mask = pyarrow.array(self._null_mask, type=pyarrow.bool_())
+            return pyarrow.ListArray.from_arrays(l_offsets, l_values, mask=l_mask)
+        return pyarrow.ListArray.from_arrays(l_offsets, l_values)
+
+
+class _AbsArrowUnion(object):
+    """Dense union column of the values of nodes of different types : GROUPS holds the nodes of
+    each type."""
+    def __init__(self, decoder, groups):
+        self._children = [_make_column(decoder, l_nodes) for l_nodes in groups]
+        self._codes = {}
+        for (l_code, l_nodes) in enumerate(groups):
+            for l_node in l_nodes:
+                self._codes[id(l_node)] = l_code
+        self._type_codes = []
+        self._offsets = []
+
+    def code(self, node):
+        """Return the type code of the values of NODE."""
+        return self._codes[id(node)]
+
+    def length(self):
+        return len(self._type_codes)
+
+    def append_code(self, code, node, data, offset, context):
+        l_child = self._children[code]
+        self._type_codes.append(code)
+        self._offsets.append(l_child.length())
+        return l_child.append(node, data, offset, context)
+
+    def append_null(self):
+        # Unions have no validity bitmap of their own : the value of the first type is null
+        self._type_codes.append(0)
+        self._offsets.append(self._children[0].length())
+        self._children[0].append_null()
+
+    def truncate(self, length):
+        del self._type_codes[length:]
+        del self._offsets[length:]
+        for (l_code, l_child) in enumerate(self._children):
+            # The values of each type are added in order : keep the ones of the first rows
+            l_length = 0
+            for (l_type_code, l_offset) in zip(reversed(self._type_codes),
+                                               reversed(self._offsets)):
+                if l_type_code == l_code:
+                    l_length = l_offset + 1
+                    break
+            l_child.truncate(l_length)
+
+    def finish(self):
+        return pyarrow.UnionArray.from_dense(pyarrow.array(self._type_codes, type=pyarrow.int8()),
+                                             pyarrow.array(self._offsets, type=pyarrow.int32()),
+                                             [l_child.finish() for l_child in self._children])
+
+
+if __name__ == "__main__":
+    import doctest
+    if pyarrow is None:
+        print('pyarrow is not installed : the doctests are skipped')
+    else:
+        doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                        exclude_empty=True)
@@ -0,0 +1,172 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Multi-threaded decoding of many messages.
+
+AbsBatchDecoder decodes messages into plain python values (see AbsFactory.decode_values) with a pool
+of threads. All the threads read the same buffer, through a memoryview (python 3) : the data is
+never copied, unlike with a pool of processes.
+
+The decoding itself holds no shared mutable state : the compiled specs are read-only, and each
+decoding keeps its own context. On free-threaded python builds, the threads run in parallel.
+
+>>> l_spec = [
+...     ('my-id', 8),
+...     [DYN_ARRAY, 'my-str', NB_ELTS, 8, AbsFieldAscii],
+... ]
+>>> with AbsBatchDecoder(l_spec, nb_threads=4, chunk_size=2) as l_decoder:
+...     l_values = l_decoder.decode_stream('01024142' + '020143' + '0300' + '0403444546')
+>>> [(l_value['my-id'], ''.join(l_value['my-str']['data'])) for l_value in l_values]
+[(1, 'AB'), (2, 'C'), (3, ''), (4, 'DEF')]
+
+The messages may also be located beforehand (their bit offsets are given), or be separate records :
+
+>>> with AbsBatchDecoder(l_spec, nb_threads=2, flat=True) as l_decoder:
+...     l_decoder.decode('01024142020143', [0, 32])[1]['my-str.data.0']
+...     [l_value['my-id'] for l_value in l_decoder.decode_all(['0100', '020143', '0300'])]
+'C'
+[1, 2, 3]
+
+The messages can be filtered on some of their fields : the rejected ones are not decoded any
+further (see AbsFilter).
+
+>>> with AbsBatchDecoder(l_spec, where={'my-str.length': lambda length: length > 1}) as l_decoder:
+...     l_values = l_decoder.decode_stream('01024142' + '020143' + '0300' + '0403444546')
+>>> [l_value if l_value is FILTERED else l_value['my-id'] for l_value in l_values]
+[1, 'FILTERED', 'FILTERED', 4]
+"""
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+
+try:
+    from .AdvancedBinaryStructure import *
+    from .AbsValueDecoder import AbsMeasurer, AbsValueDecoder
+    from . import HexUtils
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+    from AbsValueDecoder import AbsMeasurer, AbsValueDecoder
+    import HexUtils
+
+
+class AbsBatchDecoder(object):
+    """Decodes many messages with a pool of threads.
+
+    spec
+        The top-level field spec of the messages (see AdvancedBinaryStructure).
+
+    nb_threads
+        The number of threads (the number of CPUs by default).
+
+    flat, raw_format, limits, where
+        See AbsValueDecoder : with WHERE, the messages rejected by the predicates are decoded into
+        FILTERED, and cost only the decoding of the tested fields.
+
+    chunk_size
+        The number of messages handed to a thread at once.
+
+    The threads are started on the first decoding, and stopped by close() (or at the end of a with
+    statement).
+    """
+    def __init__(self, spec, nb_threads=None, flat=False, raw_format='hex', limits=None,
+                 chunk_size=64, where=None):
+        if chunk_size < 1:
+            raise ValueError
+        self._node = AbsFactory.compile(spec, root=True)
+        self._decoder = AbsValueDecoder(flat, raw_format=raw_format, limits=limits, where=where)
+        self._nb_threads = nb_threads if nb_threads is not None else multiprocessing.cpu_count()
+        self._chunk_size = chunk_size
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop the threads."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def decode(self, data, offsets):
+        """Decode the messages of DATA (an hexadecimal string or a list of bytes) starting at each of
+        the given bit OFFSETS, and return the list of their values."""
+        l_data = HexUtils.byte_view(self._bytes(data))
+        return self._map(lambda offset: self._decoder.decode(self._node, l_data, offset)[0],
+                         offsets)
+
+    def decode_stream(self, data, offset=0):
+        """Decode the messages following each other in DATA, from bit OFFSET to the end of the data,
+        and return the list of their values.
+
+        The messages are first located by measuring them one after the other (see
+        AbsFactory.measure), then decoded by the threads.
+        """
+        l_data = HexUtils.byte_view(self._bytes(data))
+        l_nb_bits = len(l_data) * 8
+        l_measurer = AbsMeasurer()
+        l_offsets = []
+        l_offset = offset
+        while l_offset < l_nb_bits:
+            l_offsets.append(l_offset)
+            l_bit_width = l_measurer.measure(self._node, l_data, l_offset)
+            if l_bit_width == 0:
+                # Empty messages would never reach the end of the data
+                raise AbsDecodingError
+            l_offset += l_bit_width
+        return self._map(lambda offset: self._decoder.decode(self._node, l_data, offset)[0],
+                         l_offsets)
+
+    def decode_all(self, records):
+        """Decode each record of RECORDS (hexadecimal strings or lists of bytes), and return the
+        list of their values."""
+        return self._map(lambda record: self._decoder.decode(self._node, self._bytes(record), 0)[0],
+                         records)
+
+    @staticmethod
+    def _bytes(data):
+        if type(data) == str:
+            return HexUtils.hex_str_to_bytes(data)
+        else:
+            return data
+
+    def _map(self, function, items):
+        l_items = list(items)
+        l_chunks = [l_items[i:i + self._chunk_size]
+                    for i in range(0, len(l_items), self._chunk_size)]
+        if len(l_chunks) <= 1 or self._nb_threads <= 1:
+            return [function(l_item) for l_item in l_items]
+        if self._pool is None:
+            self._pool = ThreadPool(self._nb_threads)
+        l_results = []
+        for l_chunk_results in self._pool.map(lambda chunk: [function(l_item) for l_item in chunk],
+                                              l_chunks):
+            l_results.extend(l_chunk_results)
+        return l_results
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
@@ -0,0 +1,493 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Command-line bulk decoder.
+
+  python -m pyabs SPEC [FILE ...] [options]     (or the 'pyabs' script)
+
+decodes the messages of the input FILEs (or of the standard input), according to the top-level
+field spec SPEC, given as 'module:ATTRIBUTE' (the current directory is searched for the module) :
+
+  pyabs my_protocol:SPEC capture.bin --input binary --framing stream --format ndjson --jobs 4
+
+- --input hex|binary : the input is made of hexadecimal digits (whitespace is ignored) or of raw
+  bytes,
+- --framing lines|length|stream : each line is a message (hexadecimal input only), or each message is
+  preceded by its big-endian length in bytes (on --length-size bytes), or the messages follow each
+  other (each one is measured to find the next one, see AbsFactory.measure),
+- --format pprint|ndjson|csv : the messages are pretty-printed, written as JSON lines (see
+  AbsNdjsonWriter), or as CSV rows of their flat values (the columns are the fields of the first
+  message : the fields of other Switch branches, or of longer Dynamic Arrays, are left out, and the
+  messages having such fields are counted in the summary),
+- --jobs N : the messages are decoded by N processes.
+
+The input is read and decoded in batches : memory does not grow with the input size. A summary of
+the throughput and of the errors is written to the standard error at the end. A message which
+cannot be decoded (or a line which is not made of hexadecimal digits) is counted as an error, and
+skipped.
+
+The input is split into messages by generators, which only hold the current incomplete message :
+
+>>> import io
+>>> l_node = AbsFactory.compile([[DYN_ARRAY, 'my-str', NB_ELTS, 8, AbsFieldAscii]], root=True)
+>>> l_chunks = read_hex_chunks(io.BytesIO(b'0241 42\\n0143 00'), chunk_size=3)
+>>> [(HexUtils.bytes_to_hex_str(l_data), l_offset)
+...  for (l_data, l_offset) in split_stream(l_chunks, l_node)]
+[('024142', 0), ('0143', 0), ('00', 0)]
+>>> [HexUtils.bytes_to_hex_str(l_data)
+...  for (l_data, _) in split_lengths([b'\\x00\\x02\\xCA\\xFE\\x00', b'\\x01\\x42'], 2)]
+['CAFE', '42']
+
+With the lines framing, the lines which cannot be converted into bytes are handed to a callback :
+
+>>> l_errors = []
+>>> [HexUtils.bytes_to_hex_str(l_data)
+...  for (l_data, _) in split_lines(io.BytesIO(b'CAFE\\nZZ\\nCAF\\n42\\n'), l_errors.append)]
+['CAFE', '42']
+>>> [type(l_error).__name__ for l_error in l_errors]
+['ValueError', 'HexUtilsInputSizeError']
+"""
+import argparse
+import collections
+import csv
+import importlib
+import multiprocessing
+import os
+import sys
+import timeit
+
+try:
+    from .AdvancedBinaryStructure import *
+    from .AbsValueDecoder import AbsMeasurer, AbsValueDecoder
+    from .AbsExport import AbsNdjsonWriter
+    from .AbsSize import AbsSizeAnalyser
+    from . import AbsPrettyPrinter
+    from . import HexUtils
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+    from AbsValueDecoder import AbsMeasurer, AbsValueDecoder
+    from AbsExport import AbsNdjsonWriter
+    from AbsSize import AbsSizeAnalyser
+    import AbsPrettyPrinter
+    import HexUtils
+
+# The errors of a message which cannot be decoded
+DECODING_ERRORS = (AbsError, HexUtils.HexUtilsError)
+# The errors of an input which cannot be converted into bytes
+INPUT_ERRORS = DECODING_ERRORS + (ValueError, UnicodeError)
+
+
+def load_spec(reference):
+    """Return the spec given as 'module:ATTRIBUTE' (the attribute may be dotted)."""
+    (l_module_name, l_separator, l_attribute) = reference.partition(':')
+    if not l_separator or not l_module_name or not l_attribute:
+        raise ValueError('The spec must be given as module:ATTRIBUTE : %r' % reference)
+    if os.getcwd() not in sys.path and '' not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    l_spec = importlib.import_module(l_module_name)
+    for l_name in l_attribute.split('.'):
+        l_spec = getattr(l_spec, l_name)
+    return l_spec
+
+
+def read_chunks(stream, chunk_size=1 << 16):
+    """Yield the content of the binary STREAM, by chunks of CHUNK_SIZE bytes."""
+    while True:
+        l_chunk = stream.read(chunk_size)
+        if not l_chunk:
+            break
+        yield bytearray(l_chunk)
+
+
+def read_hex_chunks(stream, chunk_size=1 << 16):
+    """Yield the bytes written as hexadecimal digits in the binary STREAM (whitespace is
+    ignored)."""
+    l_pending = b''
+    for l_chunk in read_chunks(stream, chunk_size):
+        l_digits = l_pending + b''.join(bytes(l_chunk).split())
+        l_even = len(l_digits) - len(l_digits) % 2
+        l_pending = l_digits[l_even:]
+        if l_even > 0:
+            yield HexUtils.hex_str_to_bytes(l_digits[:l_even].decode('ascii'))
+    if l_pending:
+        raise HexUtils.HexUtilsParamError
+
+
+def split_lines(stream, on_error=None):
+    """Yield the (data, bit offset) of the messages of the binary STREAM, one per line of
+    hexadecimal digits (blank lines are skipped).
+
+    A line which cannot be converted into bytes raises an error, or if ON_ERROR is given, is
+    skipped after its error is passed to ON_ERROR.
+    """
+    for l_line in stream:
+        l_digits = b''.join(l_line.split())
+        if not l_digits:
+            continue
+        try:
+            l_data = HexUtils.hex_str_to_bytes(l_digits.decode('ascii'))
+        except INPUT_ERRORS as l_error:
+            if on_error is None:
+                raise
+            on_error(l_error)
+            continue
+        yield l_data, 0
+
+
+def split_lengths(chunks, length_size):
+    """Yield the (data, bit offset) of the messages of the CHUNKS of bytes, each message being
+    preceded by its big-endian length in bytes, on LENGTH_SIZE bytes."""
+    l_buffer = bytearray()
+    for l_chunk in chunks:
+        l_buffer.extend(l_chunk)
+        l_start = 0
+        while len(l_buffer) - l_start >= length_size:
+            l_length = HexUtils.extract_uint(l_buffer, l_start * 8, length_size * 8)
+            l_end = l_start + length_size + l_length
+            if l_end > len(l_buffer):
+                break
+            yield l_buffer[l_start + length_size:l_end], 0
+            l_start = l_end
+        del l_buffer[:l_start]
+    if l_buffer:
+        # Truncated last message
+        raise HexUtils.HexUtilsInputSizeError
+
+
+def split_stream(chunks, node):
+    """Yield the (data, bit offset) of the messages following each other in the CHUNKS of bytes,
+    decoded according to the root struct NODE.
+
+    Each message is measured (see AbsFactory.measure) to find where the next one starts, unless
+    its width is fixed (see AbsFactory.size_info) : the messages need not be byte-aligned, but the
+    end of the data may only hold padding bits.
+    """
+    l_measurer = AbsMeasurer()
+    l_info = AbsSizeAnalyser().analyse(node)
+    l_min_width = l_info.min_width
+    l_fixed_width = l_info.fixed_width
+    l_buffer = bytearray()
+    l_offset = 0
+    for l_chunk in chunks:
+        l_buffer.extend(l_chunk)
+        l_data_width = len(l_buffer) * 8
+        while l_data_width - l_offset >= l_min_width:
+            if l_fixed_width is not None:
+                l_bit_width = l_fixed_width
+            else:
+                try:
+                    l_bit_width = l_measurer.measure(node, l_buffer, l_offset)
+                except HexUtils.HexUtilsInputSizeError:
+                    # Wait for more data
+                    break
+            if l_bit_width == 0:
+                # Empty messages would never reach the end of the data
+                raise AbsDecodingError
+            l_end = l_offset + l_bit_width
+            if l_end > l_data_width:
+                break
+            yield l_buffer[l_offset // 8:(l_end + 7) // 8], l_offset % 8
+            l_offset = l_end
+        # Only keep the bytes of the next message
+        del l_buffer[:l_offset // 8]
+        l_offset %= 8
+    if len(l_buffer) * 8 - l_offset >= 8:
+        # Truncated last message
+        raise HexUtils.HexUtilsInputSizeError
+
+
+class AbsMessageFormatter(object):
+    """Decodes messages and formats them into output text (or into flat values, for the csv
+    format).
+
+    The formatter of each worker process is built from the spec reference, see _init_worker.
+    """
+    def __init__(self, spec, output_format, flat=False):
+        self._spec = spec
+        self._format = output_format
+        self._node = AbsFactory.compile(spec, root=True)
+        if output_format == 'ndjson':
+            self._lines = []
+            self._writer = AbsNdjsonWriter(self, spec, flat=flat)
+        elif output_format == 'csv':
+            self._decoder = AbsValueDecoder(flat=True)
+        self._root_spec = ('root', spec if type(spec) == list else list(spec))
+
+    def write(self, text):
+        # AbsNdjsonWriter output
+        self._lines.append(text)
+
+    def format(self, data, offset):
+        """Return the output of the message DATA, decoded from bit OFFSET."""
+        if self._format == 'ndjson':
+            self._writer.write(data, offset)
+            l_text = ''.join(self._lines)
+            del self._lines[:]
+            return l_text
+        elif self._format == 'csv':
+            return self._decoder.decode(self._node, data, offset)[0]
+        else:
+            return AbsPrettyPrinter.pformat(AbsFactory.make(self._root_spec, data, offset)) + '\n'
+
+    def format_batch(self, messages):
+        """Format each (data, bit offset) of MESSAGES.
+
+        Returns the outputs of the decoded messages, and the names of the errors raised by the
+        others.
+        """
+        l_outputs = []
+        l_errors = []
+        for (l_data, l_offset) in messages:
+            try:
+                l_outputs.append(self.format(l_data, l_offset))
+            except DECODING_ERRORS as l_error:
+                l_errors.append(type(l_error).__name__)
+        return l_outputs, l_errors
+
+
+# The formatter of a worker process
+_worker_formatter = None
+
+
+def _init_worker(spec_reference, output_format, flat):
+    global _worker_formatter
+    _worker_formatter = AbsMessageFormatter(load_spec(spec_reference), output_format, flat)
+
+
+def _format_batch(messages):
+    return _worker_formatter.format_batch(messages)
+
+
+class AbsOutput(object):
+    """Writes the formatted messages to STREAM."""
+    def __init__(self, stream, output_format):
+        self._stream = stream
+        self._format = output_format
+        self._csv_writer = None
+        self._csv_columns = None
+
+    def write(self, outputs):
+        """Write OUTPUTS, and return the number of messages whose fields have not all been
+        written (the csv columns lacking some of them)."""
+        if self._format != 'csv':
+            self._stream.write(''.join(outputs))
+            return 0
+        l_nb_incomplete = 0
+        for l_values in outputs:
+            if self._csv_writer is None:
+                # The columns are the fields of the first message
+                self._csv_columns = frozenset(l_values.keys())
+                self._csv_writer = csv.DictWriter(self._stream, list(l_values.keys()),
+                                                  restval='', extrasaction='ignore',
+                                                  lineterminator='\n')
+                self._csv_writer.writeheader()
+            elif not self._csv_columns.issuperset(l_values.keys()):
+                l_nb_incomplete += 1
+            self._csv_writer.writerow(l_values)
+        return l_nb_incomplete
+
+
+class AbsRunSummary(object):
+    """Counts the decoded messages and the errors, and reports the throughput.
+
+    The errors are counted by name : the errors decoding a message (or converting its line), and
+    the errors splitting the input into messages (which end the input). The messages whose fields
+    could not all be written (see AbsOutput) are counted too.
+    """
+    def __init__(self):
+        self.nb_messages = 0
+        self.nb_bytes = 0
+        self.errors = collections.Counter()
+        self.input_errors = collections.Counter()
+        self.nb_incomplete = 0
+        self._start = timeit.default_timer()
+
+    def add_batch(self, messages, outputs, errors):
+        self.nb_messages += len(messages)
+        self.nb_bytes += sum([len(l_data) for (l_data, _) in messages])
+        self.errors.update(errors)
+
+    def add_message_error(self, error):
+        self.nb_messages += 1
+        self.errors[type(error).__name__] += 1
+
+    def add_input_error(self, error):
+        self.input_errors[type(error).__name__] += 1
+
+    def add_incomplete(self, nb_messages):
+        self.nb_incomplete += nb_messages
+
+    def report(self, stream):
+        l_elapsed = max(timeit.default_timer() - self._start, 1e-9)
+        l_nb_errors = sum(self.errors.values())
+        stream.write('%d messages (%d decoded, %d errors), %d bytes in %.3f s : %.0f messages/s, '
+                     '%.2f MB/s\n' % (self.nb_messages, self.nb_messages - l_nb_errors, l_nb_errors,
+                                      self.nb_bytes, l_elapsed, self.nb_messages / l_elapsed,
+                                      self.nb_bytes / l_elapsed / 1e6))
+        for (l_name, l_count) in sorted(self.errors.items()):
+            stream.write('  %s : %d\n' % (l_name, l_count))
+        for (l_name, l_count) in sorted(self.input_errors.items()):
+            stream.write('  %s in the input, not decoded any further : %d\n' % (l_name, l_count))
+        if self.nb_incomplete:
+            stream.write('  Messages with fields left out of the csv columns : %d\n'
+                         % self.nb_incomplete)
+
+
+def _parse_args(argv):
+    l_parser = argparse.ArgumentParser(prog='pyabs', description='Decode binary messages.')
+    l_parser.add_argument('spec', help="the top-level field spec, as 'module:ATTRIBUTE'")
+    l_parser.add_argument('files', nargs='*', metavar='FILE',
+                          help='the input files (the standard input by default, or with -)')
+    l_parser.add_argument('--input', choices=('hex', 'binary'), default='hex',
+                          help='the input encoding (default : hex)')
+    l_parser.add_argument('--framing', choices=('lines', 'length', 'stream'), default=None,
+                          help='how the messages are delimited (default : lines for an hexadecimal '
+                               'input, stream for a binary one)')
+    l_parser.add_argument('--length-size', type=int, choices=(1, 2, 4, 8), default=2,
+                          help='the size of the message lengths, in bytes (default : 2)')
+    l_parser.add_argument('--format', choices=('pprint', 'ndjson', 'csv'), default='pprint',
+                          help='the output format (default : pprint)')
+    l_parser.add_argument('--flat', action='store_true',
+                          help='write flat dotted paths in the ndjson format')
+    l_parser.add_argument('--jobs', type=int, default=1,
+                          help='the number of decoding processes (default : 1)')
+    l_parser.add_argument('--batch-size', type=int, default=256,
+                          help='the number of messages handed to a process at once (default : 256)')
+    l_args = l_parser.parse_args(argv)
+    if l_args.framing is None:
+        l_args.framing = 'lines' if l_args.input == 'hex' else 'stream'
+    if l_args.framing == 'lines' and l_args.input != 'hex':
+        l_parser.error('the lines framing needs an hexadecimal input')
+    if l_args.jobs < 1 or l_args.batch_size < 1:
+        l_parser.error('--jobs and --batch-size must be positive')
+    return l_args
+
+
+def _open_inputs(files):
+    """Yield the binary streams of the input FILES."""
+    for l_file in files or ['-']:
+        if l_file == '-':
+            yield getattr(sys.stdin, 'buffer', sys.stdin)
+        else:
+            with open(l_file, 'rb') as l_stream:
+                yield l_stream
+
+
+def _messages(args, node, summary):
+    """Yield the (data, bit offset) of the messages of all the inputs.
+
+    The lines which cannot be converted into bytes are counted in SUMMARY.
+    """
+    for l_stream in _open_inputs(args.files):
+        if args.framing == 'lines':
+            for l_message in split_lines(l_stream, summary.add_message_error):
+                yield l_message
+            continue
+        if args.input == 'hex':
+            l_chunks = read_hex_chunks(l_stream)
+        else:
+            l_chunks = read_chunks(l_stream)
+        if args.framing == 'length':
+            l_messages = split_lengths(l_chunks, args.length_size)
+        else:
+            l_messages = split_stream(l_chunks, node)
+        for l_message in l_messages:
+            yield l_message
+
+
+def _batches(messages, batch_size, summary):
+    """Yield the lists of BATCH_SIZE messages of MESSAGES.
+
+    An error splitting the input ends the messages : it is counted in SUMMARY.
+    """
+    l_batch = []
+    try:
+        for l_message in messages:
+            l_batch.append(l_message)
+            if len(l_batch) == batch_size:
+                yield l_batch
+                l_batch = []
+    except INPUT_ERRORS as l_error:
+        summary.add_input_error(l_error)
+    if l_batch:
+        yield l_batch
+
+
+def main(argv=None, stdout=None, stderr=None):
+    """Run the command-line decoder with the arguments ARGV (sys.argv[1:] by default).
+
+    Returns the exit status : 0 if all the messages have been decoded (and written as a whole), 1
+    otherwise.
+    """
+    l_args = _parse_args(argv)
+    l_stdout = sys.stdout if stdout is None else stdout
+    l_stderr = sys.stderr if stderr is None else stderr
+    l_spec = load_spec(l_args.spec)
+    l_formatter = AbsMessageFormatter(l_spec, l_args.format, l_args.flat)
+    l_output = AbsOutput(l_stdout, l_args.format)
+    l_summary = AbsRunSummary()
+    l_batches = _batches(_messages(l_args, AbsFactory.compile(l_spec, root=True), l_summary),
+                         l_args.batch_size, l_summary)
+
+    try:
+        if l_args.jobs == 1:
+            for l_batch in l_batches:
+                _write_batch(l_batch, l_formatter.format_batch(l_batch), l_output, l_summary)
+        else:
+            _run_pool(l_args, l_batches, l_output, l_summary)
+    finally:
+        l_stdout.flush()
+        l_summary.report(l_stderr)
+    return 1 if l_summary.errors or l_summary.input_errors or l_summary.nb_incomplete else 0
+
+
+def _write_batch(batch, results, output, summary):
+    (l_outputs, l_errors) = results
+    summary.add_incomplete(output.write(l_outputs))
+    summary.add_batch(batch, l_outputs, l_errors)
+
+
+def _run_pool(args, batches, output, summary):
+    """Decode the BATCHES in ARGS.jobs processes, and write their outputs in order."""
+    # At most 2 batches per process are pending : the input is read as the output is written
+    l_pool = multiprocessing.Pool(args.jobs, _init_worker, (args.spec, args.format, args.flat))
+    l_pending = collections.deque()
+    try:
+        for l_batch in batches:
+            l_pending.append((l_batch, l_pool.apply_async(_format_batch, (l_batch,))))
+            while len(l_pending) > 2 * args.jobs or (l_pending and l_pending[0][1].ready()):
+                (l_done, l_result) = l_pending.popleft()
+                _write_batch(l_done, l_result.get(), output, summary)
+    finally:
+        # The batches already handed to the processes are written, even if the input fails
+        try:
+            while l_pending:
+                (l_done, l_result) = l_pending.popleft()
+                _write_batch(l_done, l_result.get(), output, summary)
+        finally:
+            l_pool.close()
+            l_pool.join()
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
@@ -0,0 +1,431 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Compact binary serialisation of AdvancedBinaryStructure trees.
+
+The text representation of a decoded tree (or its pickle) is several times bigger than the data it
+was decoded from. AdvancedBinaryStructure.to_compact() only stores the decoded values, in spec
+order, and AdvancedBinaryStructure.from_compact() rebuilds the very same tree from them, given the
+same spec :
+
+>>> l_spec = [
+...     ('my-int', 7),
+...     ('my-flag', 1, TAGGED),
+...     [SWITCH, 'my-flag', {
+...        False: 'my-optional-section',
+...        True: [DYN_ARRAY, 'my-dyn-array', NB_ELTS, 8, AbsFieldAscii]
+...      }],
+... ]
+>>> l_abs = AdvancedBinaryStructure('0302414243DEAD', l_spec)
+>>> l_compact = l_abs.to_compact()
+>>> l_loaded = AdvancedBinaryStructure.from_compact(l_compact, l_spec)
+>>> l_loaded.pprint(verbose=True)
+{'data': '0302414243DEAD',
+ 'decoded_data': {'my-int': 1 (0x01),
+                  'my-flag': True <TAGGED>,
+                  'my-dyn-array': {'length': 2 elements (0x02),
+                                   'data': [A (0x41), B (0x42)]}},
+ 'remaining_data': '43DEAD',
+ 'statistics': {'decoded': '4 bytes + 0 bits',
+                'remaining': '3 bytes + 0 bits'}}
+
+The fields are only rebuilt when they are first accessed : the bit width and the size of the
+stored values of each Struct and Dynamic Array field are stored along with them, so that
+from_compact() skips their values. Their fields are rebuilt when their items are first read, and
+they then turn into regular AbsFieldStruct and AbsFieldDynArray objects :
+
+>>> l_loaded = AdvancedBinaryStructure.from_compact(l_compact, l_spec)
+>>> l_decoded_data = l_loaded['decoded_data']
+>>> type(l_decoded_data).__name__, l_decoded_data.bit_width()
+('_AbsLazyStruct', 32)
+>>> l_decoded_data['my-int']
+1 (0x01)
+>>> type(l_decoded_data).__name__, type(l_decoded_data['my-dyn-array']).__name__
+('AbsFieldStruct', '_AbsLazyDynArray')
+
+Likewise, the raw data and the original data are only rebuilt from the values when they are
+requested (Helper Class fields are rebuilt by their class, from their stored raw data) :
+
+>>> l_loaded['decoded_data']['my-dyn-array'].raw_data(as_hex=True)
+'024142'
+>>> l_loaded['data']
+'0302414243DEAD'
+
+Loading with a different spec is refused. Since the values of a field are only read when it is
+rebuilt, a corrupted compact serialisation may only be detected then (an AbsCompactError exception
+is raised as well) :
+
+>>> AdvancedBinaryStructure.from_compact(l_compact, l_spec[:2])  # doctest: +IGNORE_EXCEPTION_DETAIL
+Traceback (most recent call last):
+...
+AbsCompactError
+"""
+import binascii
+import collections
+
+try:
+    from .AdvancedBinaryStructure import *
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+
+
+class AbsCompact(object):
+    """Compact binary serialisation of decoded trees.
+
+    Layout :
+    - a header : the MAGIC string, the format VERSION (1 byte) and the first FINGERPRINT_SIZE
+      bytes of the spec fingerprint,
+    - the remaining (not decoded) data : its size in bytes (varint) followed by the bytes,
+    - the decoded values, in spec order :
+      - Placeholder fields : nothing,
+      - Boolean fields : 1 byte,
+      - Integer fields : the value (varint),
+      - Helper Class fields : the raw data (as many bytes as needed for the bit width),
+      - Switch fields : the index of the chosen branch, in the sorted branch keys (varint),
+        followed by the branch field,
+      - Struct fields : the bit width of the field and the size in bytes of its values (varints),
+        followed by each field,
+      - Dynamic Array fields : the bit width of the field and the size in bytes of its values, the
+        header value and the number of elements (varints), followed by each element.
+
+    All varints are unsigned LEB128 integers.
+    """
+    MAGIC = b'ABS'
+    VERSION = 2
+    FINGERPRINT_SIZE = 8
+
+    def __init__(self, compact=None):
+        self._buffer = bytearray() if compact is None else bytearray(compact)
+        self._pos = 0
+        self._end = len(self._buffer)
+
+    @staticmethod
+    def dumps(spec, decoded_data, remaining_data):
+        l_writer = AbsCompact()
+        l_writer._buffer.extend(AbsCompact._header(spec))
+        l_remaining = binascii.unhexlify(remaining_data)
+        l_writer._write_varint(len(l_remaining))
+        l_writer._buffer.extend(l_remaining)
+        l_writer._dump(('root', list(spec)), decoded_data, None)
+        return bytes(l_writer._buffer)
+
+    @staticmethod
+    def loads(spec, compact):
+        """Return the decoded data (whose fields are rebuilt on first access) and the remaining
+        data (an hexadecimal string) stored in COMPACT, given the same SPEC."""
+        l_reader = AbsCompact(compact)
+        l_header = AbsCompact._header(spec)
+        if l_reader._read_bytes(len(l_header)) != l_header:
+            raise AbsCompactError
+        l_remaining = l_reader._read_bytes(l_reader._read_varint())
+        l_decoded_data = l_reader._load(('root', list(spec)))
+        if l_reader._pos != l_reader._end:
+            raise AbsCompactError
+        return l_decoded_data, str(binascii.hexlify(l_remaining).decode('ascii').upper())
+
+    @staticmethod
+    def _header(spec):
+        l_fingerprint = binascii.unhexlify(AbsFactory.fingerprint(list(spec)))
+        return bytearray(AbsCompact.MAGIC) + bytearray([AbsCompact.VERSION]) + \
+            bytearray(l_fingerprint[:AbsCompact.FINGERPRINT_SIZE])
+
+    @staticmethod
+    def _switch_keys(spec):
+        return sorted(spec[2].keys(), key=repr)
+
+    def _dump(self, spec, field, context):
+        l_spec_type = AbsFactory.spec_type(spec)
+
+        if l_spec_type == SPEC_PLACEHOLDER:
+            pass
+        elif l_spec_type == SPEC_BOOLEAN:
+            self._buffer.append(1 if field.value() else 0)
+        elif l_spec_type == SPEC_INTEGER:
+            self._write_varint(field.value())
+        elif l_spec_type == SPEC_HELPER_CLASS:
+            self._buffer.extend(field.raw_data())
+        elif l_spec_type in (SPEC_STRUCT, SPEC_DYN_ARRAY):
+            # The values are written apart, so that their size can be written first
+            l_values = AbsCompact()
+            if l_spec_type == SPEC_STRUCT:
+                l_values._dump_struct(spec, field, context)
+            else:
+                l_values._dump_dyn_array(spec, field)
+            self._write_varint(field.bit_width())
+            self._write_varint(len(l_values._buffer))
+            self._buffer.extend(l_values._buffer)
+        elif l_spec_type == SPEC_SWITCH:
+            l_keys = AbsCompact._switch_keys(spec)
+            l_index = l_keys.index(AbsFactory.switch_table(spec).key(context[spec[1]].value()))
+            self._write_varint(l_index)
+            self._dump(spec[2][l_keys[l_index]], field, context)
+        else:
+            raise AbsFieldSpecError
+
+    def _dump_struct(self, spec, field, context):
+        l_context = {} if context is None else context
+        for (l_spec, l_child) in zip(spec[1], field.values()):
+            self._dump(l_spec, l_child, l_context)
+            if l_child.is_tagged():
+                l_context[l_child.id()] = l_child
+
+    def _dump_dyn_array(self, spec, field):
+        l_child_spec = AbsFieldDynArray.child_spec(spec)
+        self._write_varint(list(field.values())[0].value())
+        self._write_varint(len(field['data']))
+        for l_element in field['data']:
+            self._dump(l_child_spec, l_element, None)
+
+    def _load(self, spec):
+        l_spec_type = AbsFactory.spec_type(spec)
+
+        if l_spec_type == SPEC_PLACEHOLDER:
+            return AbsFieldPlaceholder(spec)
+        elif l_spec_type == SPEC_BOOLEAN:
+            return AbsFieldBoolean._from_value(spec, bool(self._read_bytes(1)[0]))
+        elif l_spec_type == SPEC_INTEGER:
+            return AbsFieldInteger._from_value(spec, self._read_varint())
+        elif l_spec_type == SPEC_HELPER_CLASS:
+            # Helper classes are rebuilt from their own raw data only
+            return AbsFactory.make(spec, self._read_bytes((spec[1] + 7) // 8))
+        elif l_spec_type in (SPEC_STRUCT, SPEC_DYN_ARRAY):
+            # Only the bit width is read : the values are skipped, and read on first access
+            l_class = _AbsLazyStruct if l_spec_type == SPEC_STRUCT else _AbsLazyDynArray
+            l_field = l_class(spec)
+            l_field._bit_width = self._read_varint()
+            l_size = self._read_varint()
+            l_field._values_source = (self._sub_reader(l_size), spec)
+            return l_field
+        elif l_spec_type == SPEC_SWITCH:
+            l_keys = AbsCompact._switch_keys(spec)
+            l_index = self._read_varint()
+            if l_index >= len(l_keys):
+                raise AbsCompactError
+            return self._load(spec[2][l_keys[l_index]])
+        else:
+            raise AbsFieldSpecError
+
+    def _load_struct(self, field, spec):
+        """Add the fields of the Struct FIELD (of the given SPEC), read from its values."""
+        l_bit_width = 0
+        for l_spec in spec[1]:
+            l_child = self._load(l_spec)
+            field[l_child.id()] = l_child
+            l_bit_width += l_child.bit_width()
+        self._check_loaded(field, l_bit_width)
+
+    def _load_dyn_array(self, field, spec):
+        """Add the header and the elements of the Dynamic Array FIELD (of the given SPEC), read
+        from its values."""
+        l_header_value = self._read_varint()
+        if spec[2] == NB_ELTS:
+            l_header = AbsFieldDynArray.LengthField._from_value(('length', spec[3]), l_header_value)
+        else:
+            l_header = AbsFieldDynArray.SizeField._from_value(('size', spec[3]), l_header_value)
+            l_header.set_unit_excl(spec[3], spec[2] == SIZE_EXCL)
+        # Elements may have no bit width : their number must be checked before reading them
+        l_nb_elements = self._read_varint()
+        if spec[2] == NB_ELTS and l_nb_elements != l_header_value or \
+                spec[2] != NB_ELTS and l_nb_elements > field.bit_width():
+            raise AbsCompactError
+        l_child_spec = AbsFieldDynArray.child_spec(spec)
+        l_elements = [self._load(l_child_spec) for _ in range(l_nb_elements)]
+        field[l_header.id()] = l_header
+        field['data'] = l_elements
+        self._check_loaded(field, l_header.bit_width() + sum([e.bit_width() for e in l_elements]))
+
+    def _check_loaded(self, field, bit_width):
+        if self._pos != self._end or bit_width != field.bit_width():
+            raise AbsCompactError
+
+    def _sub_reader(self, size):
+        """Return a reader of the next SIZE bytes, which are skipped."""
+        if self._pos + size > self._end:
+            raise AbsCompactError
+        l_reader = AbsCompact.__new__(AbsCompact)
+        l_reader._buffer = self._buffer
+        l_reader._pos = self._pos
+        l_reader._end = self._pos + size
+        self._pos += size
+        return l_reader
+
+    def _write_varint(self, value):
+        while value > 0x7F:
+            self._buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        self._buffer.append(value)
+
+    def _read_varint(self):
+        l_value = 0
+        l_shift = 0
+        while True:
+            l_byte = self._read_bytes(1)[0]
+            l_value |= (l_byte & 0x7F) << l_shift
+            if l_byte & 0x80 == 0:
+                return l_value
+            l_shift += 7
+
+    def _read_bytes(self, size):
+        if self._pos + size > self._end:
+            raise AbsCompactError
+        l_bytes = self._buffer[self._pos:self._pos + size]
+        self._pos += size
+        return l_bytes
+
+
+class _AbsLazyContainer(object):
+    """Mixin of the containers (Struct and Dynamic Array fields, AdvancedBinaryStructure objects)
+    whose items are only rebuilt on first access.
+
+    The methods reading or changing the items are replaced by ones which first call _load : it
+    turns the container into an instance of its _loaded_class, whose methods are then called
+    directly, and adds the items. Like the rest of the tree, the container must not be accessed by
+    several threads at once.
+    """
+    __slots__ = ()
+    _loaded_class = None
+
+    def _load(self):
+        (l_reader, l_spec) = self._values_source
+        l_lazy_class = self.__class__
+        # The items are added through the methods of the loaded class
+        self.__class__ = self._loaded_class
+        try:
+            l_lazy_class._add_items(self, l_reader, l_spec)
+        except Exception:
+            collections.OrderedDict.clear(self)
+            self.__class__ = l_lazy_class
+            raise
+        del self._values_source
+
+    @staticmethod
+    def _add_items(field, reader, spec):
+        """Add the items of FIELD (of the given SPEC), read by READER."""
+        raise NotImplementedError
+
+    def __eq__(self, other):
+        self._load()
+        if isinstance(other, _AbsLazyContainer):
+            # The dict comparison reads the items of OTHER directly
+            other._load()
+        return self == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+
+def _loading_method(name):
+    def method(self, *args, **kwargs):
+        self._load()
+        return getattr(self, name)(*args, **kwargs)
+    method.__name__ = name
+    return method
+
+
+# The methods which read or change the items of an OrderedDict
+_ITEMS_METHODS = [l_name for l_name in (
+    '__getitem__', '__setitem__', '__delitem__', '__contains__', '__iter__', '__reversed__',
+    '__len__', '__repr__', '__reduce__', '__sizeof__', 'keys', 'values', 'items', 'get', 'pop',
+    'popitem', 'setdefault', 'update', 'clear', 'copy', 'move_to_end', 'has_key', 'iterkeys',
+    'itervalues', 'iteritems', 'viewkeys', 'viewvalues', 'viewitems')
+    if hasattr(collections.OrderedDict, l_name)]
+
+
+class _AbsLazyStruct(_AbsLazyContainer, AbsFieldStruct):
+    __slots__ = ()
+    _loaded_class = AbsFieldStruct
+
+    @staticmethod
+    def _add_items(field, reader, spec):
+        reader._load_struct(field, spec)
+
+
+class _AbsLazyDynArray(_AbsLazyContainer, AbsFieldDynArray):
+    __slots__ = ()
+    _loaded_class = AbsFieldDynArray
+
+    @staticmethod
+    def _add_items(field, reader, spec):
+        reader._load_dyn_array(field, spec)
+
+
+for l_class in (_AbsLazyStruct, _AbsLazyDynArray):
+    for l_name in _ITEMS_METHODS:
+        setattr(l_class, l_name, _loading_method(l_name))
+
+
+class _AbsLazyStructure(_AbsLazyContainer):
+    """Mixin of the AdvancedBinaryStructure objects built by from_compact : only their 'data' item
+    is rebuilt on first access, from the raw data of the decoded fields and the remaining data."""
+    __slots__ = ()
+
+    def _load(self):
+        # The input data is made of the decoded bits (up to the last full byte), followed by the
+        # remaining data (which starts with the last, partially decoded, byte if any)
+        l_decoded_data = collections.OrderedDict.__getitem__(self, 'decoded_data')
+        l_nb_decoded_bytes = l_decoded_data.bit_width() // 8
+        if l_nb_decoded_bytes > 0:
+            l_decoded_hex = l_decoded_data.raw_data(as_hex=True)[:l_nb_decoded_bytes * 2]
+        else:
+            l_decoded_hex = ''
+        collections.OrderedDict.__setitem__(
+            self, 'data',
+            l_decoded_hex + collections.OrderedDict.__getitem__(self, 'remaining_data'))
+        self.__class__ = self._loaded_class
+
+    def __getitem__(self, key):
+        if key == 'data':
+            self._load()
+        return collections.OrderedDict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        if key == 'data':
+            self._load()
+        return collections.OrderedDict.get(self, key, default)
+
+
+for l_name in _ITEMS_METHODS:
+    # The keys are all there from the start
+    if l_name not in ('__getitem__', 'get', '__contains__', '__iter__', '__reversed__', '__len__',
+                      'keys', 'has_key', 'iterkeys', 'viewkeys'):
+        setattr(_AbsLazyStructure, l_name, _loading_method(l_name))
+
+# The lazy subclasses of the AdvancedBinaryStructure classes
+_lazy_structure_classes = {}
+
+
+def lazy_structure_class(cls):
+    """Return the subclass of the AdvancedBinaryStructure class CLS whose 'data' item is rebuilt on
+    first access (see AdvancedBinaryStructure.from_compact)."""
+    l_class = _lazy_structure_classes.get(cls)
+    if l_class is None:
+        l_class = type(cls.__name__, (_AbsLazyStructure, cls),
+                       {'__slots__': (), '_loaded_class': cls})
+        l_class = _lazy_structure_classes.setdefault(cls, l_class)
+    return l_class
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
@@ -0,0 +1,264 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Structural comparison of two payloads decoded with the same spec.
+
+AbsFactory.diff returns the fields whose values differ between two payloads, as a list of
+(path, old value, new value) tuples. The paths are dotted, just like the flat decoded values (see
+AbsFactory.decode_values) :
+
+>>> l_spec = [
+...     ('seq', 16),
+...     ('status', [('mode', 4), ('level', 12)]),
+...     [DYN_ARRAY, 'names', NB_ELTS, 8, [('name', 16, AbsFieldAscii), ('age', 8)]],
+... ]
+>>> AbsFactory.diff(l_spec, '0001' + '1FFF' + '02' + '414220' + '434421',
+...                         '0002' + '1FFF' + '02' + '414220' + '434422')
+[('seq', 1, 2), ('names.data.1.age', 33, 34)]
+
+The payloads are compared bitwise before being decoded : the bit width of each subtree is computed
+without decoding it (see AbsFactory.measure), and the subtrees whose bits are identical are
+skipped. The elements of fixed width of Dynamic Arrays are compared by halves, down to the differing
+ones. Only the fields lying in the differing regions are decoded, so that the cost of comparing
+two mostly unchanged payloads depends on the size of their changes, rather than on their size.
+
+The elements added to or removed from a Dynamic Array are reported with a None value on the side
+they are missing from. Likewise, when a tagged value selects different Switch branches :
+
+>>> l_spec = [
+...     ('type', 8, TAGGED),
+...     [SWITCH, 'type', {1: ('number', 8), 2: ('letter', 8, AbsFieldAscii)}],
+...     [DYN_ARRAY, 'ids', NB_ELTS, 8],
+... ]
+>>> for l_change in AbsFactory.diff(l_spec, '01' + '41' + '0107', '02' + '41' + '020709'):
+...     print(l_change)
+('type', 1, 2)
+('number', 65, None)
+('letter', None, 'A')
+('ids.length', 1, 2)
+('ids.data.1', None, 9)
+"""
+try:
+    from .AdvancedBinaryStructure import *
+    from .AbsValueDecoder import AbsMeasurer, AbsValueDecoder
+    from . import HexUtils
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+    from AbsValueDecoder import AbsMeasurer, AbsValueDecoder
+    import HexUtils
+
+
+class AbsDiffer(object):
+    """Compares two payloads decoded with the same spec, see AbsFactory.diff.
+
+    A differ can be used by several threads at the same time : all the state of a comparison is kept
+    by the diff call.
+    """
+    def __init__(self, separator='.'):
+        self._separator = separator
+        self._measurer = AbsMeasurer()
+        self._decoder = AbsValueDecoder()
+
+    def diff(self, node, data_a, data_b, offset_a=0, offset_b=0):
+        """Return the (path, old value, new value) tuples of the fields which differ between DATA_A
+        (decoded from OFFSET_A) and DATA_B (decoded from OFFSET_B), according to the root struct
+        NODE."""
+        l_changes = []
+        self._diff_struct(node, HexUtils.byte_view(data_a), offset_a, {},
+                          HexUtils.byte_view(data_b), offset_b, {}, '', l_changes)
+        return l_changes
+
+    def _diff(self, node, data_a, offset_a, context_a, data_b, offset_b, context_b, prefix,
+              changes, path=None):
+        """Compare the field NODE of both payloads, adding its differences to CHANGES.
+
+        Returns the bit width of the field in each payload.
+        """
+        l_node_a = node
+        while l_node_a.spec_type == SPEC_SWITCH:
+            l_node_a = AbsValueDecoder._select_branch(l_node_a, context_a)
+        l_node_b = node
+        while l_node_b.spec_type == SPEC_SWITCH:
+            l_node_b = AbsValueDecoder._select_branch(l_node_b, context_b)
+
+        if l_node_a is not l_node_b:
+            # Different Switch branches : nothing in common
+            (l_value_a, l_width_a) = self._decode(l_node_a, data_a, offset_a, context_a)
+            (l_value_b, l_width_b) = self._decode(l_node_b, data_b, offset_b, context_b)
+            if l_node_a.id == l_node_b.id:
+                changes.append((prefix + l_node_a.id, l_value_a, l_value_b))
+            else:
+                changes.append((prefix + l_node_a.id, l_value_a, None))
+                changes.append((prefix + l_node_b.id, None, l_value_b))
+            return l_width_a, l_width_b
+
+        l_node = l_node_a
+        if path is None:
+            l_path = prefix + l_node.id
+        else:
+            l_path = path
+        if l_node.spec_type == SPEC_STRUCT:
+            return self._diff_struct(l_node, data_a, offset_a, context_a, data_b, offset_b,
+                                     context_b, l_path + self._separator, changes)
+        elif l_node.spec_type == SPEC_DYN_ARRAY:
+            return self._diff_dyn_array(l_node, data_a, offset_a, data_b, offset_b, l_path,
+                                        changes)
+
+        if HexUtils.bits_equal(data_a, offset_a, data_b, offset_b, l_node.fixed_width):
+            if l_node.is_tagged:
+                # Needed by the Switch fields of both payloads
+                l_value = self._decode(l_node, data_a, offset_a, context_a)[0]
+                self._add_tag(l_node, l_value, context_b)
+        else:
+            l_value_a = self._decode(l_node, data_a, offset_a, context_a)[0]
+            l_value_b = self._decode(l_node, data_b, offset_b, context_b)[0]
+            if l_value_a != l_value_b:
+                changes.append((l_path, l_value_a, l_value_b))
+        return l_node.fixed_width, l_node.fixed_width
+
+    def _diff_struct(self, node, data_a, offset_a, context_a, data_b, offset_b, context_b, prefix,
+                     changes):
+        if node.has_tags:
+            # Measuring the struct adds its tagged values to the contexts : keep them unchanged in
+            # case the struct has to be compared field by field
+            l_saved_a = dict(context_a)
+            l_saved_b = dict(context_b)
+        l_width_a = self._measurer._measure(node, data_a, offset_a, context_a)
+        l_width_b = self._measurer._measure(node, data_b, offset_b, context_b)
+        if l_width_a == l_width_b and \
+                HexUtils.bits_equal(data_a, offset_a, data_b, offset_b, l_width_a):
+            return l_width_a, l_width_b
+        if node.has_tags:
+            context_a.clear()
+            context_a.update(l_saved_a)
+            context_b.clear()
+            context_b.update(l_saved_b)
+
+        l_offset_a = offset_a
+        l_offset_b = offset_b
+        for l_child in node.children:
+            (l_width_a, l_width_b) = self._diff(l_child, data_a, l_offset_a, context_a,
+                                                data_b, l_offset_b, context_b, prefix, changes)
+            l_offset_a += l_width_a
+            l_offset_b += l_width_b
+        return l_offset_a - offset_a, l_offset_b - offset_b
+
+    def _diff_dyn_array(self, node, data_a, offset_a, data_b, offset_b, path, changes):
+        l_width_a = self._measurer._measure_dyn_array(node, data_a, offset_a)
+        l_width_b = self._measurer._measure_dyn_array(node, data_b, offset_b)
+        if l_width_a == l_width_b and \
+                HexUtils.bits_equal(data_a, offset_a, data_b, offset_b, l_width_a):
+            return l_width_a, l_width_b
+
+        l_header_a = HexUtils.extract_uint(data_a, offset_a, node.header_bit_width)
+        l_header_b = HexUtils.extract_uint(data_b, offset_b, node.header_bit_width)
+        if l_header_a != l_header_b:
+            if node.header_type == NB_ELTS:
+                l_header_id = 'length'
+            else:
+                l_header_id = 'size'
+            changes.append((path + self._separator + l_header_id, l_header_a, l_header_b))
+
+        # The elements are compared pairwise, as long as both payloads have some
+        l_prefix = path + self._separator + 'data' + self._separator
+        l_end_a = offset_a + l_width_a
+        l_end_b = offset_b + l_width_b
+        l_offset_a = offset_a + node.header_bit_width
+        l_offset_b = offset_b + node.header_bit_width
+        i = 0
+        l_element_width = node.element.fixed_width
+        if l_element_width:
+            # The common elements are located without being measured : compare them by halves
+            i = min(l_width_a - node.header_bit_width,
+                    l_width_b - node.header_bit_width) // l_element_width
+            self._diff_elements(node.element, data_a, l_offset_a, data_b, l_offset_b, 0, i,
+                                l_prefix, changes)
+            l_offset_a += i * l_element_width
+            l_offset_b += i * l_element_width
+        while True:
+            if node.header_type == NB_ELTS:
+                l_more_a = (i < l_header_a)
+                l_more_b = (i < l_header_b)
+            else:
+                l_more_a = (l_offset_a < l_end_a)
+                l_more_b = (l_offset_b < l_end_b)
+            if not (l_more_a or l_more_b):
+                break
+            elif not l_more_a:
+                (l_value, l_width_b) = self._decode(node.element, data_b, l_offset_b, {})
+                changes.append((l_prefix + str(i), None, l_value))
+                l_width_a = 0
+            elif not l_more_b:
+                (l_value, l_width_a) = self._decode(node.element, data_a, l_offset_a, {})
+                changes.append((l_prefix + str(i), l_value, None))
+                l_width_b = 0
+            else:
+                (l_width_a, l_width_b) = self._diff(node.element, data_a, l_offset_a, {},
+                                                    data_b, l_offset_b, {}, l_prefix, changes,
+                                                    l_prefix + str(i))
+            l_offset_a += l_width_a
+            l_offset_b += l_width_b
+            i += 1
+        return l_offset_a - offset_a, l_offset_b - offset_b
+
+    def _diff_elements(self, element, data_a, offset_a, data_b, offset_b, first, nb_elements,
+                       prefix, changes):
+        """Compare the NB_ELEMENTS fixed-width ELEMENTs of both arrays starting at index FIRST
+        (OFFSET_A and OFFSET_B being the offsets of the first element of the arrays).
+
+        The ranges of identical elements are skipped with a single bitwise comparison, so that only
+        about log2(NB_ELEMENTS) comparisons are needed per differing element.
+        """
+        l_start = first * element.fixed_width
+        if nb_elements == 0 or \
+                HexUtils.bits_equal(data_a, offset_a + l_start, data_b, offset_b + l_start,
+                                    nb_elements * element.fixed_width):
+            return
+        if nb_elements == 1:
+            self._diff(element, data_a, offset_a + l_start, {}, data_b, offset_b + l_start, {},
+                       prefix, changes, prefix + str(first))
+            return
+        l_half = nb_elements // 2
+        self._diff_elements(element, data_a, offset_a, data_b, offset_b, first, l_half, prefix,
+                            changes)
+        self._diff_elements(element, data_a, offset_a, data_b, offset_b, first + l_half,
+                            nb_elements - l_half, prefix, changes)
+
+    def _decode(self, node, data, offset, context):
+        """Fully decode the field NODE, returning its value and bit width."""
+        (l_value, l_bit_width) = self._decoder._decoders[node.spec_type](node, data, offset,
+                                                                        context, None)
+        if node.is_tagged:
+            self._add_tag(node, l_value, context)
+        return l_value, l_bit_width
+
+    @staticmethod
+    def _add_tag(node, value, context):
+        if node.id in context:
+            raise AbsDecodingError
+        context[node.id] = value
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
@@ -0,0 +1,330 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Incremental decoding of edited data.
+
+AdvancedBinaryStructure.edit replaces some bytes of the data, and decodes the data again : only the
+fields lying in the edited bytes are decoded again, rather than the whole data.
+
+>>> l_abs = AdvancedBinaryStructure('01' + '03' + '0041' + '0142' + '0243' + '414243', [
+...     ('my-type', 8, TAGGED),
+...     [DYN_ARRAY, 'my-list', NB_ELTS, 8, [('my-id', 8), ('my-letter', 8, AbsFieldAscii)]],
+...     [SWITCH, 'my-type', {1: ('my-str', 24, AbsFieldAscii), 2: ('my-int', 24)}],
+... ])
+>>> l_elements = l_abs['decoded_data']['my-list']['data']
+>>> l_abs.edit(5, '44')
+>>> l_abs['decoded_data']['my-list']['data'][1]['my-letter']
+D (0x44)
+>>> [l_element is l_old for (l_element, l_old) in zip(l_abs['decoded_data']['my-list']['data'],
+...                                                  l_elements)]
+[True, False, True]
+
+The fields following the edited ones are kept as they are, unless their layout changed : when the
+header of a Dynamic Array field changes, its elements are decoded again from the first one whose
+position changed, and the fields following the array are moved along without being decoded again
+(their bits are the same, only shifted), as long as the array ends where the data following it
+starts. Likewise, the Switch fields whose tagged value changed are decoded again :
+
+>>> l_abs.edit(1, '04' + '0345', end=2)
+>>> l_abs['data']
+'01040345004101440243414243'
+>>> l_abs['decoded_data']['my-list']['data'][0]['my-letter']
+E (0x45)
+>>> l_abs['decoded_data']['my-list']['data'][1] is l_elements[0]
+True
+>>> l_abs.edit(0, '02')
+>>> l_abs['decoded_data']['my-int']
+4276803 (0x414243)
+
+The decoded tree is rebuilt along the path to the edited fields : the fields and containers of the
+previous tree are not modified, and the previous tree is left unchanged if the edited data cannot be
+decoded.
+
+>>> l_abs.edit(1, '05')  # doctest: +IGNORE_EXCEPTION_DETAIL
+Traceback (most recent call last):
+...
+HexUtilsInputSizeError
+>>> len(l_abs['decoded_data']['my-list']['data'])
+4
+
+Successive edits give the same tree as decoding the edited data from scratch :
+
+>>> l_spec = [
+...     ('my-type', 8, TAGGED),
+...     [DYN_ARRAY, 'my-list', NB_ELTS, 8, [('my-id', 8), ('my-letter', 8, AbsFieldAscii)]],
+...     [SWITCH, 'my-type', {1: ('my-str', 8, AbsFieldAscii), 2: ('my-int', 8)}],
+... ]
+>>> l_abs = AdvancedBinaryStructure('01' + '01' + '0041' + '5A', l_spec)
+>>> l_abs.edit(1, '02' + '0041' + '0142', end=4)
+>>> l_abs.edit(0, '02')
+>>> l_abs['data']
+'0202004101425A'
+>>> l_abs['decoded_data'] == AdvancedBinaryStructure(l_abs['data'], l_spec)['decoded_data']
+True
+>>> list(l_abs['decoded_data']['my-list']['data'][1].keys())
+['my-id', 'my-letter']
+"""
+import bisect
+import collections
+
+try:
+    from .AdvancedBinaryStructure import *
+    from .AdvancedBinaryStructure import _AbsSpecMemo
+    from . import HexUtils
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+    from AdvancedBinaryStructure import _AbsSpecMemo
+    import HexUtils
+
+
+class AbsEditor(object):
+    """Decodes edited data again, reusing the fields of the tree decoded from the data before the
+    edit, see AdvancedBinaryStructure.edit.
+
+    DATA is the edited data, in which the bytes from START (included) to END (excluded) of the
+    data before the edit have been replaced by NB_BYTES bytes.
+
+    The fields are reused when their bits are the same in both data : either they lie before the
+    edited bytes, at the same position, or after them, at a position shifted by the change of size
+    of the data. A tagged field whose value changed forces the Switch fields of the same context
+    which use it to be decoded again.
+    """
+    def __init__(self, data, start, end, nb_bytes):
+        self._data = HexUtils.byte_view(data)
+        self._edit_start = start * 8
+        self._edit_end = end * 8
+        self._shift = (nb_bytes - (end - start)) * 8
+
+    def update(self, field, node):
+        """Return the field decoded from the edited data, according to the root struct NODE,
+        FIELD being the one decoded from the data before the edit."""
+        return self._update_struct(field, node, 0, {}, set())[0]
+
+    def _is_unchanged(self, old_offset, bit_width, offset):
+        """Tells whether the field of BIT_WIDTH at OLD_OFFSET in the data before the edit has the
+        same bits at OFFSET in the edited data."""
+        if old_offset + bit_width <= self._edit_start:
+            return offset == old_offset
+        else:
+            return old_offset >= self._edit_end and offset == old_offset + self._shift
+
+    def _update(self, field, node, offset, context, changed_tags):
+        """Return the field decoded from OFFSET in the edited data according to NODE, FIELD being
+        the one decoded from the same offset in the data before the edit, along with its bit
+        width and the ids of the tagged values of CONTEXT whose value changed."""
+        if node.spec_type == SPEC_STRUCT and isinstance(field, AbsFieldStruct):
+            return self._update_struct(field, node, offset, context, changed_tags)
+        elif node.spec_type == SPEC_DYN_ARRAY and isinstance(field, AbsFieldDynArray):
+            return self._update_dyn_array(field, node, offset) + (changed_tags,)
+        else:
+            return self._make(field, node, offset, context, changed_tags)
+
+    def _make(self, field, node, offset, context, changed_tags):
+        l_field = AbsFactory.make(node.spec, HexUtils.BitReader(self._data, offset), 0, context)
+        if l_field.is_tagged():
+            _add_tagged(l_field, context, False)
+        # The tagged values of the field (and of its struct descendants) may have changed
+        (l_old_tags, l_tags) = ({}, {})
+        _get_tags(field, l_old_tags)
+        _get_tags(l_field, l_tags)
+        l_changed_tags = set(changed_tags)
+        for l_id in set(l_old_tags) | set(l_tags):
+            if l_id not in l_old_tags or l_id not in l_tags or l_old_tags[l_id] != l_tags[l_id]:
+                l_changed_tags.add(l_id)
+        return l_field, l_field.bit_width(), l_changed_tags
+
+    def _update_struct(self, field, node, offset, context, changed_tags):
+        l_children = []
+        l_old_offset = offset
+        l_offset = offset
+        for (l_node, l_child) in zip(node.children, list(field.values())):
+            l_old_bit_width = l_child.bit_width()
+            l_uses_changed_tags = bool(changed_tags) and bool(changed_tags & _used_tags(l_node))
+            if not l_uses_changed_tags and \
+                    self._is_unchanged(l_old_offset, l_old_bit_width, l_offset):
+                # Same bits and same context : the same field
+                if l_node.has_tags:
+                    _add_tagged(l_child, context, True)
+                l_bit_width = l_old_bit_width
+            elif not l_uses_changed_tags and l_offset == l_old_offset:
+                # The edit lies within the field, or right before it : the same branch is selected
+                while l_node.spec_type == SPEC_SWITCH and l_node.tag_id in context:
+                    l_node = l_node.branches.select(context[l_node.tag_id].value())
+                (l_child, l_bit_width, changed_tags) = self._update(l_child, l_node, l_offset,
+                                                                    context, changed_tags)
+            else:
+                (l_child, l_bit_width, changed_tags) = self._make(l_child, l_node, l_offset,
+                                                                  context, changed_tags)
+            l_children.append(l_child)
+            l_old_offset += l_old_bit_width
+            l_offset += l_bit_width
+
+        l_field = _copy_container(field)
+        for l_child in l_children:
+            l_field[l_child.id()] = l_child
+        _set_source(l_field, self._data, offset, l_offset - offset)
+        return l_field, l_field.bit_width(), changed_tags
+
+    def _update_dyn_array(self, field, node, offset):
+        l_field = _copy_container(field)
+        l_header_bit_width = node.header_bit_width
+        if self._is_unchanged(offset, l_header_bit_width, offset):
+            l_header = list(field.values())[0]
+        else:
+            l_header = field._make_header(HexUtils.BitReader(self._data, offset))
+        l_field[l_header.id()] = l_header
+
+        # The position of each element in the data before the edit, followed by the end of the
+        # last one
+        l_old_elements = field['data']
+        l_element_width = node.element.fixed_width
+        l_start = offset + l_header_bit_width
+        if l_element_width:
+            l_old_offsets = range(l_start, l_start + (len(l_old_elements) + 1) * l_element_width,
+                                  l_element_width)
+        else:
+            l_old_offsets = [l_start]
+            for l_element in l_old_elements:
+                l_old_offsets.append(l_old_offsets[-1] + l_element.bit_width())
+
+        if node.header_type == NB_ELTS:
+            l_nb_elements = l_header.value()
+            l_end = None
+        else:
+            l_nb_elements = None
+            l_end = field._end_position(offset, l_header)
+        l_elements = []
+        l_offset = l_start
+        while (len(l_elements) < l_nb_elements) if l_end is None else (l_offset < l_end):
+            (i, l_shift) = self._find_element(l_old_offsets, l_offset)
+            if i is not None:
+                # Reuse the elements up to the edit, or up to the end of the array
+                if l_old_offsets[i] < self._edit_start:
+                    j = bisect.bisect_right(l_old_offsets, self._edit_start) - 1
+                else:
+                    j = len(l_old_elements)
+                if l_end is None:
+                    j = min(j, i + l_nb_elements - len(l_elements))
+                else:
+                    j = min(j, bisect.bisect_left(l_old_offsets, l_end - l_shift))
+                if j > i:
+                    l_elements.extend(l_old_elements[i:j])
+                    l_offset = l_old_offsets[j] + l_shift
+                    continue
+
+            # Each element has its own context
+            i = bisect.bisect_left(l_old_offsets, l_offset)
+            if i < len(l_old_elements) and l_old_offsets[i] == l_offset:
+                (l_element, l_bit_width, _) = self._update(l_old_elements[i], node.element,
+                                                           l_offset, {}, set())
+            else:
+                l_element = AbsFactory.make(node.element.spec,
+                                            HexUtils.BitReader(self._data, l_offset))
+                l_bit_width = l_element.bit_width()
+            l_elements.append(l_element)
+            l_offset += l_bit_width
+
+        l_field['data'] = l_elements
+        _set_source(l_field, self._data, offset, l_offset - offset)
+        return l_field, l_field.bit_width()
+
+    def _find_element(self, old_offsets, offset):
+        """Return the index of the element of the data before the edit whose bits are the same as
+        the ones at OFFSET in the edited data (or None), along with the shift of its position."""
+        for l_shift in (0, self._shift):
+            i = bisect.bisect_left(old_offsets, offset - l_shift)
+            if i < len(old_offsets) - 1 and old_offsets[i] == offset - l_shift and \
+                    self._is_unchanged(old_offsets[i], old_offsets[i + 1] - old_offsets[i],
+                                       offset):
+                return i, l_shift
+        return None, None
+
+
+def _copy_container(field):
+    """Return an empty copy of the Struct or Dynamic Array FIELD (the field itself is left
+    unchanged)."""
+    l_field = field.__class__.__new__(field.__class__)
+    collections.OrderedDict.__init__(l_field)
+    # The field attributes only : the pure python OrderedDict (python 2) keeps its linked list of
+    # keys in attributes too, which must not be shared
+    for (l_name, l_value) in field.__dict__.items():
+        if l_name not in _ORDERED_DICT_ATTRIBUTES:
+            setattr(l_field, l_name, l_value)
+    return l_field
+
+
+_ORDERED_DICT_ATTRIBUTES = frozenset(getattr(collections.OrderedDict(), '__dict__', ()))
+
+
+def _set_source(field, data, offset, bit_width):
+    field._bit_width = bit_width
+    field._raw_data = None
+    if bit_width > 0:
+        field._raw_source = (data, offset)
+
+
+def _add_tagged(field, context, recursive):
+    """Add the tagged FIELD to CONTEXT, along with its tagged struct descendants if RECURSIVE."""
+    if field.is_tagged():
+        if field.id() in context:
+            raise AbsDecodingError
+        context[field.id()] = field
+    if recursive and isinstance(field, AbsFieldStruct):
+        for l_child in field.values():
+            _add_tagged(l_child, context, True)
+
+
+def _get_tags(field, tags):
+    """Add the values of the tagged FIELD and of its tagged struct descendants to TAGS."""
+    if field.is_tagged():
+        tags[field.id()] = field.value()
+    if isinstance(field, AbsFieldStruct):
+        for l_child in field.values():
+            _get_tags(l_child, tags)
+
+
+def _used_tags(node):
+    """Return the ids of the tagged values used by the Switch fields of NODE, within the context of
+    NODE (the elements of Dynamic Arrays have their own context)."""
+    l_cached = _used_tags_cache.get(node)
+    if l_cached is not None:
+        return l_cached
+    if node.spec_type == SPEC_SWITCH:
+        l_tags = set([node.tag_id])
+        for (_, l_branch) in node.branches.items():
+            l_tags |= _used_tags(l_branch)
+    elif node.spec_type == SPEC_STRUCT:
+        l_tags = set()
+        for l_child in node.children:
+            l_tags |= _used_tags(l_child)
+    else:
+        l_tags = set()
+    return _used_tags_cache.set(node, frozenset(l_tags))
+
+
+_used_tags_cache = _AbsSpecMemo(lambda node: node)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
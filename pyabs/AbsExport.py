@@ -0,0 +1,237 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Bulk export of decoded data.
+
+The exporters decode each record straight into plain python values (see
+AbsFactory.decode_values) : no AdvancedBinaryStructure tree is ever built.
+
+=========
+1. NDJSON
+=========
+
+AbsNdjsonWriter writes one JSON document per line and per record :
+
+>>> import sys
+>>> l_spec = [
+...     ('my-int', 7),
+...     ('my-flag', 1),
+...     ('my-rawdata', 16, AbsFieldRawData),
+...     [DYN_ARRAY, 'my-dyn-array', NB_ELTS, 8, AbsFieldAscii],
+... ]
+>>> l_writer = AbsNdjsonWriter(sys.stdout, l_spec)
+>>> l_writer.write('03CAFE024142')
+{"my-int":1,"my-flag":true,"my-rawdata":"CAFE","my-dyn-array":{"length":2,"data":["A","B"]}}
+>>> l_writer.write_all(['03CAFE00', '04DECA0143'])
+{"my-int":1,"my-flag":true,"my-rawdata":"CAFE","my-dyn-array":{"length":0,"data":[]}}
+{"my-int":2,"my-flag":false,"my-rawdata":"DECA","my-dyn-array":{"length":1,"data":["C"]}}
+2
+
+The records can also be flattened into dotted paths, and the raw data fields can be encoded in
+base64 rather than in hexadecimal :
+
+>>> AbsNdjsonWriter(sys.stdout, l_spec, flat=True, raw_format='base64').write('03CAFE024142')
+{"my-int":1,"my-flag":true,"my-rawdata":"yv4=","my-dyn-array.length":2,"my-dyn-array.data.0":"A","my-dyn-array.data.1":"B"}
+
+Only a subset of the fields can be exported, by giving a list of paths. A path selects the field
+and everything below it, and '*' matches any single path component (typically an array index) :
+
+>>> l_writer = AbsNdjsonWriter(sys.stdout, l_spec, paths=['my-int', 'my-dyn-array.data.*'])
+>>> l_writer.write('03CAFE024142')
+{"my-int":1,"my-dyn-array":{"data":["A","B"]}}
+>>> l_writer = AbsNdjsonWriter(sys.stdout, l_spec, flat=True, paths=['my-dyn-array.data.1'])
+>>> l_writer.write('03CAFE024142')
+{"my-dyn-array.data.1":"B"}
+
+The records can be filtered on some of their fields : the rejected ones are not decoded any further
+(see AbsFilter), and are not written.
+
+>>> l_writer = AbsNdjsonWriter(sys.stdout, l_spec, where={'my-flag': lambda flag: not flag})
+>>> l_writer.write_all(['03CAFE00', '04DECA0143'])
+{"my-int":2,"my-flag":false,"my-rawdata":"DECA","my-dyn-array":{"length":1,"data":["C"]}}
+1
+"""
+import collections
+import json
+import sys
+
+try:
+    from .AdvancedBinaryStructure import *
+    from .AbsValueDecoder import AbsValueDecoder
+    from . import HexUtils
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+    from AbsValueDecoder import AbsValueDecoder
+    import HexUtils
+
+
+class AbsPathFilter(object):
+    """Selects fields by their dotted paths.
+
+    A pattern selects the field with the same path, and every field below it. Each component of a
+    pattern is either a field id, an array index, or '*' which matches any single component.
+
+>>> l_filter = AbsPathFilter(['my-struct.my-int', 'my-dyn-array.data.*.my-flag'])
+>>> [l_filter.selects(l_path) for l_path in ['my-struct.my-int', 'my-struct.my-str',
+...                                          'my-dyn-array.data.3.my-flag', 'my-dyn-array']]
+[True, False, True, False]
+>>> [l_filter.leads_to_selection(l_path) for l_path in ['my-struct', 'my-dyn-array.data.3',
+...                                                     'my-other-struct']]
+[True, True, False]
+    """
+    def __init__(self, patterns, separator='.'):
+        self._separator = separator
+        self._patterns = [tuple(p.split(separator)) for p in patterns]
+
+    @staticmethod
+    def _matches(pattern, components):
+        return all([p == '*' or p == c for (p, c) in zip(pattern, components)])
+
+    def selects(self, path):
+        """Tells whether the field at PATH (or one of its parents) is selected."""
+        l_components = tuple(path.split(self._separator))
+        return any([len(l_components) >= len(p) and self._matches(p, l_components)
+                    for p in self._patterns])
+
+    def leads_to_selection(self, path):
+        """Tells whether some field below PATH is selected."""
+        l_components = tuple(path.split(self._separator))
+        return any([len(l_components) < len(p) and self._matches(p, l_components)
+                    for p in self._patterns])
+
+    def filter_flat(self, values):
+        """Keep the selected items of a flat {path: value} dict."""
+        return collections.OrderedDict([(l_path, l_value) for (l_path, l_value) in values.items()
+                                        if self.selects(l_path)])
+
+    def filter_nested(self, values):
+        """Keep the selected parts of nested values (only the containers leading to a selected
+        field are kept)."""
+        return self._prune(values, None)[1]
+
+    def _prune(self, value, path):
+        if path is not None:
+            if self.selects(path):
+                return True, value
+            elif not self.leads_to_selection(path):
+                return False, None
+
+        l_prefix = '' if path is None else path + self._separator
+        if isinstance(value, dict):
+            l_result = collections.OrderedDict()
+            for (l_key, l_value) in value.items():
+                (l_keep, l_pruned) = self._prune(l_value, l_prefix + l_key)
+                if l_keep:
+                    l_result[l_key] = l_pruned
+            return len(l_result) > 0, l_result
+        elif isinstance(value, list):
+            l_result = []
+            for (i, l_value) in enumerate(value):
+                (l_keep, l_pruned) = self._prune(l_value, l_prefix + str(i))
+                if l_keep:
+                    l_result.append(l_pruned)
+            return len(l_result) > 0, l_result
+        else:
+            return False, None
+
+
+class AbsNdjsonWriter(object):
+    """Writes decoded records to a stream, as newline-delimited JSON.
+
+    stream
+        The output stream.
+
+    spec
+        The top-level field spec of the records (see AdvancedBinaryStructure).
+
+    flat
+        If true, each record is a single object mapping the dotted path of each field to its value.
+        Otherwise, the nesting of structs and arrays is kept.
+
+    raw_format
+        How raw data fields are encoded : 'hex' or 'base64' (a ValueError exception is raised
+        otherwise).
+
+    paths
+        If given, only the fields selected by these paths are written (see AbsPathFilter).
+
+    limits
+        If given, the resource limits enforced while decoding each record (see AbsDecodeLimits).
+
+    where
+        If given, a {path: predicate} dict : the records rejected by the predicates are not written
+        (see AbsFilter).
+    """
+    def __init__(self, stream, spec, flat=False, raw_format='hex', paths=None, limits=None,
+                 where=None):
+        if raw_format not in ('hex', 'base64'):
+            # Only strings can be written as JSON
+            raise ValueError(raw_format)
+        self._stream = stream
+        self._node = AbsFactory.compile(spec, root=True)
+        self._decoder = AbsValueDecoder(flat, raw_format=raw_format, limits=limits, where=where)
+        self._flat = flat
+        if paths is None:
+            self._filter = None
+        else:
+            self._filter = AbsPathFilter(paths)
+        if sys.version_info[0] == 2:
+            # ASCII fields are decoded into byte strings, whatever their characters
+            self._encoder = json.JSONEncoder(separators=(',', ':'), encoding='latin-1')
+        else:
+            self._encoder = json.JSONEncoder(separators=(',', ':'))
+
+    def write(self, data, offset=0):
+        """Decode DATA (an hexadecimal string or a list of bytes) and write it as one line."""
+        self._write(data, offset)
+
+    def _write(self, data, offset):
+        """Same as write, and tells whether the record has been written (not filtered)."""
+        if type(data) == str:
+            l_data = HexUtils.hex_str_to_bytes(data)
+        else:
+            l_data = data
+        l_values = self._decoder.decode(self._node, l_data, offset)[0]
+        if l_values is FILTERED:
+            return False
+        if self._filter is not None:
+            if self._flat:
+                l_values = self._filter.filter_flat(l_values)
+            else:
+                l_values = self._filter.filter_nested(l_values)
+        self._stream.write(self._encoder.encode(l_values))
+        self._stream.write('\n')
+        return True
+
+    def write_all(self, records):
+        """Write each record of the RECORDS iterable, and return the number of written records."""
+        l_nb_records = 0
+        for l_data in records:
+            if self._write(l_data, 0):
+                l_nb_records += 1
+        return l_nb_records
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
@@ -0,0 +1,180 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Memory accounting of decoded trees.
+
+memory_footprint() returns the number of bytes held by an AdvancedBinaryStructure, or by any of
+its fields and their subtrees, broken down by category :
+- values : the decoded values (integers, strings, ...),
+- raw_data : the raw data extracted from the input data (see AbsFieldMixin.raw_data),
+- containers : the field objects, the OrderedDicts and lists holding them, and their attributes,
+- input : the input data (the hexadecimal string, and the bytes the fields were decoded from).
+
+>>> l_abs = AdvancedBinaryStructure('0102414243', [
+...     ('my-int', 8),
+...     [DYN_ARRAY, 'my-str', NB_ELTS, 8, AbsFieldAscii],
+... ])
+>>> l_footprint = l_abs.memory_footprint()
+>>> list(l_footprint.keys())
+['values', 'raw_data', 'containers', 'input', 'total']
+>>> l_footprint['total'] == sum(list(l_footprint.values())[:-1])
+True
+
+The raw data is only extracted when it is first requested : until then, the fields only refer to
+the input data.
+
+>>> l_abs['decoded_data']['my-str'].memory_footprint()['raw_data']
+0
+>>> l_raw_data = l_abs['decoded_data']['my-str'].raw_data()
+>>> l_abs['decoded_data']['my-str'].memory_footprint()['raw_data'] > 0
+True
+
+Each object is counted once, however many fields refer to it : all the fields share the same input
+data. The objects which do not belong to the tree are not counted either : the field ids and other
+parts of the spec, and the objects python never allocates (None, booleans and small integers).
+
+The footprint of several trees, such as the content of a cache, is given by the footprint
+function : the objects shared by several trees are counted once.
+
+>>> l_other = AdvancedBinaryStructure('0300', [('my-int', 8), [DYN_ARRAY, 'my-str', NB_ELTS, 8]])
+>>> footprint([l_abs, l_other])['total'] > l_abs.memory_footprint()['total']
+True
+>>> footprint([l_abs, l_abs['decoded_data']]) == l_abs.memory_footprint()
+True
+"""
+import collections
+import sys
+
+try:
+    from .AdvancedBinaryStructure import *
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+
+CATEGORIES = ('values', 'raw_data', 'containers', 'input')
+
+
+def footprint(trees):
+    """Return the memory footprint of the TREES (AdvancedBinaryStructure objects or fields), as an
+    OrderedDict {category: size in bytes}, along with their 'total'."""
+    l_counter = AbsMemoryCounter()
+    for l_tree in trees:
+        l_counter.add_tree(l_tree)
+    return l_counter.footprint()
+
+
+class AbsMemoryCounter(object):
+    """Adds up the sizes of the objects of decoded trees, by category (see CATEGORIES).
+
+    Each object is counted only once : the counter remembers the ids of the objects it has seen.
+    """
+    def __init__(self):
+        self._seen = set()
+        self._sizes = dict([(l_category, 0) for l_category in CATEGORIES])
+
+    def footprint(self):
+        """Return the sizes counted so far (see the footprint function)."""
+        l_footprint = collections.OrderedDict([(l_category, self._sizes[l_category])
+                                               for l_category in CATEGORIES])
+        l_footprint['total'] = sum(l_footprint.values())
+        return l_footprint
+
+    def add(self, obj, category):
+        """Count OBJ in CATEGORY (unless it has already been counted, or is never allocated).
+
+        Tells whether OBJ has been counted.
+        """
+        if obj is None or obj is True or obj is False or \
+                (type(obj) == int and -5 <= obj <= 256) or id(obj) in self._seen:
+            return False
+        self._seen.add(id(obj))
+        self._sizes[category] += sys.getsizeof(obj)
+        return True
+
+    def add_tree(self, tree):
+        """Count an AdvancedBinaryStructure or a field, along with everything below it."""
+        if isinstance(tree, AdvancedBinaryStructure):
+            self._add_structure(tree)
+        else:
+            self._add_field(tree)
+
+    def _add_structure(self, structure):
+        if not self.add(structure, 'containers'):
+            return
+        self.add(structure.__dict__, 'containers')
+        self.add(structure['data'], 'input')
+        self.add(structure['remaining_data'], 'input')
+        l_statistics = structure['statistics']
+        if self.add(l_statistics, 'containers'):
+            for l_value in l_statistics.values():
+                self.add(l_value, 'containers')
+        self._add_field(structure['decoded_data'])
+
+    def _add_field(self, field):
+        if id(field) in self._seen:
+            return
+        self._seen.add(id(field))
+        # The field object, its attributes dict and its raw data source tuple belong to the field
+        # alone : they are counted without being remembered
+        l_size = sys.getsizeof(field) + sys.getsizeof(field.__dict__)
+        if not -5 <= field._bit_width <= 256:
+            l_size += sys.getsizeof(field._bit_width)
+        l_source = field._raw_source
+        if l_source is not None:
+            l_size += sys.getsizeof(l_source)
+            # A struct and its first field start at the same offset
+            self.add(l_source[1], 'containers')
+            self._add_input(l_source[0])
+        self._sizes['containers'] += l_size
+        self._add_value(field._value)
+        if field._raw_bits is not None:
+            self.add(field._raw_bits, 'raw_data')
+
+        if isinstance(field, AbsFieldStruct):
+            for l_child in field.values():
+                self._add_field(l_child)
+        elif isinstance(field, AbsFieldDynArray):
+            # The tuple is built for each array, its content belongs to the spec
+            self.add(field._child_spec, 'containers')
+            for (l_key, l_child) in field.items():
+                if l_key == 'data':
+                    if self.add(l_child, 'containers'):
+                        for l_element in l_child:
+                            self._add_field(l_element)
+                else:
+                    self._add_field(l_child)
+
+    def _add_value(self, value):
+        if self.add(value, 'values') and isinstance(value, (tuple, list)):
+            # Values made by user-defined helper classes
+            for l_item in value:
+                self._add_value(l_item)
+
+    def _add_input(self, data):
+        if self.add(data, 'input') and type(data) == memoryview:
+            # The bytes the view refers to
+            self.add(data.obj, 'input')
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
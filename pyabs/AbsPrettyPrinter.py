@@ -0,0 +1,314 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Streaming pretty-printer for AdvancedBinaryStructure trees.
+
+The generic pprint module formats each nested object into a full string before deciding whether it
+fits on the current line, and does it again at each nesting level. On a dynamic array of tens of
+thousands of elements, this means building (and throwing away) megabytes of intermediate strings.
+
+This printer only deals with what an AdvancedBinaryStructure tree is made of (dicts, lists and
+field objects), and writes its output to the stream as it goes :
+- dicts (and other mappings, such as AbsRecord objects) are always printed one item per line, in
+  insertion order for OrderedDicts and other mappings, and in sorted key order for plain dicts,
+- lists are printed on a single line if they fit in the remaining width, one element per line
+  otherwise. Deciding whether a list fits stops as soon as the width is exceeded, so it never
+  costs more than a line's worth of repr() calls,
+- anything else is printed using its repr().
+
+Without any limit, the output is the same as the one of the pprint module :
+
+>>> import collections
+>>> l_tree = collections.OrderedDict([
+...     ('my-int', 6),
+...     ('my-struct', collections.OrderedDict([('my-str', 'CAFE'),
+...                                            ('my-list', [1, 2, 3])])),
+...     ('my-stats', {'b': 2, 'a': 1}),
+... ])
+>>> pprint(l_tree)
+{'my-int': 6,
+ 'my-struct': {'my-str': 'CAFE',
+               'my-list': [1, 2, 3]},
+ 'my-stats': {'a': 1,
+              'b': 2}}
+
+Lists which do not fit in the given width are split, one element per line :
+
+>>> pprint({'my-list': list(range(30))}, width=40)  # doctest: +ELLIPSIS
+{'my-list': [0,
+             1,
+...
+             28,
+             29]}
+
+The max_elements argument limits the number of elements (or items) printed for each list (or dict) :
+
+>>> pprint({'my-list': list(range(50000))}, max_elements=3)
+{'my-list': [0, 1, 2, ... (49997 more elements)]}
+
+>>> pprint({'my-list': list(range(50000))}, width=30, max_elements=3)
+{'my-list': [0,
+             1,
+             2,
+             ... (49997 more elements)]}
+
+>>> pprint(collections.OrderedDict([('a', 1), ('b', 2), ('c', 3)]), max_elements=2)
+{'a': 1,
+ 'b': 2,
+ ... (1 more items)}
+
+The max_depth argument limits the number of nested levels which are printed :
+
+>>> pprint(l_tree, max_depth=1)
+{'my-int': 6,
+ 'my-struct': {...},
+ 'my-stats': {...}}
+
+>>> pprint(l_tree, max_depth=2)
+{'my-int': 6,
+ 'my-struct': {'my-str': 'CAFE',
+               'my-list': [...]},
+ 'my-stats': {'a': 1,
+              'b': 2}}
+
+Lists fitting on a single line are limited as well :
+
+>>> pprint([[1, 2], [3, [4]]], max_depth=1)
+[[...], [...]]
+>>> pprint([[1, 2], [3, [4], {'a': 1}]], max_depth=2)
+[[1, 2], [3, [...], {...}]]
+
+Empty containers are always printed as such :
+
+>>> pprint({'my-dict': {}, 'my-list': []}, max_depth=1)
+{'my-dict': {},
+ 'my-list': []}
+"""
+import collections
+import itertools
+import sys
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+def pprint(obj, stream=None, width=80, max_depth=None, max_elements=None):
+    """Pretty-print OBJ to STREAM (sys.stdout by default)."""
+    AbsPrettyPrinter(stream, width, max_depth, max_elements).pprint(obj)
+
+
+def pformat(obj, width=80, max_depth=None, max_elements=None):
+    """Return the pretty-printed representation of OBJ as a string."""
+    return AbsPrettyPrinter(None, width, max_depth, max_elements).pformat(obj)
+
+
+class AbsPrettyPrinter(object):
+    """Pretty-printer writing incrementally to a stream.
+
+    stream
+        The output stream (sys.stdout by default).
+
+    width
+        Attempted maximum number of columns in the output.
+
+    max_depth
+        Containers nested deeper than this level are printed as {...} or [...].
+
+    max_elements
+        Only the first max_elements items of each container are printed.
+    """
+    def __init__(self, stream=None, width=80, max_depth=None, max_elements=None):
+        if (max_depth is not None and max_depth < 1) or \
+                (max_elements is not None and max_elements < 0):
+            raise ValueError
+        self._stream = stream
+        self._width = width
+        self._max_depth = max_depth
+        self._max_elements = max_elements
+        self._write = None
+
+    def pprint(self, obj):
+        l_stream = self._stream if self._stream is not None else sys.stdout
+        self._write = l_stream.write
+        self._format(obj, 0, 0, 1)
+        self._write('\n')
+
+    def pformat(self, obj):
+        l_stream = StringIO()
+        self._write = l_stream.write
+        self._format(obj, 0, 0, 1)
+        return l_stream.getvalue()
+
+    def _format(self, obj, indent, allowance, level):
+        if _is_mapping(obj):
+            self._format_dict(obj, indent, allowance, level)
+        elif _is_plain_sequence(obj):
+            if len(obj) == 0:
+                self._write(repr(obj))
+            elif self._is_too_deep(level):
+                self._write('[...]' if isinstance(obj, list) else '(...)')
+            elif self._fits(obj, self._width - 1 - indent - allowance, level):
+                self._write(self._flat_repr(obj, level))
+            else:
+                self._format_sequence(obj, indent, allowance, level)
+        else:
+            self._write(repr(obj))
+
+    def _format_dict(self, obj, indent, allowance, level):
+        l_write = self._write
+        if len(obj) == 0:
+            l_write('{}')
+            return
+        if self._is_too_deep(level):
+            l_write('{...}')
+            return
+
+        l_write('{')
+        l_indent = indent + 1
+        l_items = _dict_items(obj)
+        l_nb_shown = self._nb_shown(len(obj))
+        for (i, (l_key, l_value)) in enumerate(itertools.islice(l_items, l_nb_shown)):
+            l_key_repr = repr(l_key)
+            if i > 0:
+                l_write(',\n')
+                l_write(' ' * l_indent)
+            l_write(l_key_repr)
+            l_write(': ')
+            self._format(l_value, l_indent + len(l_key_repr) + 2, allowance + 1, level + 1)
+        if l_nb_shown < len(obj):
+            if l_nb_shown > 0:
+                l_write(',\n')
+                l_write(' ' * l_indent)
+            l_write('... (%d more items)' % (len(obj) - l_nb_shown))
+        l_write('}')
+
+    def _format_sequence(self, obj, indent, allowance, level):
+        l_write = self._write
+        (l_open, l_close) = ('[', ']') if isinstance(obj, list) else ('(', ')')
+        l_write(l_open)
+        l_indent = indent + 1
+        l_nb_shown = self._nb_shown(len(obj))
+        for i in range(l_nb_shown):
+            if i > 0:
+                l_write(',\n')
+                l_write(' ' * l_indent)
+            self._format(obj[i], l_indent, allowance + 1, level + 1)
+        if l_nb_shown < len(obj):
+            if l_nb_shown > 0:
+                l_write(',\n')
+                l_write(' ' * l_indent)
+            l_write('... (%d more elements)' % (len(obj) - l_nb_shown))
+        elif isinstance(obj, tuple) and len(obj) == 1:
+            l_write(',')
+        l_write(l_close)
+
+    def _flat_repr(self, obj, level):
+        if _is_mapping(obj) and len(obj) > 0:
+            # Only printed on a single line past the max depth (see _flat_length)
+            return '{...}'
+        elif not _is_plain_sequence(obj) or len(obj) == 0:
+            return repr(obj)
+        (l_open, l_close) = ('[', ']') if isinstance(obj, list) else ('(', ')')
+        if self._is_too_deep(level):
+            return l_open + '...' + l_close
+        l_nb_shown = self._nb_shown(len(obj))
+        l_reprs = [self._flat_repr(obj[i], level + 1) for i in range(l_nb_shown)]
+        if l_nb_shown < len(obj):
+            l_reprs.append('... (%d more elements)' % (len(obj) - l_nb_shown))
+        elif isinstance(obj, tuple) and len(obj) == 1:
+            return '(%s,)' % l_reprs[0]
+        return l_open + ', '.join(l_reprs) + l_close
+
+    def _fits(self, obj, budget, level):
+        """Tells whether the single-line representation of OBJ, at the nesting LEVEL, is at most
+        BUDGET characters long.
+
+        The representation is never built : the lengths are summed up element by element, and the
+        computation stops as soon as the budget is exceeded.
+        """
+        return self._flat_length(obj, budget, level) <= budget
+
+    def _flat_length(self, obj, budget, level):
+        if _is_mapping(obj):
+            if len(obj) == 0:
+                return 2
+            # Non-empty dicts are always split on several lines, unless they are too deep
+            return 5 if self._is_too_deep(level) else budget + 1
+        elif _is_plain_sequence(obj):
+            if len(obj) > 0 and self._is_too_deep(level):
+                return 5
+            l_length = 2
+            l_nb_shown = self._nb_shown(len(obj))
+            if l_nb_shown < len(obj):
+                l_length += len(', ... (%d more elements)' % (len(obj) - l_nb_shown))
+            elif isinstance(obj, tuple) and len(obj) == 1:
+                l_length += 1
+            for i in range(l_nb_shown):
+                if i > 0:
+                    l_length += 2
+                l_length += self._flat_length(obj[i], budget - l_length, level + 1)
+                if l_length > budget:
+                    break
+            return l_length
+        else:
+            return len(repr(obj))
+
+    def _is_too_deep(self, level):
+        return self._max_depth is not None and level > self._max_depth
+
+    def _nb_shown(self, length):
+        if self._max_elements is None:
+            return length
+        else:
+            return min(length, self._max_elements)
+
+
+def _is_plain_sequence(obj):
+    """Lists and tuples whose repr() has not been overridden are split, others are atoms."""
+    l_type = type(obj)
+    return ((issubclass(l_type, list) and l_type.__repr__ is list.__repr__) or
+            (issubclass(l_type, tuple) and l_type.__repr__ is tuple.__repr__))
+
+
+def _is_mapping(obj):
+    return isinstance(obj, dict) or isinstance(obj, Mapping)
+
+
+def _dict_items(obj):
+    if isinstance(obj, collections.OrderedDict) or not isinstance(obj, dict):
+        return iter(obj.items())
+    try:
+        return iter(sorted(obj.items()))
+    except TypeError:
+        return iter(obj.items())
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
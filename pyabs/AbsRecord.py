@@ -0,0 +1,195 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Compact records for decoded structs.
+
+When many structs are decoded with the same spec, their field ids never change. Rather than giving
+each of them its own OrderedDict, AbsFactory.decode_values(..., records=True) decodes each struct
+into an AbsRecord : a mapping which only holds the tuple of its values, whose class holds the field
+ids (one class per key layout).
+
+>>> l_values = AbsFactory.decode_values([
+...     ('my-int', 7),
+...     ('my-flag', 1),
+...     [DYN_ARRAY, 'my-dyn-array', NB_ELTS, 8, [('my-id', 4), ('my-level', 4)]],
+... ], '030212AB', records=True)
+>>> l_values
+AbsRecord([('my-int', 1), ('my-flag', True), ('my-dyn-array', AbsRecord([('length', 2), ('data', [AbsRecord([('my-id', 1), ('my-level', 2)]), AbsRecord([('my-id', 10), ('my-level', 11)])])]))])
+
+Records have the same mapping interface as the OrderedDicts :
+
+>>> l_values['my-int'], l_values.get('my-str'), 'my-flag' in l_values, len(l_values)
+(1, None, True, 3)
+>>> list(l_values.keys())
+['my-int', 'my-flag', 'my-dyn-array']
+>>> [l_element['my-level'] for l_element in l_values['my-dyn-array']['data']]
+[2, 11]
+>>> l_values == AbsFactory.decode_values([
+...     ('my-int', 7),
+...     ('my-flag', 1),
+...     [DYN_ARRAY, 'my-dyn-array', NB_ELTS, 8, [('my-id', 4), ('my-level', 4)]],
+... ], '030212AB')
+True
+>>> isinstance(l_values, Mapping), isinstance(l_values, tuple)
+(True, False)
+>>> l_values['my-str']
+Traceback (most recent call last):
+...
+KeyError: 'my-str'
+
+The record classes are shared by all the records with the same key layout :
+
+>>> l_elements = l_values['my-dyn-array']['data']
+>>> type(l_elements[0]) is type(l_elements[1])
+True
+>>> type(l_elements[0])._keys
+('my-id', 'my-level')
+
+The json module only encodes the dicts as objects : records are converted through its default
+hook, which keeps their order.
+
+>>> import json
+>>> json.dumps(l_values['my-dyn-array'], default=collections.OrderedDict)
+'{"length": 2, "data": [{"my-id": 1, "my-level": 2}, {"my-id": 10, "my-level": 11}]}'
+"""
+import collections
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+try:
+    from .AdvancedBinaryStructure import *
+    from .AdvancedBinaryStructure import _AbsSpecMemo
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+    from AdvancedBinaryStructure import _AbsSpecMemo
+
+
+class AbsRecord(object):
+    """Base class of the record classes : a read-only mapping, whose values are stored in a tuple.
+
+    Each record class (see record_class) defines :
+    - _keys : the keys, in order,
+    - _index : the {key: position} dict.
+    """
+    __slots__ = ('_values',)
+    _keys = ()
+    _index = {}
+
+    def __init__(self, values):
+        self._values = tuple(values)
+
+    def __getitem__(self, key):
+        return self._values[self._index[key]]
+
+    def get(self, key, default=None):
+        l_position = self._index.get(key)
+        if l_position is None:
+            return default
+        return self._values[l_position]
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def keys(self):
+        return list(self._keys)
+
+    def values(self):
+        return list(self._values)
+
+    def items(self):
+        return list(zip(self._keys, self._values))
+
+    def __eq__(self, other):
+        if isinstance(other, AbsRecord):
+            return self._keys == other._keys and self._values == other._values
+        elif isinstance(other, Mapping):
+            return collections.OrderedDict(self.items()) == other
+        else:
+            return NotImplemented
+
+    def __ne__(self, other):
+        l_result = self.__eq__(other)
+        return l_result if l_result is NotImplemented else not l_result
+
+    # Mappings are not hashable
+    __hash__ = None
+
+    def __repr__(self):
+        return 'AbsRecord(%r)' % self.items()
+
+    def __reduce__(self):
+        # The record classes are generated : they cannot be pickled by name
+        return _make_record, (self._keys, self._values)
+
+
+Mapping.register(AbsRecord)
+
+# The record classes, by key layout, and the record classes of the struct nodes
+_record_classes = {}
+_struct_record_classes = _AbsSpecMemo(lambda node: node)
+
+
+def _make_record(keys, values):
+    return record_class(keys)(values)
+
+
+def record_class(keys):
+    """Return the record class for the given tuple of KEYS."""
+    l_class = _record_classes.get(keys)
+    if l_class is None:
+        l_class = type('AbsRecord', (AbsRecord,), {
+            '__slots__': (),
+            '_keys': keys,
+            '_index': dict([(l_key, i) for (i, l_key) in enumerate(keys)]),
+        })
+        # If another thread created the same class in the meantime, use its class
+        l_class = _record_classes.setdefault(keys, l_class)
+    return l_class
+
+
+def struct_record_class(node):
+    """Return the record class of the Struct AbsSpecNode NODE, or None if its keys depend on the
+    data (i.e. if it has Switch children)."""
+    l_cached = _struct_record_classes.get(node)
+    if l_cached is None:
+        if any([l_child.spec_type == SPEC_SWITCH for l_child in node.children]):
+            l_class = None
+        else:
+            l_class = record_class(tuple([l_child.id for l_child in node.children]))
+        # The class is wrapped in a tuple : None is cached too
+        l_cached = _struct_record_classes.set(node, (l_class,))
+    return l_cached[0]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
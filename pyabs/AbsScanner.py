@@ -0,0 +1,202 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Recovery of messages from corrupted or misaligned streams.
+
+AbsScanner looks for the messages of a stream of byte-aligned messages, and skips the data which
+cannot be decoded. Candidate messages are located with a sync pattern, if any (typically the magic
+number starting each message), using bytes.find or a compiled regular expression. Each candidate is
+then measured (see AbsFactory.measure), which rejects most of the garbage without decoding
+anything, fully decoded, and finally checked by the validity predicate, if any.
+
+>>> l_spec = [
+...     ('magic', 8),
+...     [DYN_ARRAY, 'text', NB_ELTS, 8, AbsFieldAscii],
+...     ('checksum', 8),
+... ]
+>>> l_scanner = AbsScanner(l_spec, sync=b'\\xA5',
+...                        predicate=lambda values: values['checksum'] == len(values['text']['data']))
+>>> l_report = l_scanner.scan('A502414202' + 'A5FF' + 'A5014301' + '00A5')
+>>> for l_message in l_report.messages:
+...     print('%r %r' % (l_message, l_message.values['text']['data']))
+<AbsScannedMessage at 0, 40 bits, 0 bytes skipped> ['A', 'B']
+<AbsScannedMessage at 7, 32 bits, 2 bytes skipped> ['C']
+>>> l_report.skipped, l_report.skipped_ranges
+(4, [(5, 7), (11, 13)])
+
+The offsets are in bytes. Sync patterns can also be compiled regular expressions, matching the start
+of the messages :
+
+>>> import re
+>>> l_scanner = AbsScanner(l_spec, sync=re.compile(b'[\\xA0-\\xAF]'))
+>>> [l_message.byte_offset for l_message in l_scanner.scan('A1014201FFAE014301').messages]
+[0, 5]
+
+Without any sync pattern, each byte offset is a candidate.
+"""
+try:
+    from .AdvancedBinaryStructure import *
+    from .AbsValueDecoder import AbsMeasurer, AbsValueDecoder
+    from . import HexUtils
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+    from AbsValueDecoder import AbsMeasurer, AbsValueDecoder
+    import HexUtils
+
+
+class AbsScannedMessage(object):
+    """A message found by AbsScanner.
+
+    byte_offset : the offset of the message in the data, in bytes,
+    bit_width : the bit width of the message,
+    skipped : the number of bytes skipped right before the message,
+    values : the decoded values of the message (see AbsFactory.decode_values).
+    """
+    __slots__ = ('byte_offset', 'bit_width', 'skipped', 'values')
+
+    def __init__(self, byte_offset, bit_width, skipped, values):
+        self.byte_offset = byte_offset
+        self.bit_width = bit_width
+        self.skipped = skipped
+        self.values = values
+
+    def __repr__(self):
+        return '<AbsScannedMessage at %d, %d bits, %d bytes skipped>' % (
+            self.byte_offset, self.bit_width, self.skipped)
+
+
+class AbsScanReport(object):
+    """The result of AbsScanner.scan.
+
+    messages : the AbsScannedMessage found, in order,
+    skipped : the total number of skipped bytes,
+    skipped_ranges : the (start, end) byte offsets of each skipped part of the data.
+    """
+    def __init__(self):
+        self.messages = []
+        self.skipped = 0
+        self.skipped_ranges = []
+
+    def _skip(self, start, end):
+        if end > start:
+            self.skipped += end - start
+            self.skipped_ranges.append((start, end))
+
+
+class AbsScanner(object):
+    """Finds the messages of a stream, skipping corrupted data.
+
+    spec
+        The top-level field spec of the messages (see AdvancedBinaryStructure).
+
+    sync
+        If given, the messages start with this pattern : either a byte string, or a compiled
+        regular expression (on byte strings).
+
+    predicate
+        If given, a function telling whether the decoded values of a message are valid.
+
+    limits
+        If given, the resource limits enforced while decoding each candidate (see
+        AbsDecodeLimits).
+    """
+    def __init__(self, spec, sync=None, predicate=None, limits=None):
+        self._node = AbsFactory.compile(spec, root=True)
+        self._sync = sync
+        self._predicate = predicate
+        self._measurer = AbsMeasurer()
+        self._decoder = AbsValueDecoder(limits=limits)
+
+    def scan(self, data):
+        """Find the messages of DATA (an hexadecimal string or a list of bytes), and return an
+        AbsScanReport."""
+        l_data = self._data(data)
+        l_report = AbsScanReport()
+        l_end = 0
+        for l_message in self.iter_messages(l_data):
+            l_report._skip(l_message.byte_offset - l_message.skipped, l_message.byte_offset)
+            l_report.messages.append(l_message)
+            l_end = l_message.byte_offset + (l_message.bit_width + 7) // 8
+        l_report._skip(l_end, len(l_data))
+        return l_report
+
+    def iter_messages(self, data):
+        """Generate the AbsScannedMessage found in DATA (see scan), one by one."""
+        l_data = self._data(data)
+        l_position = 0
+        l_last_end = 0
+        while l_position < len(l_data):
+            l_candidate = self._next_candidate(l_data, l_position)
+            if l_candidate < 0:
+                break
+            l_message = self._check(l_data, l_candidate)
+            if l_message is None:
+                l_position = l_candidate + 1
+            else:
+                l_message.skipped = l_candidate - l_last_end
+                yield l_message
+                # An empty message would be found again and again at the same offset
+                l_position = l_candidate + max(1, (l_message.bit_width + 7) // 8)
+                l_last_end = l_position
+
+    @staticmethod
+    def _data(data):
+        if type(data) == str:
+            return HexUtils.hex_str_to_bytes(data)
+        elif isinstance(data, (bytes, bytearray)):
+            return data
+        else:
+            # find() and regular expressions need a byte string
+            return bytes(bytearray(data))
+
+    def _next_candidate(self, data, position):
+        if self._sync is None:
+            return position
+        elif hasattr(self._sync, 'search'):
+            l_match = self._sync.search(data, position)
+            return -1 if l_match is None else l_match.start()
+        else:
+            return data.find(self._sync, position)
+
+    def _check(self, data, byte_offset):
+        """Return the AbsScannedMessage at BYTE_OFFSET, or None if there is no valid message."""
+        l_nb_bits = (len(data) - byte_offset) * 8
+        try:
+            # Cheap check first : the whole message must be there
+            l_bit_width = self._measurer.measure(self._node, data, byte_offset * 8)
+            if l_bit_width > l_nb_bits:
+                return None
+            (l_values, l_decoded_bit_width) = self._decoder.decode(self._node, data,
+                                                                   byte_offset * 8)
+        except (AbsDecodingError, HexUtils.HexUtilsError):
+            return None
+        if l_decoded_bit_width != l_bit_width:
+            return None
+        if self._predicate is not None and not self._predicate(l_values):
+            return None
+        return AbsScannedMessage(byte_offset, l_bit_width, 0, l_values)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
@@ -0,0 +1,218 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Static size analysis of specs.
+
+AbsFactory.size_info tells how much data a top-level spec needs, without any data : it returns an
+AbsSizeInfo object, whose widths are in bits.
+
+>>> l_info = AbsFactory.size_info([
+...     ('my-type', 8, TAGGED),
+...     ('my-flags', 8),
+...     [SWITCH, 'my-type', {
+...         1: ('my-int', 32),
+...         2: [DYN_ARRAY, 'my-samples', NB_ELTS, 8, [('my-id', 4), ('my-level', 12)]],
+...     }],
+...     ('my-crc', 16),
+... ])
+>>> l_info
+<AbsSizeInfo fixed_width=None fixed_prefix=16 min_width=40 max_width=4120>
+>>> l_info.depends_on
+('my-type', 'my-samples.length')
+
+- fixed_width : the bit width of the data if it does not depend on the data, None otherwise,
+- fixed_prefix : the bit width of the fields preceding the first field whose width depends on the
+  data, along with the fixed start of this field (the header of a Dynamic Array field) : the
+  position of these fields is always the same,
+- min_width, max_width : the smallest and largest bit widths of the data, the largest one being None
+  if it is not bounded (a Dynamic Array whose elements are not bounded themselves cannot be, since
+  its header bounds its number of elements, or its size),
+- depends_on : the dotted paths (see AbsFactory.decode_values) of the values the width depends on,
+  in decoding order : the headers of Dynamic Array fields, and the tagged fields selecting Switch
+  branches of different widths. The elements of Dynamic Arrays are given as '*'.
+
+A reader can thus fetch min_width bits at once, rather than peeking at the data to measure it (see
+AbsFactory.measure), and skip measuring altogether when the width is fixed :
+
+>>> l_info = AbsFactory.size_info([
+...     ('my-type', 8, TAGGED),
+...     [SWITCH, 'my-type', {1: ('my-int', 16), 2: ('my-str', 16, AbsFieldAscii)}],
+... ])
+>>> (l_info.fixed_width, l_info.depends_on)
+(24, ())
+
+The widths of Dynamic Arrays are bounded by their header : at most 255 elements for an 8-bit
+NB_ELTS header, or 255 bytes for an 8-bit SIZE_INCL header, their last element possibly going past
+the end of the array.
+
+>>> l_info = AbsFactory.size_info([
+...     [DYN_ARRAY, 'my-values', SIZE_INCL, 8, [('my-id', 4), ('my-level', 20)]],
+...     [DYN_ARRAY, 'my-list', NB_ELTS, 8, [
+...         [DYN_ARRAY, 'my-str', SIZE_EXCL, 8, AbsFieldAscii],
+...     ]],
+... ])
+>>> (l_info.min_width, l_info.max_width)
+(16, 524296)
+>>> l_info.depends_on
+('my-values.size', 'my-list.length', 'my-list.data.*.my-str.size')
+"""
+try:
+    from .AdvancedBinaryStructure import *
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+
+
+class AbsSizeInfo(object):
+    """Size of the data of a spec, see the AbsSize module."""
+    __slots__ = ('fixed_width', 'fixed_prefix', 'min_width', 'max_width', 'depends_on')
+
+    def __init__(self, fixed_prefix, min_width, max_width, depends_on=()):
+        self.fixed_width = min_width if min_width == max_width else None
+        self.fixed_prefix = fixed_prefix
+        self.min_width = min_width
+        self.max_width = max_width
+        self.depends_on = tuple(depends_on)
+
+    def __repr__(self):
+        return '<AbsSizeInfo fixed_width=%r fixed_prefix=%r min_width=%r max_width=%r>' % (
+            self.fixed_width, self.fixed_prefix, self.min_width, self.max_width)
+
+
+class AbsSizeAnalyser(object):
+    """Computes the AbsSizeInfo of compiled specs (see AbsFactory.compile)."""
+    def __init__(self, separator='.'):
+        self._separator = separator
+
+    def analyse(self, node):
+        """Return the AbsSizeInfo of the data of the root struct NODE."""
+        l_depends_on = []
+        (l_prefix, l_min, l_max) = self._analyse_children(node, '', {}, l_depends_on)
+        # A Dynamic Array header may be reached through several Switch branches
+        l_unique = []
+        for l_path in l_depends_on:
+            if l_path not in l_unique:
+                l_unique.append(l_path)
+        return AbsSizeInfo(l_prefix, l_min, l_max, l_unique)
+
+    def _path(self, prefix, field_id):
+        return prefix + self._separator + field_id if prefix else field_id
+
+    def _analyse(self, node, prefix, tags, depends_on):
+        """Return the fixed prefix, minimum and maximum widths of the child NODE of the struct at
+        the path PREFIX.
+
+        TAGS maps the ids of the tagged fields already met in the same context to their path, and
+        the paths the width depends on are appended to DEPENDS_ON.
+        """
+        if node.spec_type == SPEC_SWITCH:
+            return self._analyse_switch(node, prefix, tags, depends_on)
+        l_path = self._path(prefix, node.id)
+        if node.is_tagged:
+            tags[node.id] = l_path
+        return self._analyse_field(node, l_path, tags, depends_on)
+
+    def _analyse_field(self, node, path, tags, depends_on):
+        if node.fixed_width is not None and not node.has_tags:
+            return node.fixed_width, node.fixed_width, node.fixed_width
+        elif node.spec_type == SPEC_STRUCT:
+            return self._analyse_children(node, path, tags, depends_on)
+        elif node.spec_type == SPEC_DYN_ARRAY:
+            return self._analyse_dyn_array(node, path, depends_on)
+        else:
+            return node.fixed_width, node.fixed_width, node.fixed_width
+
+    def _analyse_children(self, node, path, tags, depends_on):
+        l_prefix = 0
+        l_min = 0
+        l_max = 0
+        l_is_fixed = True
+        for l_child in node.children:
+            (l_child_prefix, l_child_min, l_child_max) = self._analyse(l_child, path, tags,
+                                                                       depends_on)
+            if l_is_fixed:
+                l_prefix += l_child_prefix
+                l_is_fixed = (l_child_min == l_child_max)
+            l_min += l_child_min
+            l_max = None if l_max is None or l_child_max is None else l_max + l_child_max
+        return l_prefix, l_min, l_max
+
+    def _analyse_switch(self, node, prefix, tags, depends_on):
+        # The tag selects the branch : the widths of all of them are possible
+        l_depends_on = []
+        l_widths = [self._analyse(l_branch, prefix, tags, l_depends_on)
+                    for (_, l_branch) in node.branches.items()]
+        l_min = min([l_width[1] for l_width in l_widths])
+        if any([l_width[2] is None for l_width in l_widths]):
+            l_max = None
+        else:
+            l_max = max([l_width[2] for l_width in l_widths])
+        if l_min == l_max:
+            return l_min, l_min, l_max
+        depends_on.append(tags.get(node.tag_id, self._path(prefix, node.tag_id)))
+        depends_on.extend(l_depends_on)
+        return 0, l_min, l_max
+
+    def _analyse_dyn_array(self, node, path, depends_on):
+        l_header_bit_width = node.header_bit_width
+        l_max_header = (1 << l_header_bit_width) - 1
+
+        # Each element has its own context
+        l_depends_on = []
+        (_, l_element_min, l_element_max) = self._analyse_field(
+            node.element, path + self._separator + 'data' + self._separator + '*', {},
+            l_depends_on)
+        l_min = l_header_bit_width
+        if node.header_type == NB_ELTS:
+            l_header_id = 'length'
+            if l_element_max is None:
+                l_max = None
+            else:
+                l_max = l_header_bit_width + l_max_header * l_element_max
+        else:
+            # Size in multiples of the header bit width, with or without the header
+            l_header_id = 'size'
+            if node.header_type == SIZE_INCL:
+                l_max_size = (l_max_header - 1) * l_header_bit_width
+            else:
+                l_max_size = l_max_header * l_header_bit_width
+            if l_max_size <= 0 or l_element_max == 0:
+                # Elements of width 0 never reach the end of the array : it can only be empty
+                l_max = l_header_bit_width
+            elif l_element_max is None:
+                l_max = None
+            elif l_element_min == l_element_max:
+                l_max = l_header_bit_width + -(-l_max_size // l_element_max) * l_element_max
+            else:
+                # The last element starts before the end of the array
+                l_max = l_header_bit_width + l_max_size - 1 + l_element_max
+
+        if l_min == l_max:
+            return l_min, l_min, l_max
+        depends_on.append(path + self._separator + l_header_id)
+        depends_on.extend(l_depends_on)
+        return l_header_bit_width, l_min, l_max
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
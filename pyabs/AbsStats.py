@@ -0,0 +1,453 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Running statistics over the fields of many messages.
+
+AbsAggregator updates statistics of selected fields while going through the messages : neither an
+AdvancedBinaryStructure tree nor any plain values are kept. The fields are selected by their dotted
+paths (see AbsFactory.decode_values), where '*' matches any single component (typically an array
+index) :
+
+>>> l_spec = [
+...     ('type', 8),
+...     ('comment', 32, AbsFieldAscii),
+...     [DYN_ARRAY, 'samples', NB_ELTS, 8, [('channel', 4), ('level', 12)]],
+... ]
+>>> l_aggregator = AbsAggregator(l_spec)
+>>> l_aggregator.add('type', 'count', 'distinct', 'histogram')
+>>> l_aggregator.add('samples.data.*.level', 'min', 'max', 'mean', AbsHistogram(bin_width=100))
+>>> l_aggregator.add('samples.length', 'sum')
+>>> l_aggregator.feed_all(['01' + '43414645' + '02' + '1064' + '2096',
+...                        '02' + '44454341' + '01' + '10C8',
+...                        '01' + '41424344' + '00'])
+3
+>>> for (l_path, l_results) in l_aggregator.results().items():
+...     print('%s %r' % (l_path, list(l_results.items())))
+type [('count', 3), ('distinct', 2), ('histogram', [(1, 2), (2, 1)])]
+samples.data.*.level [('min', 100), ('max', 200), ('mean', 150.0), ('histogram', [(100, 2), (200, 1)])]
+samples.length [('sum', 3)]
+
+Only the selected fields are decoded : the others are skipped without being decoded, just like when
+measuring a message (see AbsFactory.measure). Above, the 'comment' field is never read.
+
+The aggregates of several aggregators with the same fields and kinds can be merged, for instance
+to gather the work of parallel workers (aggregators can be pickled to be sent between processes) :
+
+>>> l_other = AbsAggregator(l_spec)
+>>> l_other.add('type', 'count', 'distinct', 'histogram')
+>>> l_other.add('samples.data.*.level', 'min', 'max', 'mean', AbsHistogram(bin_width=100))
+>>> l_other.add('samples.length', 'sum')
+>>> l_other.feed('03' + '43414645' + '01' + '1320')
+64
+>>> l_aggregator.merge(l_other)
+>>> l_aggregator.results()['type']['histogram']
+[(1, 2), (2, 1), (3, 1)]
+>>> l_aggregator.results()['samples.data.*.level']['max']
+800
+"""
+import collections
+
+try:
+    from .AdvancedBinaryStructure import *
+    from .AbsValueDecoder import AbsMeasurer, AbsValueDecoder
+    from . import HexUtils
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+    from AbsValueDecoder import AbsMeasurer, AbsValueDecoder
+    import HexUtils
+
+
+class AbsStat(object):
+    """Base class of the aggregates : a running statistic over the values of a field.
+
+    Each aggregate defines :
+    - name : the name of its kind, under which its result is given (see AbsAggregator.results),
+    - update(value) : take a new value into account,
+    - merge(other) : take into account the values of OTHER, an aggregate of the same kind,
+    - result() : the statistic of the values so far.
+
+    new() returns an empty aggregate with the same settings.
+    """
+    name = None
+
+    def new(self):
+        return type(self)()
+
+    def update(self, value):
+        raise NotImplementedError
+
+    def merge(self, other):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+class AbsCount(AbsStat):
+    """The number of values.
+
+>>> l_stat = AbsCount()
+>>> l_stat.update(12); l_stat.update(3); l_stat.result()
+2
+    """
+    name = 'count'
+
+    def __init__(self):
+        self._count = 0
+
+    def update(self, value):
+        self._count += 1
+
+    def merge(self, other):
+        self._count += other._count
+
+    def result(self):
+        return self._count
+
+
+class AbsMin(AbsStat):
+    """The smallest value (None if there is no value).
+
+>>> l_stat = AbsMin()
+>>> l_stat.result()
+>>> l_stat.update(12); l_stat.update(3); l_stat.result()
+3
+    """
+    name = 'min'
+
+    def __init__(self):
+        self._value = None
+
+    def update(self, value):
+        if self._value is None or value < self._value:
+            self._value = value
+
+    def merge(self, other):
+        if other._value is not None:
+            self.update(other._value)
+
+    def result(self):
+        return self._value
+
+
+class AbsMax(AbsMin):
+    """The largest value (None if there is no value).
+
+>>> l_stat = AbsMax()
+>>> l_stat.update(12); l_stat.update(3); l_stat.result()
+12
+    """
+    name = 'max'
+
+    def update(self, value):
+        if self._value is None or value > self._value:
+            self._value = value
+
+
+class AbsSum(AbsStat):
+    """The sum of the values.
+
+>>> l_stat = AbsSum()
+>>> l_stat.update(12); l_stat.update(3); l_stat.result()
+15
+    """
+    name = 'sum'
+
+    def __init__(self):
+        self._sum = 0
+
+    def update(self, value):
+        self._sum += value
+
+    def merge(self, other):
+        self._sum += other._sum
+
+    def result(self):
+        return self._sum
+
+
+class AbsMean(AbsStat):
+    """The mean of the values (None if there is no value).
+
+>>> l_stat = AbsMean()
+>>> l_stat.result()
+>>> l_stat.update(12); l_stat.update(3); l_stat.result()
+7.5
+    """
+    name = 'mean'
+
+    def __init__(self):
+        self._sum = 0
+        self._count = 0
+
+    def update(self, value):
+        self._sum += value
+        self._count += 1
+
+    def merge(self, other):
+        self._sum += other._sum
+        self._count += other._count
+
+    def result(self):
+        if self._count == 0:
+            return None
+        return float(self._sum) / self._count
+
+
+class AbsHistogram(AbsStat):
+    """The number of occurrences of each value, as a sorted list of (value, count) tuples.
+
+    With BIN_WIDTH, the numeric values are gathered into bins of this width : each bin is given by
+    its lower bound.
+
+>>> l_stat = AbsHistogram(bin_width=10)
+>>> for l_value in [12, 3, 17, 25]:
+...     l_stat.update(l_value)
+>>> l_stat.result()
+[(0, 1), (10, 2), (20, 1)]
+    """
+    name = 'histogram'
+
+    def __init__(self, bin_width=None):
+        if bin_width is not None and bin_width <= 0:
+            raise ValueError
+        self._bin_width = bin_width
+        self._counts = collections.defaultdict(int)
+
+    def new(self):
+        return AbsHistogram(self._bin_width)
+
+    def update(self, value):
+        if self._bin_width is not None:
+            value -= value % self._bin_width
+        self._counts[value] += 1
+
+    def merge(self, other):
+        if other._bin_width != self._bin_width:
+            raise ValueError
+        for (l_value, l_count) in other._counts.items():
+            self._counts[l_value] += l_count
+
+    def result(self):
+        return sorted(self._counts.items())
+
+
+class AbsDistinct(AbsStat):
+    """The number of distinct values.
+
+>>> l_stat = AbsDistinct()
+>>> for l_value in ['A', 'B', 'A']:
+...     l_stat.update(l_value)
+>>> l_stat.result()
+2
+    """
+    name = 'distinct'
+
+    def __init__(self):
+        self._values = set()
+
+    def update(self, value):
+        self._values.add(value)
+
+    def merge(self, other):
+        self._values.update(other._values)
+
+    def result(self):
+        return len(self._values)
+
+
+# The aggregates which can be given by name to AbsAggregator.add
+STAT_KINDS = dict([(l_class.name, l_class) for l_class in
+                   (AbsCount, AbsMin, AbsMax, AbsSum, AbsMean, AbsHistogram, AbsDistinct)])
+
+
+class AbsAggregator(object):
+    """Updates statistics of selected fields over many messages.
+
+    spec
+        The top-level field spec of the messages (see AdvancedBinaryStructure).
+
+    separator
+        The separator of the path components.
+
+    The fields are selected by add(), and the messages given to feed() or feed_all().
+    """
+    def __init__(self, spec, separator='.'):
+        self._spec = spec
+        self._separator = separator
+        self._node = AbsFactory.compile(spec, root=True)
+        self._measurer = AbsMeasurer()
+        self._decoder = AbsValueDecoder()
+        # The aggregates, by path pattern, and the same patterns as a tree of path components :
+        # {component: subtree}, where the aggregates of a pattern are under the None key
+        self._stats = collections.OrderedDict()
+        self._tree = {}
+
+    def add(self, path, *kinds):
+        """Keep the given aggregates of the fields selected by PATH.
+
+        Each kind is either the name of an aggregate ('count', 'min', 'max', 'sum', 'mean',
+        'histogram' or 'distinct'), or an AbsStat object (such as AbsHistogram(bin_width=10)).
+        PATH must select fields holding a single value : its last component cannot be a Struct or
+        Dynamic Array field.
+        """
+        l_stats = self._stats.setdefault(path, [])
+        for l_kind in kinds:
+            if isinstance(l_kind, AbsStat):
+                l_stats.append(l_kind)
+            elif l_kind in STAT_KINDS:
+                l_stats.append(STAT_KINDS[l_kind]())
+            else:
+                raise ValueError('Unknown aggregate : %r' % (l_kind,))
+        l_tree = self._tree
+        for l_component in path.split(self._separator):
+            l_tree = l_tree.setdefault(l_component, {})
+        l_tree[None] = l_stats
+
+    def feed(self, data, offset=0):
+        """Update the aggregates with the message DATA (an hexadecimal string or a list of bytes),
+        decoded from bit OFFSET, and return its bit width."""
+        if type(data) == str:
+            l_data = HexUtils.hex_str_to_bytes(data)
+        else:
+            l_data = HexUtils.byte_view(data)
+        return self._feed_struct(self._node, l_data, offset, {}, [self._tree])
+
+    def feed_all(self, records):
+        """Update the aggregates with each message of the RECORDS iterable, and return the number of
+        messages."""
+        l_nb_records = 0
+        for l_data in records:
+            self.feed(l_data)
+            l_nb_records += 1
+        return l_nb_records
+
+    def merge(self, other):
+        """Add the aggregates of the aggregator OTHER, which must have the same paths and kinds."""
+        if list(self._stats.keys()) != list(other._stats.keys()):
+            raise ValueError
+        for (l_stats, l_other_stats) in zip(self._stats.values(), other._stats.values()):
+            if [type(s) for s in l_stats] != [type(s) for s in l_other_stats]:
+                raise ValueError
+            for (l_stat, l_other_stat) in zip(l_stats, l_other_stats):
+                l_stat.merge(l_other_stat)
+
+    def results(self):
+        """Return the results of the aggregates, as an OrderedDict {path: OrderedDict {kind:
+        result}}."""
+        return collections.OrderedDict([
+            (l_path, collections.OrderedDict([(l_stat.name, l_stat.result()) for l_stat in l_stats]))
+            for (l_path, l_stats) in self._stats.items()])
+
+    def __getstate__(self):
+        # The compiled spec, measurer and decoder are rebuilt from the spec
+        return self._spec, self._separator, list(self._stats.items())
+
+    def __setstate__(self, state):
+        (l_spec, l_separator, l_stats) = state
+        self.__init__(l_spec, l_separator)
+        for (l_path, l_path_stats) in l_stats:
+            self.add(l_path, *l_path_stats)
+
+    @staticmethod
+    def _match(trees, component):
+        """Return the subtrees of TREES selecting the path component COMPONENT."""
+        l_matches = []
+        for l_tree in trees:
+            if component in l_tree:
+                l_matches.append(l_tree[component])
+            if '*' in l_tree:
+                l_matches.append(l_tree['*'])
+        return l_matches
+
+    def _feed(self, node, data, offset, context, trees):
+        """Update the aggregates of the field NODE selected by TREES, and return its bit width."""
+        if node.spec_type == SPEC_STRUCT:
+            return self._feed_struct(node, data, offset, context, trees)
+        elif node.spec_type == SPEC_DYN_ARRAY:
+            return self._feed_dyn_array(node, data, offset, trees)
+
+        (l_value, l_bit_width) = self._decoder._decoders[node.spec_type](node, data, offset, None,
+                                                                        None)
+        if node.is_tagged:
+            if node.id in context:
+                raise AbsDecodingError
+            context[node.id] = l_value
+        for l_tree in trees:
+            for l_stat in l_tree.get(None, ()):
+                l_stat.update(l_value)
+        return l_bit_width
+
+    def _feed_struct(self, node, data, offset, context, trees):
+        l_offset = offset
+        for l_child in node.children:
+            while l_child.spec_type == SPEC_SWITCH:
+                l_child = AbsValueDecoder._select_branch(l_child, context)
+            l_trees = self._match(trees, l_child.id)
+            if l_trees:
+                l_offset += self._feed(l_child, data, l_offset, context, l_trees)
+            else:
+                # Nothing selected below this field : skip it
+                l_offset += self._measurer._measure(l_child, data, l_offset, context)
+        return l_offset - offset
+
+    def _feed_dyn_array(self, node, data, offset, trees):
+        l_header = HexUtils.extract_uint(data, offset, node.header_bit_width)
+        if node.header_type == NB_ELTS:
+            l_header_id = 'length'
+        else:
+            l_header_id = 'size'
+        for l_tree in self._match(trees, l_header_id):
+            for l_stat in l_tree.get(None, ()):
+                l_stat.update(l_header)
+
+        l_data_trees = self._match(trees, 'data')
+        if not l_data_trees:
+            return self._measurer._measure_dyn_array(node, data, offset)
+
+        if node.header_type == NB_ELTS:
+            l_end_offset = None
+        elif node.header_type == SIZE_INCL:
+            l_end_offset = offset + l_header * node.header_bit_width
+        elif node.header_type == SIZE_EXCL:
+            l_end_offset = offset + (l_header + 1) * node.header_bit_width
+        else:
+            raise AbsDecodingError
+        l_element = node.element
+        l_offset = offset + node.header_bit_width
+        i = 0
+        while (i < l_header) if l_end_offset is None else (l_offset < l_end_offset):
+            l_trees = self._match(l_data_trees, str(i))
+            if l_trees:
+                l_offset += self._feed(l_element, data, l_offset, {}, l_trees)
+            elif l_element.fixed_width:
+                l_offset += l_element.fixed_width
+            else:
+                l_offset += self._measurer._measure(l_element, data, l_offset, {})
+            i += 1
+        return l_offset - offset
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
@@ -0,0 +1,773 @@
+﻿# -*- coding: utf-8-unix -*-
+# Copyright (c) 2014 Pierre-François Gomez <pef.gomez@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+Decoding into plain python values.
+
+AbsFactory.decode_values decodes data straight into plain python values (ints, bools, strings,
+OrderedDicts and lists) : no field object is built. The field specs are first compiled into a tree
+of AbsSpecNode objects, which is cached (see AbsFactory.compile) :
+
+>>> l_spec = ('my-struct', [('my-int', 3), ('my-str', 16, AbsFieldAscii)])
+>>> l_node = AbsFactory.compile(l_spec)
+>>> l_node
+<AbsSpecNode SPEC_STRUCT 'my-struct'>
+>>> l_node.children
+(<AbsSpecNode SPEC_INTEGER 'my-int'>, <AbsSpecNode SPEC_HELPER_CLASS 'my-str'>)
+>>> AbsFactory.compile(l_spec) is l_node
+True
+
+The decoded values are returned as nested OrderedDicts (for Struct and Dynamic Array fields) and
+lists (for the elements of Dynamic Arrays) :
+
+>>> AbsFactory.decode_values([
+...     ('my-int-1', 6),
+...     ('my-tagged-field', 2, TAGGED),
+...     [SWITCH, 'my-tagged-field', {
+...        0: ('my-field-as-int', 16),
+...        2: ('my-field-as-struct', [
+...              ('my-int-1', 3),
+...              ('my-flag', 1),
+...            ])
+...      }],
+...     ('my-int-2', 4),
+...     [DYN_ARRAY, 'my-dyn-array', NB_ELTS, 8, AbsFieldRawData],
+...     ('my-str', 32, AbsFieldAscii)
+... ], 'F24302414243414645') == collections.OrderedDict([
+...     ('my-int-1', 60),
+...     ('my-tagged-field', 2),
+...     ('my-field-as-struct', collections.OrderedDict([('my-int-1', 2), ('my-flag', False)])),
+...     ('my-int-2', 3),
+...     ('my-dyn-array', collections.OrderedDict([('length', 2), ('data', ['41', '42'])])),
+...     ('my-str', 'CAFE'),
+... ])
+True
+
+With FLAT, a single OrderedDict is returned, mapping the dotted path of each field to its value :
+
+>>> for (l_path, l_value) in AbsFactory.decode_values([
+...     ('my-int', 7),
+...     ('my-struct', [
+...         ('my-flag', 1),
+...         [DYN_ARRAY, 'my-dyn-array', NB_ELTS, 8, AbsFieldAscii]
+...     ])
+... ], '0302414243', flat=True).items():
+...     print('%s = %r' % (l_path, l_value))
+my-int = 1
+my-struct.my-flag = True
+my-struct.my-dyn-array.length = 2
+my-struct.my-dyn-array.data.0 = 'A'
+my-struct.my-dyn-array.data.1 = 'B'
+
+AbsFactory.measure only computes the bit width of the data, without decoding it : only the Dynamic
+Array headers and the tagged fields selecting Switch branches are read.
+
+>>> l_spec = [
+...     ('my-type', 8, TAGGED),
+...     ('my-flags', 8),
+...     [SWITCH, 'my-type', {
+...         1: ('my-int', 32),
+...         2: [DYN_ARRAY, 'my-samples', NB_ELTS, 8, [('my-id', 4), ('my-level', 12)]],
+...     }],
+...     [DYN_ARRAY, 'my-str', SIZE_EXCL, 8, AbsFieldAscii],
+... ]
+>>> AbsFactory.measure(l_spec, '01FFCAFEDECA024142')
+72
+>>> AbsFactory.measure(l_spec, '02FF03' + 'CAFE' * 3 + '00')
+80
+
+The data only needs to hold these values : the returned width tells how much data the whole message
+needs.
+
+>>> AbsFactory.measure(l_spec, '01FFCAFEDECA09')
+128
+>>> AbsFactory.measure(l_spec, '02FF03')  # doctest: +IGNORE_EXCEPTION_DETAIL
+Traceback (most recent call last):
+...
+HexUtilsInputSizeError
+
+A sized Dynamic Array whose elements have no width can only be empty, just like when decoding it :
+
+>>> l_spec = [[DYN_ARRAY, 'my-dyn-array', SIZE_INCL, 8, ['my-placeholder']]]
+>>> l_abs = AdvancedBinaryStructure('00', l_spec)
+>>> AbsFactory.measure(l_spec, '00'), l_abs['decoded_data'].bit_width()
+(8, 8)
+>>> AbsFactory.measure(l_spec, '02')  # doctest: +IGNORE_EXCEPTION_DETAIL
+Traceback (most recent call last):
+...
+AbsDecodingError
+
+The decode limits (see AbsDecodeLimits) are enforced just like in AdvancedBinaryStructure :
+
+>>> AbsFactory.decode_values([
+...     [DYN_ARRAY, 'my-dyn-array', SIZE_EXCL, 8]
+... ], '0443414645', limits=AbsDecodeLimits(max_array_elements=3))  # doctest: +IGNORE_EXCEPTION_DETAIL
+Traceback (most recent call last):
+...
+AbsLimitExceededError: max_array_elements (3) exceeded : 4
+
+Both count the same objects for max_objects, even though no field object is built here :
+
+>>> def count_objects(spec, hex_str, max_objects):
+...     l_limits = AbsDecodeLimits(max_objects=max_objects)
+...     for l_decode in [lambda: AdvancedBinaryStructure(hex_str, spec, limits=l_limits),
+...                      lambda: AbsFactory.decode_values(spec, hex_str, limits=l_limits)]:
+...         try:
+...             l_decode()
+...         except Exception as l_error:
+...             print(l_error)
+>>> count_objects([[DYN_ARRAY, 'my-dyn-array', NB_ELTS, 8, AbsFieldAscii]], '0443414645', 6)
+max_objects (6) exceeded : 7
+max_objects (6) exceeded : 7
+>>> count_objects([('my-struct', [('my-int-1', 4), ('my-int-2', 4), ('my-int-3', 8)])], 'CAFE', 4)
+max_objects (4) exceeded : 5
+max_objects (4) exceeded : 5
+
+With WHERE, predicates on some of the fields are checked before decoding anything else, and FILTERED
+is returned as soon as one of them is false (see AbsFilter) :
+
+>>> l_spec = [
+...     ('my-type', 8, TAGGED),
+...     [SWITCH, 'my-type', {
+...         1: [DYN_ARRAY, 'my-samples', NB_ELTS, 8, [('my-level', 16)]],
+...         2: ('my-heartbeat', 8),
+...     }],
+... ]
+>>> AbsFactory.decode_values(l_spec, '0201', where={'my-type': lambda value: value == 1})
+'FILTERED'
+>>> AbsFactory.decode_values(l_spec, '0101CAFE', flat=True,
+...                          where={'my-type': lambda value: value == 1})['my-samples.data.0.my-level']
+51966
+"""
+import base64
+import collections
+
+try:
+    from .AdvancedBinaryStructure import *
+    from . import AbsRecord
+    from . import HexUtils
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    from AdvancedBinaryStructure import *
+    import AbsRecord
+    import HexUtils
+
+
+class AbsSpecNode(object):
+    """Pre-analysed field spec, see AbsFactory.compile.
+
+    Each node holds the type of its field spec (SPEC_xxx) and the information needed to decode it :
+    - spec : the original field spec,
+    - id : the field id (the dyn-array id for Dynamic Array fields, None for Switch fields),
+    - bit_width : the bit width of Boolean, Integer and Helper Class fields (0 otherwise),
+    - helper_class : the helper class of Helper Class fields,
+    - is_tagged : whether the field is tagged,
+    - children, runs : the child nodes of Struct fields, and their layout (see
+      AbsFactory.struct_layout),
+    - tag_id, branches : the tagged field id and the branches of Switch fields (an AbsSwitchTable
+      of nodes),
+    - header_type, header_bit_width, element : the header type, header bit width and element
+      node of Dynamic Array fields,
+    - fixed_width : the bit width of the field if it does not depend on the data, None otherwise,
+    - has_tags : whether decoding the field adds tagged values to the enclosing context (the
+      field itself or one of its Struct or Switch descendants is tagged).
+
+    The nodes are shared by all the threads decoding data with the same spec : they are read-only
+    once built.
+
+>>> l_node = AbsSpecNode(('my-int', 3))
+>>> l_node.bit_width = 4
+Traceback (most recent call last):
+...
+AttributeError: AbsSpecNode objects are read-only
+    """
+    __slots__ = ('spec', 'spec_type', 'id', 'bit_width', 'helper_class', 'is_tagged', 'children',
+                 'runs', 'tag_id', 'branches', 'header_type', 'header_bit_width', 'element',
+                 'fixed_width', 'has_tags')
+
+    def __init__(self, spec):
+        # The node is built as an _AbsSpecNodeBuilder, whose attributes can be set
+        object.__setattr__(self, '__class__', _AbsSpecNodeBuilder)
+        self.spec = spec
+        self.spec_type = AbsFactory.spec_type(spec)
+        self.id = None
+        self.bit_width = 0
+        self.helper_class = None
+        self.is_tagged = False
+        self.children = ()
+        self.runs = ()
+        self.tag_id = None
+        self.branches = None
+        self.header_type = None
+        self.header_bit_width = 0
+        self.element = None
+        self.fixed_width = None
+        self.has_tags = False
+
+        if self.spec_type == SPEC_PLACEHOLDER:
+            self.id = spec if type(spec) == str else spec[0]
+            self.fixed_width = 0
+        elif self.spec_type in (SPEC_BOOLEAN, SPEC_INTEGER):
+            self.id = spec[0]
+            self.bit_width = spec[1]
+            self.is_tagged = (len(spec) == 3)
+            self.fixed_width = self.bit_width
+        elif self.spec_type == SPEC_HELPER_CLASS:
+            self.id = spec[0]
+            self.bit_width = spec[1]
+            self.helper_class = spec[2]
+            self.is_tagged = (len(spec) == 4)
+            self.fixed_width = self.bit_width
+        elif self.spec_type == SPEC_STRUCT:
+            self.id = spec[0]
+            self.children = tuple([AbsSpecNode(s) for s in spec[1]])
+            self.runs = AbsFactory.struct_layout(spec[1])
+            if all([c.fixed_width is not None for c in self.children]):
+                self.fixed_width = sum([c.fixed_width for c in self.children])
+            self.has_tags = any([c.has_tags for c in self.children])
+        elif self.spec_type == SPEC_SWITCH:
+            # The width of a Switch field always depends on the data : the tag selects the branch
+            self.tag_id = spec[1]
+            l_branches = dict([(k, AbsSpecNode(s)) for (k, s) in spec[2].items()])
+            self.branches = AbsSwitchTable(l_branches)
+            self.has_tags = any([b.has_tags for b in l_branches.values()])
+        elif self.spec_type == SPEC_DYN_ARRAY:
+            # Each element has its own context : its tagged values do not go up to the array
+            self.id = spec[1]
+            self.header_type = spec[2]
+            self.header_bit_width = spec[3]
+            self.element = AbsSpecNode(AbsFieldDynArray.child_spec(spec))
+        self.has_tags = self.has_tags or self.is_tagged
+        self.__class__ = AbsSpecNode
+
+    def __setattr__(self, name, value):
+        raise AttributeError('AbsSpecNode objects are read-only')
+
+    def __getstate__(self):
+        # A plain tuple, in slots order : smaller and faster to load than the default state
+        return tuple([getattr(self, l_slot) for l_slot in AbsSpecNode.__slots__])
+
+    def __setstate__(self, state):
+        object.__setattr__(self, '__class__', _AbsSpecNodeBuilder)
+        for (l_slot, l_value) in zip(AbsSpecNode.__slots__, state):
+            setattr(self, l_slot, l_value)
+        self.__class__ = AbsSpecNode
+
+    def __repr__(self):
+        return '<AbsSpecNode %s %r>' % (self.spec_type, self.id)
+
+
+class _AbsSpecNodeBuilder(AbsSpecNode):
+    """An AbsSpecNode under construction (same layout, but its attributes can be set)."""
+    __slots__ = ()
+    __setattr__ = object.__setattr__
+
+
+class AbsValueDecoder(object):
+    """Decodes data into plain python values, without building any field object.
+
+    See AbsFactory.decode_values. Raw data fields are decoded into hexadecimal strings (just like
+    AbsFieldRawData.value()), into base64 strings if RAW_FORMAT is 'base64', or into bytes if it is
+    'bytes'.
+
+    With RECORDS, structs are decoded into AbsRecord objects rather than OrderedDicts (see the
+    AbsRecord module).
+
+    With WHERE, a {path: predicate} dict, the data rejected by the predicates is not decoded :
+    FILTERED is returned instead of its values (see AbsFilter).
+
+    A decoder can be used by several threads at the same time : all the state of a decoding is kept
+    by the decode call.
+    """
+    def __init__(self, flat=False, separator='.', raw_format='hex', limits=None, records=False,
+                 where=None):
+        if raw_format not in ('hex', 'base64', 'bytes') or (flat and records):
+            raise ValueError
+        self._flat = flat
+        self._records = records
+        self._separator = separator
+        self._raw_format = raw_format
+        self._limits = limits
+        if where is None:
+            self._filter = None
+        else:
+            self._filter = AbsFilter(where, separator)
+        self._out = None
+        self._decoders = {
+            SPEC_PLACEHOLDER: self._decode_placeholder,
+            SPEC_BOOLEAN: self._decode_boolean,
+            SPEC_INTEGER: self._decode_integer,
+            SPEC_HELPER_CLASS: self._decode_helper_class,
+            SPEC_STRUCT: self._decode_struct,
+            SPEC_DYN_ARRAY: self._decode_dyn_array,
+        }
+
+    def decode(self, node, data, offset=0):
+        """Decode DATA according to the root struct NODE.
+
+        Returns the decoded values and the decoded bit width, or FILTERED and None if the data is
+        rejected by the filter.
+        """
+        if self._filter is not None and not self._filter.accepts(node, data, offset):
+            return FILTERED, None
+        if self._limits is None:
+            l_context = None
+        else:
+            l_context = AbsDecodeContext(self._limits)
+            l_context.check_input(len(data) * 8)
+            # The same objects are counted as in the tree : the top-level struct is one of them
+            l_context.new_object()
+
+        if self._flat:
+            # The flat values are gathered by a decoder of their own
+            l_decoder = AbsValueDecoder(True, self._separator, self._raw_format, self._limits)
+            l_decoder._out = collections.OrderedDict()
+            l_bit_width = l_decoder._decode_children(node, data, offset, l_context, None, '')[1]
+            return l_decoder._out, l_bit_width
+        else:
+            return self._decode_struct(node, data, offset, l_context, None)
+
+    def _leaf(self, path, value, bit_width):
+        if self._out is not None:
+            self._out[path] = value
+        return value, bit_width
+
+    def _decode_placeholder(self, node, data, offset, context, path):
+        return self._leaf(path, None, 0)
+
+    def _decode_boolean(self, node, data, offset, context, path):
+        return self._leaf(path, HexUtils.extract_uint(data, offset, 1) == 1, 1)
+
+    def _decode_integer(self, node, data, offset, context, path):
+        return self._leaf(path, HexUtils.extract_uint(data, offset, node.bit_width),
+                          node.bit_width)
+
+    def _decode_helper_class(self, node, data, offset, context, path):
+        if node.helper_class is AbsFieldAscii:
+            l_value = HexUtils.bytes_to_ascii(HexUtils.extract(data, offset, node.bit_width))
+        elif node.helper_class is AbsFieldIntegerLE:
+            l_value = HexUtils.extract_uint(HexUtils.extract(data, offset, node.bit_width)[::-1], 0,
+                                            node.bit_width)
+        elif node.helper_class is AbsFieldRawData:
+            l_value = self._encode_raw_data(HexUtils.extract(data, offset, node.bit_width))
+        else:
+            # User-defined helper classes may decode the data in any way : let them do it
+            (l_byte_addr, l_byte_offset) = HexUtils.to_bitwise_addr(offset)
+            l_field = AbsFactory.make(node.spec, data[l_byte_addr:], l_byte_offset, context)
+            if isinstance(l_field, AbsFieldRawData) and self._raw_format != 'hex':
+                l_value = self._encode_raw_data(l_field.raw_data())
+            else:
+                l_value = l_field.value()
+        return self._leaf(path, l_value, node.bit_width)
+
+    def _encode_raw_data(self, raw_data):
+        if self._raw_format == 'base64':
+            return str(base64.b64encode(bytes(raw_data)).decode('ascii'))
+        elif self._raw_format == 'bytes':
+            return bytes(bytearray(raw_data))
+        else:
+            return HexUtils.bytes_to_hex_str(raw_data)
+
+    def _decode_struct(self, node, data, offset, context, path):
+        if self._records:
+            return self._decode_record(node, data, offset, context)
+        elif self._out is None:
+            return self._decode_children(node, data, offset, context, collections.OrderedDict(),
+                                         None)
+        else:
+            return self._decode_children(node, data, offset, context, None,
+                                         path + self._separator)
+
+    def _decode_record(self, node, data, offset, context):
+        l_class = AbsRecord.struct_record_class(node)
+        if l_class is not None:
+            (l_values, l_bit_width) = self._decode_children(node, data, offset, context, [], None)
+            return l_class(l_values), l_bit_width
+        else:
+            # The keys depend on the selected Switch branches
+            l_keys = []
+            (l_values, l_bit_width) = self._decode_children(node, data, offset, context, [], None,
+                                                            l_keys)
+            return AbsRecord.record_class(tuple(l_keys))(l_values), l_bit_width
+
+    def _decode_children(self, node, data, offset, context, values, prefix, keys=None):
+        """Decode the children of the Struct NODE, into VALUES : an OrderedDict, a list (the
+        values only, in order, along with their KEYS if given), or None (flat decoding, see
+        _leaf)."""
+        if context is None:
+            l_context = {}
+        else:
+            l_context = context
+        l_limited = isinstance(l_context, AbsDecodeContext)
+        if l_limited:
+            l_context.enter()
+
+        l_is_list = (type(values) == list)
+        l_children = node.children
+        l_offset = offset
+        i = 0
+        while i < len(l_children):
+            l_run = node.runs[i]
+            if l_run is not None and l_run.can_unpack(data, l_offset):
+                # Byte-aligned run of integers : decode them all at once
+                l_values = l_run.unpack(data, l_offset)
+                l_run_children = l_children[i:i + len(l_values)]
+                if l_is_list:
+                    values.extend(l_values)
+                    if keys is not None:
+                        keys.extend([l_child.id for l_child in l_run_children])
+                for (l_child, l_value) in zip(l_run_children, l_values):
+                    if l_limited:
+                        l_context.new_object()
+                    if l_is_list:
+                        pass
+                    elif values is not None:
+                        values[l_child.id] = l_value
+                    else:
+                        self._out[prefix + l_child.id] = l_value
+                    if l_child.is_tagged:
+                        if l_child.id in l_context:
+                            raise AbsDecodingError
+                        else:
+                            l_context[l_child.id] = l_value
+                l_offset += l_run.bit_width
+                i += len(l_values)
+                continue
+
+            l_child = l_children[i]
+            i += 1
+            while l_child.spec_type == SPEC_SWITCH:
+                l_child = self._select_branch(l_child, l_context)
+            if l_limited:
+                l_context.new_object()
+            if self._out is None:
+                l_path = None
+            else:
+                l_path = prefix + l_child.id
+            (l_value, l_bit_width) = self._decoders[l_child.spec_type](l_child, data, l_offset,
+                                                                      l_context, l_path)
+            if l_is_list:
+                values.append(l_value)
+                if keys is not None:
+                    keys.append(l_child.id)
+            elif values is not None:
+                values[l_child.id] = l_value
+            if l_child.is_tagged:
+                if l_child.id in l_context:
+                    raise AbsDecodingError
+                else:
+                    l_context[l_child.id] = l_value
+            l_offset += l_bit_width
+        if l_limited:
+            l_context.leave()
+        return values, l_offset - offset
+
+    @staticmethod
+    def _select_branch(node, context):
+        if node.tag_id not in context:
+            raise AbsDecodingError
+        return node.branches.select(context[node.tag_id])
+
+    def _decode_dyn_array(self, node, data, offset, context, path):
+        if node.header_type == NB_ELTS:
+            l_header_id = 'length'
+        else:
+            l_header_id = 'size'
+        l_limited = isinstance(context, AbsDecodeContext)
+        if l_limited:
+            # The header is an object of its own in the tree
+            context.new_object()
+        l_header = HexUtils.extract_uint(data, offset, node.header_bit_width)
+        l_offset = offset + node.header_bit_width
+
+        if self._records:
+            l_path = None
+            l_elements = []
+            l_values = AbsRecord.record_class((l_header_id, 'data'))((l_header, l_elements))
+        elif self._out is None:
+            l_path = None
+            l_elements = []
+            l_values = collections.OrderedDict([(l_header_id, l_header), ('data', l_elements)])
+        else:
+            l_path = path + self._separator + 'data' + self._separator
+            l_elements = None
+            l_values = None
+            self._out[path + self._separator + l_header_id] = l_header
+
+        if l_limited:
+            context.enter()
+
+        l_decoder = self._decoders[node.element.spec_type]
+        if node.header_type == NB_ELTS:
+            if l_limited:
+                context.check_array(l_header)
+            l_nb_elements = l_header
+            l_end_offset = None
+        elif node.header_type == SIZE_INCL:
+            l_nb_elements = None
+            l_end_offset = offset + l_header * node.header_bit_width
+        elif node.header_type == SIZE_EXCL:
+            l_nb_elements = None
+            l_end_offset = offset + (l_header + 1) * node.header_bit_width
+        else:
+            raise AbsDecodingError
+
+        i = 0
+        while (i < l_nb_elements) if l_end_offset is None else (l_offset < l_end_offset):
+            if l_limited:
+                context.check_array(i + 1)
+                context.new_object()
+                l_element_context = context.child()
+            else:
+                l_element_context = None
+            (l_value, l_bit_width) = l_decoder(node.element, data, l_offset, l_element_context,
+                                               None if l_path is None else l_path + str(i))
+            if l_elements is not None:
+                l_elements.append(l_value)
+            l_offset += l_bit_width
+            i += 1
+
+        if l_limited:
+            context.leave()
+        return l_values, l_offset - offset
+
+
+class AbsFilter(object):
+    """Tells whether data is accepted by predicates on some of its fields, decoding as little of it
+    as possible.
+
+    WHERE is a {path: predicate} dict : each predicate is called with the value of the field at the
+    dotted path, and the data is accepted if all of them return true. The paths go through Struct
+    fields and the selected Switch branches (just like with flat decoding) : only the headers of
+    Dynamic Array fields ('length' or 'size') can be tested, not their elements.
+
+    The fields are read in the data order, and the reading stops as soon as a predicate is false, or
+    once all of them have been checked : the other fields are skipped without being decoded (see
+    AbsFactory.measure). Data lacking one of the fields (in a Switch branch which is not selected) is
+    rejected.
+
+>>> l_spec = [
+...     ('my-type', 8, TAGGED),
+...     [SWITCH, 'my-type', {
+...         1: ('my-int', 32),
+...         2: ('my-struct', [('my-flags', 8), [DYN_ARRAY, 'my-str', NB_ELTS, 8, AbsFieldAscii]]),
+...     }],
+... ]
+>>> l_node = AbsFactory.compile(l_spec, root=True)
+>>> l_filter = AbsFilter({'my-type': lambda value: value == 2, 'my-struct.my-str.length': bool})
+>>> [l_filter.accepts(l_node, HexUtils.hex_str_to_bytes(l_data))
+...  for l_data in ['01CAFEDECA', '020102', '020100', '0201024142']]
+[False, True, False, True]
+
+Rejected data only needs to hold the fields read so far :
+
+>>> l_filter.accepts(l_node, HexUtils.hex_str_to_bytes('01'))
+False
+
+An AbsFieldSpecError exception is raised for the paths which lead to no field which can be tested
+(unknown fields, elements of Dynamic Arrays, Struct fields) : when the filter is created if the root
+struct NODE is given, otherwise when it is first used.
+
+>>> AbsFilter({'my-struct.my-str.data.0': bool}, node=l_node)  # doctest: +IGNORE_EXCEPTION_DETAIL
+Traceback (most recent call last):
+...
+AbsFieldSpecError
+>>> AbsFilter({'my-tpye': bool}).accepts(l_node, bytearray(1))  # doctest: +IGNORE_EXCEPTION_DETAIL
+Traceback (most recent call last):
+...
+AbsFieldSpecError
+    """
+    def __init__(self, where, separator='.', node=None):
+        # The predicates, as a tree of path components : {component: subtree}, where the predicate
+        # of a path is under the None key
+        self._tree = {}
+        self._nb_predicates = len(where)
+        for (l_path, l_predicate) in where.items():
+            l_tree = self._tree
+            for l_component in l_path.split(separator):
+                l_tree = l_tree.setdefault(l_component, {})
+            l_tree[None] = l_predicate
+        self._measurer = AbsMeasurer()
+        # The last root struct whose fields have been checked against the paths
+        self._node = None
+        if node is not None:
+            self._check_paths(node)
+
+    def _check_paths(self, node):
+        if not self._has_paths(node, self._tree):
+            raise AbsFieldSpecError
+        self._node = node
+
+    @staticmethod
+    def _has_paths(node, tree):
+        """Tells whether all the paths of TREE lead to fields of NODE which can be tested."""
+        if node.spec_type == SPEC_STRUCT:
+            if None in tree:
+                return False
+            # The fields of all the Switch branches may be tested
+            l_children = list(node.children)
+            while any([c.spec_type == SPEC_SWITCH for c in l_children]):
+                l_children = [b for c in l_children
+                              for b in ([b for (_, b) in c.branches.items()]
+                                        if c.spec_type == SPEC_SWITCH else [c])]
+            return all([any([AbsFilter._has_paths(c, l_tree) for c in l_children if c.id == l_id])
+                        for (l_id, l_tree) in tree.items()])
+        elif node.spec_type == SPEC_DYN_ARRAY:
+            l_header_id = 'length' if node.header_type == NB_ELTS else 'size'
+            return list(tree.keys()) == [l_header_id] and list(tree[l_header_id].keys()) == [None]
+        else:
+            return list(tree.keys()) == [None]
+
+    def accepts(self, node, data, offset=0):
+        """Tells whether DATA, decoded from OFFSET according to the root struct NODE, is accepted."""
+        if node is not self._node:
+            self._check_paths(node)
+        # The number of predicates left to check
+        l_state = [self._nb_predicates]
+        return self._check_struct(node, data, offset, {}, self._tree, l_state) is not None and \
+            l_state[0] == 0
+
+    def _check(self, predicate, value, state):
+        if predicate(value):
+            state[0] -= 1
+            return True
+        return False
+
+    def _check_struct(self, node, data, offset, context, tree, state):
+        """Check the predicates of TREE against the children of the Struct NODE.
+
+        Returns the bit width of the struct, or None if the data is rejected.
+        """
+        l_offset = offset
+        for l_child in node.children:
+            if state[0] == 0:
+                # Everything has been checked : the rest of the data is not needed
+                break
+            while l_child.spec_type == SPEC_SWITCH:
+                l_child = AbsValueDecoder._select_branch(l_child, context)
+            l_tree = tree.get(l_child.id)
+            if l_tree is None:
+                l_bit_width = self._measurer._measure(l_child, data, l_offset, context)
+            elif l_child.spec_type == SPEC_STRUCT:
+                l_bit_width = self._check_struct(l_child, data, l_offset, context, l_tree, state)
+            elif l_child.spec_type == SPEC_DYN_ARRAY:
+                if l_child.header_type == NB_ELTS:
+                    l_predicate = l_tree.get('length', {}).get(None)
+                else:
+                    l_predicate = l_tree.get('size', {}).get(None)
+                if l_predicate is not None:
+                    l_header = HexUtils.extract_uint(data, l_offset, l_child.header_bit_width)
+                    if not self._check(l_predicate, l_header, state):
+                        return None
+                    if state[0] == 0:
+                        break
+                l_bit_width = self._measurer._measure_dyn_array(l_child, data, l_offset)
+            else:
+                l_bit_width = self._check_leaf(l_child, data, l_offset, context, l_tree, state)
+            if l_bit_width is None:
+                return None
+            l_offset += l_bit_width
+        return l_offset - offset
+
+    def _check_leaf(self, node, data, offset, context, tree, state):
+        l_value = self._measurer._decoder._decoders[node.spec_type](node, data, offset, None, None)[0]
+        if node.is_tagged:
+            if node.id in context:
+                raise AbsDecodingError
+            context[node.id] = l_value
+        l_predicate = tree.get(None)
+        if l_predicate is not None and not self._check(l_predicate, l_value, state):
+            return None
+        return node.fixed_width
+
+
+class AbsMeasurer(object):
+    """Computes the bit width of data without decoding it, see AbsFactory.measure.
+
+    Only the values which the width depends on are read : the headers of Dynamic Array fields, and
+    the tagged fields selecting the branches of Switch fields. The width of everything else is known
+    from the compiled spec (see AbsSpecNode.fixed_width), and is skipped arithmetically.
+    """
+    def __init__(self):
+        # Decodes the tagged values (helper classes may decode them in any way)
+        self._decoder = AbsValueDecoder()
+
+    def measure(self, node, data, offset=0):
+        """Return the bit width of DATA, decoded from OFFSET according to the root struct NODE."""
+        return self._measure(node, data, offset, {})
+
+    def _measure(self, node, data, offset, context):
+        while node.spec_type == SPEC_SWITCH:
+            node = AbsValueDecoder._select_branch(node, context)
+        if node.fixed_width is not None and not node.has_tags:
+            return node.fixed_width
+        elif node.spec_type == SPEC_STRUCT:
+            l_offset = offset
+            for l_child in node.children:
+                l_offset += self._measure(l_child, data, l_offset, context)
+            return l_offset - offset
+        elif node.spec_type == SPEC_DYN_ARRAY:
+            return self._measure_dyn_array(node, data, offset)
+        else:
+            # Tagged field : a Switch field will need its value
+            l_value = self._decoder._decoders[node.spec_type](node, data, offset, None, None)[0]
+            if node.id in context:
+                raise AbsDecodingError
+            context[node.id] = l_value
+            return node.fixed_width
+
+    def _measure_dyn_array(self, node, data, offset):
+        l_header = HexUtils.extract_uint(data, offset, node.header_bit_width)
+        l_element = node.element
+        l_offset = offset + node.header_bit_width
+
+        if node.header_type == NB_ELTS:
+            if l_element.fixed_width is not None:
+                return node.header_bit_width + l_header * l_element.fixed_width
+            i = 0
+            while i < l_header:
+                l_offset += self._measure(l_element, data, l_offset, {})
+                i += 1
+            return l_offset - offset
+
+        if node.header_type == SIZE_INCL:
+            l_end_offset = offset + l_header * node.header_bit_width
+        elif node.header_type == SIZE_EXCL:
+            l_end_offset = offset + (l_header + 1) * node.header_bit_width
+        else:
+            raise AbsDecodingError
+        if l_element.fixed_width == 0:
+            if l_offset < l_end_offset:
+                # Elements never reach the end of the array
+                raise AbsDecodingError
+            return node.header_bit_width
+        elif l_element.fixed_width is not None:
+            # The last element may go past the end of the array, just like when decoding it
+            l_nb_elements = max(0, -((l_offset - l_end_offset) // l_element.fixed_width))
+            return node.header_bit_width + l_nb_elements * l_element.fixed_width
+        while l_offset < l_end_offset:
+            l_offset += self._measure(l_element, data, l_offset, {})
+        return l_offset - offset
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod(verbose=True, report=True, optionflags=doctest.REPORT_NDIFF,
+                    exclude_empty=True)
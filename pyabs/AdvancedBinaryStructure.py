@@ -26,7 +26,9 @@ This is a library to easily decode any kind of binary data.
 The early version had originally been written for python 3, but due to real-world constraints,
 I had to backport the code to python 2.7
 
-It shouldn't be too hard to make it work in both versions, but it's not planned yet.
+It now runs on both python 2.7 and python 3. On python 3, the data is handled through the native
+primitives (bytes.fromhex, int.from_bytes, memoryview, ...), which makes the decoding noticeably
+faster : see benchmarks/bench_runtimes.py to compare the interpreters.
 
 ======================
 1. Quick Walk-through
@@ -70,6 +72,20 @@ You can get more information with the verbose version :
  'statistics': {'decoded': '9 bytes + 0 bits',
                 'remaining': '0 bytes + 0 bits'}}
 
+When printing large structures, the number of nested levels and the number of elements printed for
+each struct or array can be limited :
+
+>>> l_abs.pprint(max_elements=2)
+{'my-int-1': 6 (0x6),
+ 'my-int-2': 13 (0xD),
+ ... (2 more items)}
+
+>>> l_abs.pprint(verbose=True, max_depth=1)
+{'data': 'DA4341464544454341',
+ 'decoded_data': {...},
+ 'remaining_data': '',
+ 'statistics': {...}}
+
 An AdvancedBinaryStructure is a nested tree of OrderedDicts and lists, and you can access the
 various nested trees just like with any other dicts :
 >>> l_abs['decoded_data']['my-int-1']
@@ -201,7 +217,8 @@ name corresponding to its value ?
 You can define helper classes to help decode and display your field in any way you want. All the
 details about defining your own helper classes are explained in "3. Defining helper classes".
 
-PyABS has two built-in ones, namely AbsFieldAscii and AbsFieldRawData. The syntax is the same as
+PyABS has three built-in ones, namely AbsFieldAscii, AbsFieldRawData and AbsFieldIntegerLE (for
+little-endian integers, whereas plain integer fields are big-endian). The syntax is the same as
 for the basic field specs, except you add the name of your helper class as the third item :
 
 >>> AdvancedBinaryStructure('434146454445434142454546', [
@@ -424,8 +441,30 @@ flag is true. If the flag is false, it can be nice to explicitly show that the s
  'my-optional-section': (None),
  'my-str': CAFEDE (0x434146454445)}
 
-Please note that there is no 'default' case for the Switch field : it there is an unauthorized
-value in the tagged field, then an AbsDecodingError exception is raised :
+A branch can also be selected by a whole range of values, with a (low, high) key (both bounds
+included), and a DEFAULT branch is selected by any value no other key matches. Exact keys come
+first, then ranges :
+
+>>> l_spec = [
+...     ('my-opcode', 8, TAGGED),
+...     [SWITCH, 'my-opcode', {
+...        0x00: ('my-nop', 8),
+...        (0x01, 0x7F): ('my-short', 8),
+...        (0x80, 0xEF): ('my-long', 16),
+...        0x90: ('my-special', 16, AbsFieldAscii),
+...        DEFAULT: 'my-reserved',
+...      }],
+... ]
+>>> for l_data in ['0012', '4212', '904142', 'A0CAFE', 'FF']:
+...     print(list(AdvancedBinaryStructure(l_data, l_spec)['decoded_data'].items())[1])
+('my-nop', 18 (0x12))
+('my-short', 18 (0x12))
+('my-special', AB (0x4142))
+('my-long', 51966 (0xCAFE))
+('my-reserved', (None))
+
+Without a DEFAULT branch, if there is an unauthorized value in the tagged field, then an
+AbsDecodingError exception is raised :
 
 >>> AdvancedBinaryStructure('FF4341464544454341', [
 ...     ('my-int-1', 6),
@@ -772,7 +811,6 @@ classes to understand how it all fits together.
 4. Future evolutions
 =====================
 - Switch fields : remove the necessity of tagging a field
-- Switch fields : introduce a default case
 - Dynamic Array fields : add the possibility to specify a different length for the length field.
 - HexUtils : extract function : add an option to stop the left shift of the extracted data at the
                                 beginning of the first byte (overwriting the first few bits with 0s
@@ -786,7 +824,6 @@ classes to understand how it all fits together.
              : at the top-level of the decoding tree (in the AdvancedBinaryStructure
              constructor), intercept them and add fields to show when the exception occurred in
              the pretty print output.
-- Make it work on both python 2.7 and python 3
 
 ============================
 5. Robustness doctest cases
@@ -795,10 +832,18 @@ classes to understand how it all fits together.
 Not very digest, but as good a place as any to put them.
 
 """
+import bisect
 import collections
+import copy
+import importlib
+import struct
+import time
 
-from backports import pprint33_backport_to_27 as pprint
-import HexUtils
+try:
+    from . import HexUtils
+except (ImportError, ValueError):
+    # Run as a script (see the doctests at the end of the module)
+    import HexUtils
 
 ####################################################################################################
 #
@@ -816,6 +861,12 @@ SIZE_EXCL = 'SIZE_EXCL'
 SIZE_INCL = 'SIZE_INCL'
 NB_ELTS = 'NB_ELTS'
 
+# Key of the branch of a Switch field selected when no other key matches the tagged value
+DEFAULT = 'DEFAULT'
+
+# Result of the plain values decoding of data rejected by a filter (see AbsFactory.decode_values)
+FILTERED = 'FILTERED'
+
 SPEC_PLACEHOLDER = 'SPEC_PLACEHOLDER'
 SPEC_BOOLEAN = 'SPEC_BOOLEAN'
 SPEC_INTEGER = 'SPEC_INTEGER'
@@ -824,30 +875,176 @@ SPEC_STRUCT = 'SPEC_STRUCT'
 SPEC_SWITCH = 'SPEC_SWITCH'
 SPEC_DYN_ARRAY = 'SPEC_DYN_ARRAY'
 
+# struct module format of the integer widths which can be decoded by AbsIntegerRun
+RUN_FORMATS = {8: 'B', 16: 'H', 32: 'I', 64: 'Q'}
+
+
+def _lazy_import(name):
+    """Import the pyabs module NAME.
+
+    Only the decoding engine is loaded along with this module : the other features (pretty-printing,
+    compact serialisation, plain values decoding) live in their own modules, which are only
+    imported when they are first used.
+    """
+    if '.' in __name__:
+        return importlib.import_module(__name__.rpartition('.')[0] + '.' + name)
+    else:
+        return importlib.import_module(name)
+
+
+class _AbsSpecMemo(object):
+    """Cache of what is computed from a spec (or from a compiled AbsSpecNode).
+
+    The entries are looked up by the id of the spec object, but only used while the spec still
+    equals the copy taken by SNAPSHOT when the entry was computed : a spec modified after its first
+    use, or a new spec reusing the id of a former one, is computed again. The default snapshot is a
+    shallow copy, for the lists and dicts of a spec whose items are cached on their own ; the
+    read-only nodes are their own snapshot. The cache is emptied once it holds MAX_SIZE entries, so
+    that specs written again on each call do not pile up.
+    """
+    MAX_SIZE = 1024
+
+    def __init__(self, snapshot=None):
+        self._entries = {}
+        self._snapshot = snapshot
+
+    def get(self, spec):
+        """Return the value computed from SPEC, or None."""
+        l_cached = self._entries.get(id(spec))
+        if l_cached is not None and l_cached[0] == spec:
+            return l_cached[1]
+        return None
+
+    def set(self, spec, value):
+        """Store the VALUE computed from SPEC, and return it."""
+        if len(self._entries) >= self.MAX_SIZE:
+            self._entries.clear()
+        if self._snapshot is None:
+            l_snapshot = type(spec)(spec)
+        else:
+            l_snapshot = self._snapshot(spec)
+        self._entries[id(spec)] = (l_snapshot, value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
 
 class AdvancedBinaryStructure(collections.OrderedDict):
-    def __init__(self, hex_str, spec):
+    def __init__(self, hex_str, spec, limits=None):
         super(AdvancedBinaryStructure, self).__init__()
+        self._spec = spec
+        self._limits = limits
+
+        # When decoding untrusted data, enforce the resource limits (see AbsDecodeLimits)
+        if limits is None:
+            l_context = None
+        else:
+            l_context = AbsDecodeContext(limits)
+            l_context.check_input(len(hex_str) * 4)
+
+        # Initiate a recursive decoding (turn the top-level field specs into a root binary struct).
+        # The very same list is kept when possible, so that its layout is only analysed once (see
+        # AbsFactory.struct_layout)
+        l_root_spec = ('root', spec if type(spec) == list else list(spec))
+        self._set_decoded_data(hex_str, AbsFactory.make(l_root_spec, hex_str, 0, l_context))
 
-        # Initiate a recursive decoding (turn the top-level field specs into a root binary struct)
+    def _set_decoded_data(self, hex_str, decoded_data):
+        l_decoded_bits = decoded_data.bit_width()
+        self._set_items(hex_str, decoded_data, hex_str[l_decoded_bits // 8 * 2:], len(hex_str) * 4)
+
+    def _set_items(self, hex_str, decoded_data, remaining_data, nb_bits):
         self['data'] = hex_str
-        self['decoded_data'] = AbsFactory.make(('root', list(spec)), hex_str)
+        self['decoded_data'] = decoded_data
 
         l_decoded_bits = self['decoded_data'].bit_width()
-        l_not_decoded_bits = len(hex_str) * 4 - l_decoded_bits
+        l_not_decoded_bits = nb_bits - l_decoded_bits
 
-        self['remaining_data'] = hex_str[l_decoded_bits // 8 * 2:]
+        self['remaining_data'] = remaining_data
 
         self['statistics'] = {
             'decoded': "%d bytes + %d bits" % HexUtils.to_bitwise_addr(l_decoded_bits),
             'remaining': "%d bytes + %d bits" % HexUtils.to_bitwise_addr(l_not_decoded_bits)
         }
 
-    def pprint(self, verbose=False):
+    def edit(self, start, hex_str, end=None):
+        """Replace the bytes of the data from START (included) to END (excluded) by the bytes of
+        HEX_STR, and decode the data again. By default, as many bytes as in HEX_STR are replaced.
+
+        Only the fields lying in the replaced bytes are decoded again, along with the ones whose
+        layout depends on them : the others are moved as they are to the new tree (see the AbsEdit
+        module). With decode limits, the whole data is decoded again, so that they are enforced
+        just like when decoding it first.
+        """
+        if end is None:
+            end = start + len(hex_str) // 2
+        if not 0 <= start <= end <= len(self['data']) // 2:
+            raise HexUtils.HexUtilsParamError
+        l_hex_str = self['data'][:start * 2] + hex_str + self['data'][end * 2:]
+        l_data = HexUtils.hex_str_to_bytes(l_hex_str)
+
+        l_root_spec = ('root', self._spec if type(self._spec) == list else list(self._spec))
+        if self._limits is None:
+            l_editor = _lazy_import('AbsEdit').AbsEditor(l_data, start, end, len(hex_str) // 2)
+            l_decoded_data = l_editor.update(self['decoded_data'],
+                                             AbsFactory.compile(self._spec, root=True))
+        else:
+            l_context = AbsDecodeContext(self._limits)
+            l_context.check_input(len(l_hex_str) * 4)
+            l_decoded_data = AbsFactory.make(l_root_spec, l_data, 0, l_context)
+        self._set_decoded_data(l_hex_str, l_decoded_data)
+
+    def to_compact(self):
+        """Serialise the decoded tree into a compact binary string.
+
+        Only the decoded values are stored, in spec order, along with the branch chosen by each
+        Switch field and the number of elements of each Dynamic Array field. The spec itself is
+        not stored, only its fingerprint (see AbsFactory.fingerprint) : the very same spec must
+        be given back to from_compact().
+        See the AbsCompact module for examples.
+        """
+        return _lazy_import('AbsCompact').AbsCompact.dumps(self._spec, self['decoded_data'],
+                                                           self['remaining_data'])
+
+    @classmethod
+    def from_compact(cls, compact, spec):
+        """Rebuild an AdvancedBinaryStructure from the output of to_compact(), given the same SPEC.
+
+        The original data are not decoded again : the fields, their raw data and the original data
+        are only rebuilt from the stored values when they are first accessed (see the AbsCompact
+        module).
+        """
+        l_compact = _lazy_import('AbsCompact')
+        (l_decoded_data, l_remaining_data) = l_compact.AbsCompact.loads(spec, compact)
+
+        l_abs = cls.__new__(cls)
+        collections.OrderedDict.__init__(l_abs)
+        l_abs._spec = spec
+        l_abs._limits = None
+
+        # The 'data' item is rebuilt on first access : only its size is known
+        l_nb_bits = l_decoded_data.bit_width() // 8 * 8 + len(l_remaining_data) * 4
+        l_abs._set_items(None, l_decoded_data, l_remaining_data, l_nb_bits)
+        l_abs.__class__ = l_compact.lazy_structure_class(cls)
+        return l_abs
+
+    def pprint(self, verbose=False, stream=None, max_depth=None, max_elements=None):
+        """Pretty-print the decoded data (or the whole structure if VERBOSE) to STREAM.
+
+        MAX_DEPTH and MAX_ELEMENTS limit the number of nested levels and the number of elements
+        per struct or array which are printed (see AbsPrettyPrinter).
+        """
         if verbose:
-            pprint.pprint(self)
+            l_tree = self
         else:
-            pprint.pprint(self['decoded_data'])
+            l_tree = self['decoded_data']
+        _lazy_import('AbsPrettyPrinter').pprint(l_tree, stream, max_depth=max_depth,
+                                                max_elements=max_elements)
+
+    def memory_footprint(self):
+        """Return the number of bytes held by the structure, as an OrderedDict {category: size},
+        along with the 'total' size. See the AbsMemory module for the categories."""
+        return _lazy_import('AbsMemory').footprint([self])
 
 
 class AbsFactory(object):
@@ -1050,9 +1247,15 @@ AbsFieldSpecError
 
         elif type(spec) == list and len(spec) > 0:
             if spec[0] == SWITCH:
-                if (len(spec) == 3 and
+                if len(spec) == 3 and type(spec[1]) == str and \
+                        AbsFactory._switch_tables.get(spec[2]) is not None:
+                    # Already classified by switch_table
+                    return SPEC_SWITCH
+                elif (len(spec) == 3 and
                     type(spec[1]) == str and
                     type(spec[2]) == dict and
+                        all([type(k) != tuple or (len(k) == 2 and k[0] <= k[1])
+                             for k in spec[2].keys()]) and
                         all([AbsFactory.is_valid_spec(s)
                              for s in spec[2].values()])):
                     return SPEC_SWITCH
@@ -1095,6 +1298,252 @@ AbsFieldSpecError
         AbsFactory.spec_type(spec)
         return True
 
+    @staticmethod
+    def fingerprint(spec):
+        """Return a fingerprint (an hexadecimal string) identifying the given field SPEC.
+
+        Two specs have the same fingerprint if they describe the same fields, with the same helper
+        classes (identified by their module and class names).
+
+>>> l_spec_1 = [('my-int', 3), ('my-str', 16, AbsFieldAscii)]
+>>> l_spec_2 = [('my-int', 3), ('my-str', 16, AbsFieldRawData)]
+>>> AbsFactory.fingerprint(l_spec_1) == AbsFactory.fingerprint(list(l_spec_1))
+True
+>>> AbsFactory.fingerprint(l_spec_1) == AbsFactory.fingerprint(l_spec_2)
+False
+        """
+        import hashlib
+        l_parts = []
+        AbsFactory._canonical_spec(spec, l_parts)
+        return hashlib.sha1(''.join(l_parts).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _canonical_spec(spec, parts):
+        """Append to PARTS the pieces of a stable textual representation of SPEC (switch branches
+        are sorted, and helper classes are replaced by their qualified names)."""
+        l_type = type(spec)
+        if l_type == tuple or l_type == list:
+            parts.append('(' if l_type == tuple else '[')
+            for (i, l_spec) in enumerate(spec):
+                if i > 0:
+                    parts.append(',')
+                AbsFactory._canonical_spec(l_spec, parts)
+            parts.append(')' if l_type == tuple else ']')
+        elif l_type == str or l_type == int:
+            parts.append(repr(spec))
+        elif isinstance(spec, type):
+            parts.append('%s.%s' % (spec.__module__, spec.__name__))
+        elif l_type == dict:
+            l_items = []
+            for (l_key, l_spec) in spec.items():
+                l_item = [repr(l_key), ':']
+                AbsFactory._canonical_spec(l_spec, l_item)
+                l_items.append(''.join(l_item))
+            parts.append('{%s}' % ','.join(sorted(l_items)))
+        else:
+            parts.append(repr(spec))
+
+    @staticmethod
+    def compile(spec, root=False):
+        """Return the AbsSpecNode tree corresponding to the given field SPEC, or to the top-level
+        list of field specs if ROOT (see AdvancedBinaryStructure).
+
+        The spec is analysed only once : the result is cached, as long as the same SPEC object is
+        given again, unchanged (see _AbsSpecMemo) :
+
+>>> l_spec = [('my-int', 8)]
+>>> AbsFactory.compile(l_spec, root=True) is AbsFactory.compile(l_spec, root=True)
+True
+>>> l_spec.append(('my-other-int', 8))
+>>> [l_child.id for l_child in AbsFactory.compile(l_spec, root=True).children]
+['my-int', 'my-other-int']
+
+        See the AbsValueDecoder module for more examples.
+        """
+        l_compiled_specs = AbsFactory._compiled_roots if root else AbsFactory._compiled_specs
+        l_cached = l_compiled_specs.get(spec)
+        if l_cached is not None:
+            return l_cached
+        if root:
+            l_node = _lazy_import('AbsValueDecoder').AbsSpecNode(('root', list(spec)))
+        else:
+            l_node = _lazy_import('AbsValueDecoder').AbsSpecNode(spec)
+        return l_compiled_specs.set(spec, l_node)
+
+    # Any nested list or dict of a spec may be modified : the whole spec is copied
+    _compiled_specs = _AbsSpecMemo(copy.deepcopy)
+    _compiled_roots = _AbsSpecMemo(copy.deepcopy)
+
+    @staticmethod
+    def decode_values(spec, data, offset=0, flat=False, limits=None, records=False, where=None):
+        """Decode DATA according to the top-level SPEC (see AdvancedBinaryStructure), directly into
+        plain python values : no field object is built.
+
+        The decoded values are returned as nested OrderedDicts (for Struct and Dynamic Array
+        fields) and lists (for the elements of Dynamic Arrays). With FLAT, a single OrderedDict is
+        returned, mapping the dotted path of each field to its value. LIMITS, if given, are
+        enforced just like in AdvancedBinaryStructure. With RECORDS, the structs are decoded into
+        compact AbsRecord objects rather than OrderedDicts (see the AbsRecord module).
+
+        WHERE, if given, is a {path: predicate} dict : the fields at these dotted paths are decoded
+        first, and FILTERED is returned as soon as one of the predicates is false (see AbsFilter).
+
+        See the AbsValueDecoder module for examples.
+        """
+        l_node = AbsFactory.compile(spec, root=True)
+        if type(data) == str:
+            l_data = HexUtils.hex_str_to_bytes(data)
+        else:
+            l_data = data
+        l_decoder = _lazy_import('AbsValueDecoder').AbsValueDecoder(flat, limits=limits,
+                                                                    records=records, where=where)
+        return l_decoder.decode(l_node, l_data, offset)[0]
+
+    @staticmethod
+    def measure(spec, data, offset=0):
+        """Return the bit width of DATA, decoded from OFFSET according to the top-level SPEC (see
+        AdvancedBinaryStructure), without building any field object or value.
+
+        Only the Dynamic Array headers and the tagged fields selecting Switch branches are read :
+        DATA may end right after the last of them. An HexUtilsInputSizeError exception is raised if
+        one of them lies beyond the end of the data.
+
+        See the AbsValueDecoder module for examples.
+        """
+        l_node = AbsFactory.compile(spec, root=True)
+        if type(data) == str:
+            l_data = HexUtils.hex_str_to_bytes(data)
+        else:
+            l_data = data
+        if AbsFactory._measurer is None:
+            AbsFactory._measurer = _lazy_import('AbsValueDecoder').AbsMeasurer()
+        return AbsFactory._measurer.measure(l_node, l_data, offset)
+
+    _measurer = None
+
+    @staticmethod
+    def diff(spec, data_a, data_b):
+        """Compare DATA_A and DATA_B, both decoded according to the top-level SPEC (see
+        AdvancedBinaryStructure), and return the (path, old value, new value) tuples of the fields
+        whose values differ.
+
+        The subtrees whose bits are identical in both payloads are skipped without being decoded.
+        See the AbsDiff module for examples.
+        """
+        l_node = AbsFactory.compile(spec, root=True)
+        (l_data_a, l_data_b) = [HexUtils.hex_str_to_bytes(d) if type(d) == str else d
+                                for d in (data_a, data_b)]
+        if AbsFactory._differ is None:
+            AbsFactory._differ = _lazy_import('AbsDiff').AbsDiffer()
+        return AbsFactory._differ.diff(l_node, l_data_a, l_data_b)
+
+    _differ = None
+
+    @staticmethod
+    def iter_elements(spec, data, path, offset=0, start=0, stop=None, chunk_size=None,
+                      values=False):
+        """Yield the elements of the Dynamic Array field at the dotted PATH of the top-level SPEC
+        (see AdvancedBinaryStructure) one by one, as they are decoded from DATA, without building
+        the array : only the current element is kept alive.
+
+        Only the elements from index START to STOP (excluded, if given) are yielded. With VALUES,
+        they are decoded into plain python values (see decode_values), rather than into fields.
+        With CHUNK_SIZE, lists of (at most) CHUNK_SIZE elements are yielded.
+        See the AbsArrayReader module for examples.
+        """
+        l_node = AbsFactory.compile(spec, root=True)
+        if type(data) == str:
+            l_data = HexUtils.hex_str_to_bytes(data)
+        else:
+            l_data = data
+        l_reader = _lazy_import('AbsArrayReader').AbsArrayReader(l_node, path, values=values)
+        return l_reader.iter_elements(l_data, offset, start, stop, chunk_size)
+
+    @staticmethod
+    def size_info(spec):
+        """Return the AbsSizeInfo of the top-level SPEC (see AdvancedBinaryStructure) : whether its
+        data has a fixed width, the width of its fixed prefix, its minimum and maximum widths, and
+        the fields its width depends on.
+
+        The analysis is done only once, along with the compilation of the spec (see compile).
+        See the AbsSize module for examples.
+        """
+        l_node = AbsFactory.compile(spec, root=True)
+        l_cached = AbsFactory._size_infos.get(l_node)
+        if l_cached is not None:
+            return l_cached
+        l_info = _lazy_import('AbsSize').AbsSizeAnalyser().analyse(l_node)
+        return AbsFactory._size_infos.set(l_node, l_info)
+
+    _size_infos = _AbsSpecMemo(lambda node: node)
+
+    @staticmethod
+    def struct_layout(specs):
+        """Return the layout of the list of field SPECS of a struct : a tuple holding, for each
+        field spec, either the AbsIntegerRun starting with this field, or None.
+
+        A run is made of at least two contiguous integer fields of 8, 16, 32 or 64 bits (plain
+        Integer fields, which are big-endian, or AbsFieldIntegerLE fields, which are
+        little-endian). When the first field of a run is byte-aligned, the whole run is decoded
+        with a single struct unpack. All the other fields are decoded one by one.
+
+>>> l_layout = AbsFactory.struct_layout([
+...     ('my-flag', 1),
+...     ('my-int-1', 7),
+...     ('my-int-2', 16),
+...     ('my-int-3', 8),
+...     ('my-int-4', 32, AbsFieldIntegerLE),
+...     ('my-int-5', 16, AbsFieldIntegerLE),
+...     ('my-int-6', 4),
+... ])
+>>> for l_run in l_layout:
+...     print(l_run)
+None
+None
+<AbsIntegerRun '>HB' ['my-int-2', 'my-int-3']>
+None
+<AbsIntegerRun '<IH' ['my-int-4', 'my-int-5']>
+None
+None
+
+        The 8-bit 'my-int-3' could belong to either run : the byte order only matters for wider
+        fields.
+
+        The layout is computed only once : the result is cached, as long as the same SPECS list
+        is given again, unchanged (see _AbsSpecMemo) :
+
+>>> l_specs = [('my-int-1', 8), ('my-int-2', 8)]
+>>> AbsFactory.struct_layout(l_specs)
+(<AbsIntegerRun '>BB' ['my-int-1', 'my-int-2']>, None)
+>>> l_specs[1] = ('my-int-2', 4)
+>>> AbsFactory.struct_layout(l_specs)
+(None, None)
+        """
+        l_cached = AbsFactory._struct_layouts.get(specs)
+        if l_cached is not None:
+            return l_cached
+
+        l_layout = [None] * len(specs)
+        l_run_start = 0
+        l_run_order = None
+        for (i, l_spec) in enumerate(list(specs) + [None]):
+            l_format = None if l_spec is None else AbsIntegerRun.spec_format(l_spec)
+            if l_format is not None and (l_run_order is None or l_format[0] is None or
+                                         l_format[0] == l_run_order):
+                l_run_order = l_run_order if l_format[0] is None else l_format[0]
+                continue
+            # The current run (if any) ends here
+            if i - l_run_start >= 2:
+                l_layout[l_run_start] = AbsIntegerRun(specs[l_run_start:i], l_run_order)
+            if l_format is None:
+                (l_run_start, l_run_order) = (i + 1, None)
+            else:
+                (l_run_start, l_run_order) = (i, l_format[0])
+
+        return AbsFactory._struct_layouts.set(specs, tuple(l_layout))
+
+    _struct_layouts = _AbsSpecMemo()
+
     @staticmethod
     def _make_helper_class(spec, data, offset=0, context=None):
         """Sub-Factory for helper-class fields.
@@ -1104,6 +1553,31 @@ AbsFieldSpecError
         l_helper_class = l_spec.pop(2)
         return l_helper_class(l_spec, data, offset, context)
 
+    @staticmethod
+    def switch_table(spec):
+        """Return the AbsSwitchTable of the Switch field SPEC, whose branches are the (spec, spec
+        type) of each branch spec.
+
+        The table is computed only once : the result is cached, as long as the same branches dict
+        is given again, unchanged (see _AbsSpecMemo) :
+
+>>> l_branches = {1: ('my-int', 8)}
+>>> AbsFactory.switch_table([SWITCH, 'my-tag', l_branches]).select(1)
+(('my-int', 8), 'SPEC_INTEGER')
+>>> l_branches[1] = ('my-str', 8, AbsFieldAscii)
+>>> AbsFactory.switch_table([SWITCH, 'my-tag', l_branches]).select(1)[1]
+'SPEC_HELPER_CLASS'
+        """
+        l_branches = spec[2]
+        l_cached = AbsFactory._switch_tables.get(l_branches)
+        if l_cached is not None:
+            return l_cached
+        l_table = AbsSwitchTable(dict([(l_key, (l_spec, AbsFactory.spec_type(l_spec)))
+                                       for (l_key, l_spec) in l_branches.items()]))
+        return AbsFactory._switch_tables.set(l_branches, l_table)
+
+    _switch_tables = _AbsSpecMemo()
+
     @staticmethod
     def _make_switch(spec, data, offset=0, context=None):
         if context is None:
@@ -1111,12 +1585,11 @@ AbsFieldSpecError
         elif spec[1] not in context:
             raise AbsDecodingError
         else:
-            l_target_key = context[spec[1]]
-
-            if l_target_key in spec[2]:
-                return AbsFactory.make(spec[2][l_target_key], data, offset, context)
-            else:
-                raise AbsDecodingError
+            l_target = context[spec[1]]
+            if isinstance(l_target, AbsFieldMixin):
+                l_target = l_target.value()
+            (l_spec, l_spec_type) = AbsFactory.switch_table(spec).select(l_target)
+            return AbsFactory._make_typed(l_spec, l_spec_type, data, offset, context)
 
     @staticmethod
     def make(spec, data=None, offset=0, context=None):
@@ -1124,30 +1597,330 @@ AbsFieldSpecError
 
         The spec is first analysed to determine which type of field is to be created.
         The arguments are then handed to the proper sub-factory.
+
+        DATA may also be a HexUtils.BitReader, positioned on the first bit of the field : the
+        field is read from it, which moves it past the field, and OFFSET is ignored.
         """
         if type(data) == str:
-            l_data = HexUtils.hex_str_to_u8(data)
-        else:
+            l_data = HexUtils.byte_view(HexUtils.hex_str_to_bytes(data))
+        elif data is None or isinstance(data, HexUtils.BitReader):
             l_data = data
+        else:
+            # Slicing a view does not copy the data (python 3 only)
+            l_data = HexUtils.byte_view(data)
+        return AbsFactory._make_typed(spec, AbsFactory.spec_type(spec), l_data, offset, context)
 
+    @staticmethod
+    def _make_typed(spec, spec_type, data, offset, context):
+        """Same as make, for a SPEC of a known type, and DATA already converted."""
+        if isinstance(context, AbsDecodeContext) and spec_type != SPEC_SWITCH:
+            context.new_object()
+
+        if spec_type == SPEC_PLACEHOLDER:
+            return AbsFieldPlaceholder(spec, data, offset, context)
+        elif spec_type == SPEC_BOOLEAN:
+            return AbsFieldBoolean(spec, data, offset, context)
+        elif spec_type == SPEC_INTEGER:
+            return AbsFieldInteger(spec, data, offset, context)
+        elif spec_type == SPEC_HELPER_CLASS:
+            return AbsFactory._make_helper_class(spec, data, offset, context)
+        elif spec_type == SPEC_STRUCT:
+            return AbsFieldStruct(spec, data, offset, context)
+        elif spec_type == SPEC_SWITCH:
+            return AbsFactory._make_switch(spec, data, offset, context)
+        elif spec_type == SPEC_DYN_ARRAY:
+            return AbsFieldDynArray(spec, data, offset, context)
+        else:
+            raise AbsFieldSpecError
+
+
+class AbsSwitchTable(object):
+    """The dispatch table of a Switch field : selects the branch of a tagged value.
+
+    BRANCHES is a {key: branch} dict, where each key is either a value, a (low, high) range of
+    values (both bounds included), or DEFAULT. The values are looked up directly, then the ranges
+    are searched by bisection, and finally the DEFAULT branch (if any) is selected.
+
+>>> l_table = AbsSwitchTable({1: 'one', (2, 9): 'digit', (10, 99): 'number', DEFAULT: 'other'})
+>>> [l_table.select(l_value) for l_value in [1, 2, 9, 10, 100, 'A']]
+['one', 'digit', 'digit', 'number', 'other', 'other']
+>>> l_table.key(42)
+(10, 99)
+>>> AbsSwitchTable({(1, 5): 'a', (5, 9): 'b'})
+Traceback (most recent call last):
+...
+AbsFieldSpecError
+>>> AbsSwitchTable({1: 'one'}).select(2)
+Traceback (most recent call last):
+...
+AbsDecodingError
+    """
+    __slots__ = ('values', 'range_starts', 'ranges', 'default')
+
+    def __init__(self, branches):
+        # {value: (key, branch)}, the sorted lower bounds of the ranges, the (high, key, branch)
+        # of each range, and the (key, branch) of the DEFAULT branch
+        self.values = {}
+        self.default = None
+        l_ranges = []
+        for (l_key, l_branch) in branches.items():
+            if type(l_key) == tuple:
+                l_ranges.append((l_key[0], l_key[1], l_branch))
+            elif l_key == DEFAULT:
+                self.default = (l_key, l_branch)
+            else:
+                self.values[l_key] = (l_key, l_branch)
+        l_ranges.sort(key=lambda r: r[0])
+        for (l_previous, l_range) in zip(l_ranges, l_ranges[1:]):
+            if l_range[0] <= l_previous[1]:
+                # Overlapping ranges
+                raise AbsFieldSpecError
+        self.range_starts = [r[0] for r in l_ranges]
+        self.ranges = [(r[1], (r[0], r[1]), r[2]) for r in l_ranges]
+
+    def _lookup(self, value):
+        try:
+            l_entry = self.values.get(value)
+        except TypeError:
+            # Unhashable value
+            return self.default
+        if l_entry is not None:
+            return l_entry
+        if self.ranges:
+            try:
+                i = bisect.bisect_right(self.range_starts, value) - 1
+            except TypeError:
+                # Not comparable with the bounds (e.g. a string vs. integer ranges)
+                i = -1
+            if i >= 0 and value <= self.ranges[i][0]:
+                return self.ranges[i][1:]
+        return self.default
+
+    def select(self, value):
+        """Return the branch selected by VALUE (an AbsDecodingError exception is raised if there
+        is none)."""
+        l_entry = self._lookup(value)
+        if l_entry is None:
+            raise AbsDecodingError
+        return l_entry[1]
+
+    def key(self, value):
+        """Return the key of the branch selected by VALUE (see select)."""
+        l_entry = self._lookup(value)
+        if l_entry is None:
+            raise AbsDecodingError
+        return l_entry[0]
+
+    def items(self):
+        """Return the (key, branch) of all the branches."""
+        l_items = list(self.values.values())
+        l_items.extend([r[1:] for r in self.ranges])
+        if self.default is not None:
+            l_items.append(self.default)
+        return l_items
+
+
+class AbsIntegerRun(object):
+    """A run of contiguous integer fields, decoded with a single struct unpack (see
+    AbsFactory.struct_layout).
+
+    specs : the field specs of the run,
+    byte_order : '>' (big-endian) or '<' (little-endian), None if all the fields are 8-bit wide,
+    field_specs, field_classes : the spec (without helper class) and class of each field,
+    unpacker : the precompiled struct.Struct decoding the whole run,
+    bit_width : the total bit width of the run.
+    """
+    __slots__ = ('specs', 'byte_order', 'field_specs', 'field_classes', 'unpacker', 'bit_width')
+
+    # Data types struct.Struct.unpack_from can read from
+    UNPACKABLE_TYPES = (bytes, bytearray, memoryview)
+
+    def __init__(self, specs, byte_order):
+        self.specs = tuple(specs)
+        self.byte_order = byte_order
+        self.field_specs = []
+        self.field_classes = []
+        for l_spec in self.specs:
+            if AbsFactory.spec_type(l_spec) == SPEC_HELPER_CLASS:
+                self.field_specs.append((l_spec[0], l_spec[1]) + tuple(l_spec[3:]))
+                self.field_classes.append(l_spec[2])
+            else:
+                self.field_specs.append(l_spec)
+                self.field_classes.append(AbsFieldInteger)
+        self.unpacker = struct.Struct((byte_order or '>') +
+                                      ''.join([RUN_FORMATS[l_spec[1]] for l_spec in self.specs]))
+        self.bit_width = self.unpacker.size * 8
+
+    def __getstate__(self):
+        # struct.Struct objects cannot be pickled : only keep their format
+        return (self.specs, self.byte_order, self.field_specs, self.field_classes,
+                self.unpacker.format, self.bit_width)
+
+    def __setstate__(self, state):
+        (self.specs, self.byte_order, self.field_specs, self.field_classes, l_format,
+         self.bit_width) = state
+        self.unpacker = struct.Struct(l_format)
+
+    def __repr__(self):
+        return '<AbsIntegerRun %r %r>' % (str(self.unpacker.format.decode('ascii')
+                                              if type(self.unpacker.format) == bytes
+                                              else self.unpacker.format),
+                                          [str(l_spec[0]) for l_spec in self.specs])
+
+    @staticmethod
+    def spec_format(spec):
+        """Return the (byte order, format) of SPEC if it can be part of a run, None otherwise.
+        The byte order of 8-bit fields is None : they fit in any run."""
+        if type(spec) != tuple or len(spec) < 2 or type(spec[1]) != int or \
+                spec[1] not in RUN_FORMATS:
+            return None
         l_spec_type = AbsFactory.spec_type(spec)
+        if l_spec_type == SPEC_INTEGER:
+            l_byte_order = '>'
+        elif l_spec_type == SPEC_HELPER_CLASS and spec[2] is AbsFieldIntegerLE:
+            l_byte_order = '<'
+        else:
+            return None
+        return (l_byte_order if spec[1] > 8 else None), RUN_FORMATS[spec[1]]
+
+    def can_unpack(self, data, offset):
+        """Tells whether the run can be decoded from DATA at OFFSET in a single unpack."""
+        return offset % 8 == 0 and isinstance(data, AbsIntegerRun.UNPACKABLE_TYPES) and \
+            offset // 8 + self.unpacker.size <= len(data)
+
+    def unpack(self, data, offset):
+        """Return the values of the fields of the run (see can_unpack)."""
+        return self.unpacker.unpack_from(data, offset // 8)
+
+    def make_fields(self, data, offset):
+        """Return the fields of the run (see can_unpack)."""
+        return [l_class._from_value(l_spec, l_value)
+                for (l_class, l_spec, l_value) in zip(self.field_classes, self.field_specs,
+                                                      self.unpack(data, offset))]
+
+
+class AbsDecodeLimits(object):
+    """Resource limits enforced while decoding untrusted data.
+
+    Each limit is optional (None means unlimited) :
+    - max_bits : maximum size of the input data, in bits,
+    - max_array_elements : maximum number of elements of each Dynamic Array field,
+    - max_depth : maximum nesting level of Struct and Dynamic Array fields (the top-level struct
+      being level 1),
+    - max_objects : maximum number of decoded fields : the top-level struct, each field within
+      it (Switch fields count as their selected branch), the header of each Dynamic Array and
+      each of its elements,
+    - time_budget : maximum decoding time, in seconds.
+
+    An AbsLimitExceededError exception is raised as soon as one of the limits is exceeded. The
+    number of elements of a Dynamic Array is checked against its header, before decoding any of
+    them.
+
+>>> l_limits = AbsDecodeLimits(max_array_elements=1000)
+>>> AdvancedBinaryStructure('FFFFFFFFFFFFFFFF43414645', [
+...     [DYN_ARRAY, 'my-dyn-array', NB_ELTS, 64, AbsFieldAscii]
+... ], limits=l_limits).pprint()
+Traceback (most recent call last):
+...
+AbsLimitExceededError: max_array_elements (1000) exceeded : 18446744073709551615
 
-        if l_spec_type == SPEC_PLACEHOLDER:
-            return AbsFieldPlaceholder(spec, l_data, offset, context)
-        elif l_spec_type == SPEC_BOOLEAN:
-            return AbsFieldBoolean(spec, l_data, offset, context)
-        elif l_spec_type == SPEC_INTEGER:
-            return AbsFieldInteger(spec, l_data, offset, context)
-        elif l_spec_type == SPEC_HELPER_CLASS:
-            return AbsFactory._make_helper_class(spec, l_data, offset, context)
-        elif l_spec_type == SPEC_STRUCT:
-            return AbsFieldStruct(spec, l_data, offset, context)
-        elif l_spec_type == SPEC_SWITCH:
-            return AbsFactory._make_switch(spec, l_data, offset, context)
-        elif l_spec_type == SPEC_DYN_ARRAY:
-            return AbsFieldDynArray(spec, l_data, offset, context)
+>>> AdvancedBinaryStructure('43414645', [
+...     ('my-str', 32, AbsFieldAscii)
+... ], limits=AbsDecodeLimits(max_bits=16)).pprint()
+Traceback (most recent call last):
+...
+AbsLimitExceededError: max_bits (16) exceeded : 32
+
+>>> AdvancedBinaryStructure('CAFE', [
+...     ('my-struct', [
+...         ('my-struct', [
+...             ('my-int', 8)
+...         ])
+...     ])
+... ], limits=AbsDecodeLimits(max_depth=2)).pprint()
+Traceback (most recent call last):
+...
+AbsLimitExceededError: max_depth (2) exceeded : 3
+
+>>> AdvancedBinaryStructure('0443414645', [
+...     [DYN_ARRAY, 'my-dyn-array', NB_ELTS, 8, AbsFieldAscii]
+... ], limits=AbsDecodeLimits(max_objects=4)).pprint()
+Traceback (most recent call last):
+...
+AbsLimitExceededError: max_objects (4) exceeded : 5
+
+    The same limits apply to AbsFactory.decode_values, which counts the same objects even though
+    it does not build them (see the AbsValueDecoder module).
+
+    Within the limits, the decoding is unchanged :
+
+>>> AdvancedBinaryStructure('0443414645', [
+...     [DYN_ARRAY, 'my-dyn-array', NB_ELTS, 8, AbsFieldAscii]
+... ], limits=AbsDecodeLimits(max_bits=40, max_array_elements=4, max_depth=2,
+...                           max_objects=7, time_budget=1.0)).pprint()
+{'my-dyn-array': {'length': 4 elements (0x04),
+                  'data': [C (0x43), A (0x41), F (0x46), E (0x45)]}}
+    """
+    def __init__(self, max_bits=None, max_array_elements=None, max_depth=None, max_objects=None,
+                 time_budget=None):
+        self.max_bits = max_bits
+        self.max_array_elements = max_array_elements
+        self.max_depth = max_depth
+        self.max_objects = max_objects
+        self.time_budget = time_budget
+
+
+class AbsDecodeContext(dict):
+    """Context of a decoding, enforcing the given AbsDecodeLimits.
+
+    Like the plain dict contexts, it maps the ids of the tagged fields to their fields. The
+    child contexts (see child()) have their own tagged fields, but share the resources accounting
+    of their parent.
+    """
+    # Number of new objects between two checks of the time budget
+    TIME_CHECK_PERIOD = 64
+
+    def __init__(self, limits, parent=None):
+        super(AbsDecodeContext, self).__init__()
+        self.limits = limits
+        if parent is None:
+            # [number of objects, current depth], shared with the child contexts
+            self._counters = [0, 0]
+            if limits.time_budget is None:
+                self._deadline = None
+            else:
+                self._deadline = time.time() + limits.time_budget
         else:
-            raise AbsFieldSpecError
+            self._counters = parent._counters
+            self._deadline = parent._deadline
+
+    def child(self):
+        return AbsDecodeContext(self.limits, self)
+
+    @staticmethod
+    def _check(name, limit, value):
+        if limit is not None and value > limit:
+            raise AbsLimitExceededError('%s (%s) exceeded : %s' % (name, limit, value))
+
+    def check_input(self, nb_bits):
+        self._check('max_bits', self.limits.max_bits, nb_bits)
+
+    def check_array(self, nb_elements):
+        self._check('max_array_elements', self.limits.max_array_elements, nb_elements)
+
+    def new_object(self):
+        self._counters[0] += 1
+        self._check('max_objects', self.limits.max_objects, self._counters[0])
+        if self._deadline is not None and self._counters[0] % self.TIME_CHECK_PERIOD == 1:
+            if time.time() > self._deadline:
+                raise AbsLimitExceededError('time_budget (%s) exceeded' % self.limits.time_budget)
+
+    def enter(self):
+        self._counters[1] += 1
+        self._check('max_depth', self.limits.max_depth, self._counters[1])
+
+    def leave(self):
+        self._counters[1] -= 1
 
 
 class AbsError(Exception):
@@ -1170,6 +1943,16 @@ class AbsOutOfRangeError(AbsError):
     pass
 
 
+class AbsLimitExceededError(AbsDecodingError):
+    """Raised when decoding the data would exceed one of the decode limits (see AbsDecodeLimits)."""
+    pass
+
+
+class AbsCompactError(AbsError):
+    """Raised when a compact serialisation cannot be loaded."""
+    pass
+
+
 class AbsFieldMixin(object):
     """Mixin class used for defining AdvancedBinaryStructure Fields.
 
@@ -1186,7 +1969,14 @@ class AbsFieldMixin(object):
     - __init__ => must call _parse_args
     - __repr__
     - _decode_spec
-    - _decode_data
+    - _decode_data, or _read_data (see below)
+
+    The fields of a struct are decoded one after the other, from a single HexUtils.BitReader. The
+    built-in classes read their data from it directly, in _read_data. By default, _read_data
+    calls _decode_data with the data starting at the first byte of the field (and the offset of
+    the field within this byte), then moves the reader past the field.
+
+    The raw data is only extracted from the data when it is first requested.
     """
     def __init__(self):
         self._id = None
@@ -1195,24 +1985,76 @@ class AbsFieldMixin(object):
         self._is_tagged = False
         self._raw_data = None
 
+    @property
+    def _raw_data(self):
+        if self._raw_bits is None and self._raw_source is not None:
+            (l_data, l_offset) = self._raw_source
+            self._raw_bits = HexUtils.extract(l_data, l_offset, self._bit_width)
+            self._raw_source = None
+        return self._raw_bits
+
+    @_raw_data.setter
+    def _raw_data(self, raw_data):
+        self._raw_bits = raw_data
+        self._raw_source = None
+
     def __eq__(self, y):
         return self._value == y
 
     def __hash__(self):
         return hash(self._value)
 
+    @classmethod
+    def _from_value(cls, spec, value):
+        """Build a field of this class holding the already decoded VALUE, without any data.
+
+        The raw data is only rebuilt if it is requested (see _rebuild_raw_data).
+        """
+        l_field = cls.__new__(cls)
+        AbsFieldMixin.__init__(l_field)
+        l_field._decode_spec(spec)
+        l_field._value = value
+        return l_field
+
     def _parse_args(self, spec, data, offset=0, context=None):
         # TODO: decorator ?
         self._decode_spec(spec)
         if data is not None:
-            if offset >= 8:
+            if isinstance(data, HexUtils.BitReader):
+                # The reader is positioned on the first bit of the field : OFFSET is not used
+                l_reader = data
+            elif offset >= 8:
                 # TODO : fix that
                 # The caller must ensure that the provided data starts at the first useful byte.
                 # Consequently, the offset must not cross the first provided byte.
                 raise AbsDecodingError
-            self._decode_data(spec, data, offset, context)
+            else:
+                l_reader = HexUtils.BitReader(data, offset)
+            l_start = l_reader.position
+            if type(self)._reads_directly():
+                self._read_data(spec, l_reader, context)
+            else:
+                AbsFieldMixin._read_data(self, spec, l_reader, context)
             if self._bit_width > 0:
-                self._raw_data = HexUtils.extract(data, offset, self._bit_width)
+                self._raw_source = (l_reader.data, l_start)
+
+    @classmethod
+    def _reads_directly(cls):
+        """Tells whether the _read_data method of the class can be used : it must not have been
+        superseded by a _decode_data method defined in a subclass."""
+        l_result = AbsFieldMixin._reads_directly_cache.get(cls)
+        if l_result is None:
+            for l_class in cls.__mro__:
+                if '_read_data' in l_class.__dict__:
+                    l_result = True
+                    break
+                elif '_decode_data' in l_class.__dict__:
+                    l_result = False
+                    break
+            l_result = AbsFieldMixin._reads_directly_cache.setdefault(cls, l_result)
+        return l_result
+
+    _reads_directly_cache = {}
 
     def _decode_spec(self, spec):
         pass
@@ -1220,6 +2062,15 @@ class AbsFieldMixin(object):
     def _decode_data(self, spec, data, offset=0, context=None):
         pass
 
+    def _read_data(self, spec, reader, context=None):
+        (l_byte_addr, l_byte_offset) = HexUtils.to_bitwise_addr(reader.position)
+        self._decode_data(spec, reader.data[l_byte_addr:], l_byte_offset, context)
+        reader.skip(self._bit_width)
+
+    def _rebuild_raw_data(self):
+        """Rebuild the raw data of a field which has not been decoded from data."""
+        raise AbsDecodingError
+
     def id(self):
         return self._id
 
@@ -1232,7 +2083,14 @@ class AbsFieldMixin(object):
     def is_tagged(self):
         return self._is_tagged
 
+    def memory_footprint(self):
+        """Return the number of bytes held by the field and its subtree (see
+        AdvancedBinaryStructure.memory_footprint)."""
+        return _lazy_import('AbsMemory').footprint([self])
+
     def raw_data(self, as_hex=False):
+        if self._raw_data is None and self._bit_width > 0:
+            self._raw_data = self._rebuild_raw_data()
         if as_hex:
             return ''.join(['%02X' % b for b in self._raw_data])
         else:
@@ -1269,6 +2127,9 @@ class AbsFieldPlaceholder(AbsFieldHelperClass):
         else:
             raise AbsDecodingError
 
+    def _read_data(self, spec, reader, context=None):
+        pass
+
 
 class AbsFieldInteger(AbsFieldHelperClass):
     """Built-in helper class to represent a integer fields.
@@ -1295,24 +2156,46 @@ class AbsFieldInteger(AbsFieldHelperClass):
             self._is_tagged = False
 
     def _decode_data(self, spec, data, offset=0, context=None):
-        # Build a map of all the needed bits
-        # (ie. a list of tuple of (byte_idx, offset_within_byte))
-        l_bitmap = [HexUtils.to_bitwise_addr(l_addr)
-                    for l_addr in range(offset, offset + self._bit_width)]
-        # Turn this into a list of 0s and 1s corresponding to the value
-        # (ie. equivalent to applying a mask, but spanning multiple adjacent bytes)
-        l_value_bits = [(data[l_byte] & (2 ** (8 - l_bit - 1))) >> (8 - l_bit - 1)
-                        for (l_byte, l_bit) in l_bitmap]
-        # Finally, elevate each 1-bit to its power of 2, and sum them up to obtain the final
-        # field value
-        self._value = sum([2 ** (self._bit_width - i - 1)
-                           for (i, b) in enumerate(l_value_bits) if b == 1])
+        self._read_data(spec, HexUtils.BitReader(data, offset), context)
+
+    def _read_data(self, spec, reader, context=None):
+        self._value = reader.read_uint(self._bit_width)
+
+    def _rebuild_raw_data(self):
+        return HexUtils.uint_to_bits(self._value, self._bit_width)
 
     @staticmethod
     def is_valid_spec(spec):
         return 2 <= spec[1] <= PARAM_MAX_INTEGER_BIT_WIDTH
 
 
+class AbsFieldIntegerLE(AbsFieldInteger):
+    """Built-in helper class to represent little-endian integer fields (the bit width must be a
+    multiple of 8).
+
+>>> l_abs = AdvancedBinaryStructure('FECA', [
+...     ('my-int', 16, AbsFieldIntegerLE),
+... ])
+>>> l_abs.pprint()
+{'my-int': 51966 (0xCAFE)}
+>>> l_abs['decoded_data']['my-int'].raw_data(as_hex=True)
+'FECA'
+    """
+    def _decode_data(self, spec, data, offset=0, context=None):
+        self._read_data(spec, HexUtils.BitReader(data, offset), context)
+
+    def _read_data(self, spec, reader, context=None):
+        self._value = HexUtils.extract_uint(reader.read_bytes(self._bit_width // 8)[::-1], 0,
+                                            self._bit_width)
+
+    def _rebuild_raw_data(self):
+        return HexUtils.uint_to_bits(self._value, self._bit_width)[::-1]
+
+    @staticmethod
+    def is_valid_spec(spec):
+        return spec[1] % 8 == 0 and 8 <= spec[1] <= PARAM_MAX_INTEGER_BIT_WIDTH
+
+
 class AbsFieldBoolean(AbsFieldHelperClass):
     """Built-in helper class to represent boolean fields.
     """
@@ -1337,13 +2220,13 @@ class AbsFieldBoolean(AbsFieldHelperClass):
             self._is_tagged = False
 
     def _decode_data(self, spec, data, offset=0, context=None):
-        l_value = (data[0] & (1 << 8 - offset - 1)) >> (8 - offset - 1)
-        if l_value == 0:
-            self._value = False
-        elif l_value == 1:
-            self._value = True
-        else:
-            raise AbsDecodingError
+        self._read_data(spec, HexUtils.BitReader(data, offset), context)
+
+    def _read_data(self, spec, reader, context=None):
+        self._value = reader.read_bool()
+
+    def _rebuild_raw_data(self):
+        return HexUtils.uint_to_bits(int(self._value), self._bit_width)
 
     @staticmethod
     def is_valid_spec(spec):
@@ -1378,8 +2261,10 @@ class AbsFieldAscii(AbsFieldHelperClass):
             self._is_tagged = False
 
     def _decode_data(self, spec, data, offset=0, context=None):
-        l_data = HexUtils.extract(data, offset, self._bit_width)
-        self._value = ''.join(['{:c}'.format(i) for i in l_data])
+        self._read_data(spec, HexUtils.BitReader(data, offset), context)
+
+    def _read_data(self, spec, reader, context=None):
+        self._value = HexUtils.bytes_to_ascii(reader.read_bytes(self._bit_width // 8))
 
     @staticmethod
     def is_valid_spec(spec):
@@ -1410,8 +2295,10 @@ class AbsFieldRawData(AbsFieldHelperClass):
             self._is_tagged = False
 
     def _decode_data(self, spec, data, offset=0, context=None):
-        l_data = HexUtils.extract(data, offset, self._bit_width)
-        self._value = ''.join(['{:02X}'.format(i) for i in l_data])
+        self._read_data(spec, HexUtils.BitReader(data, offset), context)
+
+    def _read_data(self, spec, reader, context=None):
+        self._value = HexUtils.bytes_to_hex_str(reader.read_bits(self._bit_width))
 
     @staticmethod
     def is_valid_spec(spec):
@@ -1430,23 +2317,49 @@ class AbsFieldStruct(collections.OrderedDict, AbsFieldHelperClass):
         self._id = spec[0]
 
     def _decode_data(self, spec, data, offset=0, context=None):
+        self._read_data(spec, HexUtils.BitReader(data, offset), context)
+
+    def _read_data(self, spec, reader, context=None):
         if context is None:
             l_context = {}
         else:
             l_context = context
+        l_limited = isinstance(l_context, AbsDecodeContext)
+        if l_limited:
+            l_context.enter()
+
+        # All the fields are read from the same reader, one after the other
+        l_specs = spec[1]
+        l_layout = AbsFactory.struct_layout(l_specs)
+        l_start = reader.position
+        i = 0
+        while i < len(l_specs):
+            l_run = l_layout[i]
+            if l_run is not None and l_run.can_unpack(reader.data, reader.position):
+                # Byte-aligned run of integers : decode them all at once
+                l_children = l_run.make_fields(reader.data, reader.position)
+                reader.skip(l_run.bit_width)
+                if l_limited:
+                    for _ in l_children:
+                        l_context.new_object()
+            else:
+                l_children = [AbsFactory.make(l_specs[i], reader, 0, l_context)]
+            for l_child in l_children:
+                self[l_child.id()] = l_child
+                if l_child.is_tagged():
+                    if l_child.id() in l_context:
+                        raise AbsDecodingError
+                    else:
+                        l_context[l_child.id()] = l_child
+            i += len(l_children)
+        self._bit_width = reader.position - l_start
 
-        l_offset = offset
-        for l_spec in spec[1]:
-            (l_byte_addr, l_byte_offset) = HexUtils.to_bitwise_addr(l_offset)
-            l_child = AbsFactory.make(l_spec, data[l_byte_addr:], l_byte_offset, l_context)
-            self[l_child.id()] = l_child
-            if l_child.is_tagged():
-                if l_child.id() in l_context:
-                    raise AbsDecodingError
-                else:
-                    l_context[l_child.id()] = l_child
-            l_offset += l_child.bit_width()
-        self._bit_width = l_offset - offset
+        if l_limited:
+            l_context.leave()
+
+    def _rebuild_raw_data(self):
+        return HexUtils.concat_bits([(l_child.raw_data(), l_child.bit_width())
+                                     for l_child in self.values() if l_child.bit_width() > 0])
 
 
 class AbsFieldDynArray(collections.OrderedDict, AbsFieldHelperClass):
@@ -1455,7 +2368,6 @@ class AbsFieldDynArray(collections.OrderedDict, AbsFieldHelperClass):
     class LengthField(AbsFieldInteger):
         def __init__(self, spec, data=None, offset=0, context=None):
             super(AbsFieldDynArray.LengthField, self).__init__(spec, data, offset, context)
-            self._parse_args(spec, data, offset, context)
 
         def __repr__(self):
             return '{value:d} elements (0x{value:0{width}X}){tagged:s}' \
@@ -1466,7 +2378,6 @@ class AbsFieldDynArray(collections.OrderedDict, AbsFieldHelperClass):
     class SizeField(AbsFieldInteger):
         def __init__(self, spec, data=None, offset=0, context=None):
             super(AbsFieldDynArray.SizeField, self).__init__(spec, data, offset, context)
-            self._parse_args(spec, data, offset, context)
             self._unit = 0
             self._excl = False
 
@@ -1508,73 +2419,95 @@ class AbsFieldDynArray(collections.OrderedDict, AbsFieldHelperClass):
         self._id = spec[1]
         self._header_type = spec[2]
         self._header_bitwidth = spec[3]
+        self._child_spec = AbsFieldDynArray.child_spec(spec)
+
+    @staticmethod
+    def child_spec(spec):
+        """Return the field spec of each element of the Dynamic Array field SPEC."""
         if len(spec) == 5:
             if type(spec[4]) == list:
-                self._child_spec = ('child', spec[4])
+                return 'child', spec[4]
             elif issubclass(spec[4], AbsFieldHelperClass):
-                self._child_spec = ('child', spec[3], spec[4])
+                return 'child', spec[3], spec[4]
             else:
                 raise AbsDecodingError
         else:
-            self._child_spec = ('child', spec[3])
+            return 'child', spec[3]
 
     def _decode_data(self, spec, data, offset=0, context=None):
+        self._read_data(spec, HexUtils.BitReader(data, offset), context)
+
+    def _read_data(self, spec, reader, context=None):
         if context is None:
             l_context = {}
         else:
             l_context = context
 
-            # First decode the header
-        l_offset = offset
-        (l_byte_addr, l_byte_offset) = HexUtils.to_bitwise_addr(l_offset)
+        # First decode the header
+        l_start = reader.position
+        l_header = self._make_header(reader, l_context)
+        self[l_header.id()] = l_header
+
+        # Each element gets its own context : the tagged fields of an element are not visible
+        # from the other ones
+        l_limited = isinstance(l_context, AbsDecodeContext)
+        if l_limited:
+            l_context.enter()
+
+        self['data'] = []
+        if self._header_type == NB_ELTS:
+            # The number of elements comes from the data : don't trust it to build a range
+            if l_limited:
+                l_context.check_array(l_header.value())
+            while len(self['data']) < l_header.value():
+                self['data'].append(AbsFactory.make(self._child_spec, reader, 0,
+                                                    l_context.child() if l_limited else None))
+        else:
+            l_end = self._end_position(l_start, l_header)
+            while reader.position < l_end:
+                if l_limited:
+                    l_context.check_array(len(self['data']) + 1)
+                self['data'].append(AbsFactory.make(self._child_spec, reader, 0,
+                                                    l_context.child() if l_limited else None))
+
+        if l_limited:
+            l_context.leave()
+        self._bit_width = reader.position - l_start
+
+    def _make_header(self, reader, context=None):
+        """Read the header field from READER."""
         if self._header_type == SIZE_EXCL:
             l_header = AbsFactory.make(('size', self._header_bitwidth, AbsFieldDynArray.SizeField),
-                                       data[l_byte_addr:],
-                                       l_byte_offset,
-                                       l_context)
+                                       reader, 0, context)
             l_header.set_unit_excl(self._header_bitwidth, True)
 
         elif self._header_type == SIZE_INCL:
             l_header = AbsFactory.make(('size', self._header_bitwidth, AbsFieldDynArray.SizeField),
-                                       data[l_byte_addr:],
-                                       l_byte_offset,
-                                       l_context)
+                                       reader, 0, context)
             l_header.set_unit_excl(self._header_bitwidth, False)
 
         elif self._header_type == NB_ELTS:
             l_header = AbsFactory.make(('length', self._header_bitwidth,
                                         AbsFieldDynArray.LengthField),
-                                       data[l_byte_addr:],
-                                       l_byte_offset,
-                                       l_context)
+                                       reader, 0, context)
         else:
             raise AbsDecodingError
-        self[l_header.id()] = l_header
-        l_offset += l_header.bit_width()
-
-        self['data'] = []
-        if self._header_type == NB_ELTS:
-            for i in range(l_header.value()):
-                (l_byte_addr, l_byte_offset) = HexUtils.to_bitwise_addr(l_offset)
-                self['data'].append(AbsFactory.make(self._child_spec,
-                                                    data[l_byte_addr:],
-                                                    l_byte_offset))
-                l_offset += self['data'][-1].bit_width()
+        return l_header
+
+    def _end_position(self, start, header):
+        """Return the position of the end of the elements of a SIZE_INCL or SIZE_EXCL array
+        starting at position START, given its HEADER field."""
+        if self._header_type == SIZE_INCL:
+            return start + header.value() * header.bit_width()
+        elif self._header_type == SIZE_EXCL:
+            return start + (header.value() + 1) * header.bit_width()
         else:
-            if self._header_type == SIZE_INCL:
-                l_end_offset = offset + l_header.value() * l_header.bit_width()
-            elif self._header_type == SIZE_EXCL:
-                l_end_offset = offset + (l_header.value() + 1) * l_header.bit_width()
-            else:
-                raise AbsDecodingError
-            while l_offset < l_end_offset:
-                (l_byte_addr, l_byte_offset) = HexUtils.to_bitwise_addr(l_offset)
-                self['data'].append(AbsFactory.make(self._child_spec,
-                                                    data[l_byte_addr:],
-                                                    l_byte_offset))
-                l_offset += self['data'][-1].bit_width()
-
-        self._bit_width = l_offset - offset
+            raise AbsDecodingError
+
+    def _rebuild_raw_data(self):
+        l_fields = [self[l_key] for l_key in self if l_key != 'data'] + self['data']
+        return HexUtils.concat_bits([(l_field.raw_data(), l_field.bit_width())
+                                     for l_field in l_fields if l_field.bit_width() > 0])
 
 
 if __name__ == "__main__":
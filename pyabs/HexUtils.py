@@ -19,7 +19,11 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import array
+import binascii
 import itertools
+import struct
+import sys
 
 
 class HexUtilsError(Exception):
@@ -59,13 +63,130 @@ HexUtilsInputSizeError
 >>> hex_str_to_u8('CAF')
 Traceback (most recent call last):
 ...
+HexUtilsInputSizeError
+    """
+    return _hex_str_to_list(hex_str, 8)
+
+
+def hex_str_to_bytes(hex_str):
+    """Converts an hexadecimal string into the corresponding bytes.
+    Unlike hex_str_to_u8, the conversion is done natively, and the result is a bytes object (a
+    bytearray on python 2) rather than a list.
+
+Usage :
+
+>>> list(hex_str_to_bytes('CAFE')) == [0xca, 0xfe]
+True
+
+>>> hex_str_to_bytes('CAF')
+Traceback (most recent call last):
+...
 HexUtilsInputSizeError
     """
     if len(hex_str) % 2 != 0:
         raise HexUtilsInputSizeError
     else:
-        return [int(hex_str[i:i + 2], 16)
-                for i in range(0, len(hex_str), 2)]
+        return _hex_str_to_bytes(hex_str)
+
+
+def bytes_to_hex_str(data):
+    """Converts a list of bytes into the corresponding (upper case) hexadecimal string.
+
+Usage :
+
+>>> bytes_to_hex_str([0xca, 0xfe]) == 'CAFE'
+True
+
+>>> bytes_to_hex_str(hex_str_to_bytes('DECA')) == 'DECA'
+True
+    """
+    return _bytes_to_hex_str(data)
+
+
+def bytes_to_ascii(data):
+    """Converts a list of bytes into the string holding the corresponding characters (latin-1).
+
+Usage :
+
+>>> bytes_to_ascii([0x43, 0x41, 0x46, 0x45]) == 'CAFE'
+True
+    """
+    return _bytes_to_ascii(data)
+
+
+def byte_view(data):
+    """Returns a view on DATA (a list of bytes) which can be sliced without copying the bytes.
+    On python 3, this is a memoryview. On python 2, indexing a memoryview returns characters rather
+    than integers, so the data is returned as is.
+
+Usage :
+
+>>> l_view = byte_view(hex_str_to_bytes('CAFEDECA'))
+>>> [hex(b) for b in l_view[1:3]]
+['0xfe', '0xde']
+>>> byte_view(l_view) is l_view
+True
+    """
+    return _byte_view(data)
+
+
+# The native primitives differ between python 2 and python 3 : pick them once and for all
+if sys.version_info[0] >= 3:
+    _hex_str_to_bytes = bytes.fromhex
+
+    def _bytes_to_hex_str(data):
+        return bytes(data).hex().upper()
+
+    def _bytes_to_ascii(data):
+        return bytes(data).decode('latin-1')
+
+    def _byte_view(data):
+        if type(data) == memoryview:
+            return data
+        elif type(data) in (bytes, bytearray):
+            return memoryview(data)
+        else:
+            return memoryview(bytearray(data))
+
+    def _bytes_to_uint(data):
+        return int.from_bytes(data, 'big')
+
+    def _bytes_equal(data_a, data_b):
+        return data_a == data_b
+
+    def _uint_to_bytes(value, nb_bytes):
+        return bytearray(value.to_bytes(nb_bytes, 'big'))
+else:
+    def _hex_str_to_bytes(hex_str):
+        try:
+            return bytearray(binascii.unhexlify(hex_str))
+        except TypeError as l_error:
+            # Non-hexadecimal digits : raise a ValueError, as bytes.fromhex does
+            raise ValueError(str(l_error))
+
+    def _bytes_to_hex_str(data):
+        return binascii.hexlify(bytearray(data)).upper()
+
+    def _bytes_to_ascii(data):
+        return str(bytearray(data))
+
+    def _byte_view(data):
+        return data
+
+    def _bytes_to_uint(data):
+        return int(binascii.hexlify(bytearray(data)) or '0', 16)
+
+    def _bytes_equal(data_a, data_b):
+        if type(data_a) == type(data_b):
+            return data_a == data_b
+        else:
+            # A bytearray is never equal to a list
+            return bytearray(data_a) == bytearray(data_b)
+
+    def _uint_to_bytes(value, nb_bytes):
+        if nb_bytes == 0:
+            return bytearray()
+        return bytearray(binascii.unhexlify('%0*x' % (nb_bytes * 2, value)))
 
 
 def hex_str_to_u16(hex_str):
@@ -92,11 +213,7 @@ Traceback (most recent call last):
 ...
 HexUtilsInputSizeError
     """
-    if len(hex_str) % 4 != 0:
-        raise HexUtilsInputSizeError
-    else:
-        return [int(hex_str[i:i + 4], 16)
-                for i in range(0, len(hex_str), 4)]
+    return _hex_str_to_list(hex_str, 16)
 
 
 def hex_str_to_u32(hex_str):
@@ -123,11 +240,7 @@ Traceback (most recent call last):
 ...
 HexUtilsInputSizeError
     """
-    if len(hex_str) % 8 != 0:
-        raise HexUtilsInputSizeError
-    else:
-        return [int(hex_str[i:i + 8], 16)
-                for i in range(0, len(hex_str), 8)]
+    return _hex_str_to_list(hex_str, 32)
 
 
 def hex_str_to_u64(hex_str):
@@ -154,11 +267,77 @@ Traceback (most recent call last):
 ...
 HexUtilsInputSizeError
     """
-    if len(hex_str) % 16 != 0:
+    return _hex_str_to_list(hex_str, 64)
+
+
+def hex_str_to_array(hex_str, width=8, little_endian=False):
+    """Converts an hexadecimal string into an array.array of the corresponding WIDTH-bits unsigned
+    integers (WIDTH being 8, 16, 32 or 64). The words are big-endian, unless LITTLE_ENDIAN.
+
+    The conversion is done in bulk, natively : unlike hex_str_to_u8 and its siblings, no python int
+    is created for each word, and the array stores them compactly.
+
+Usage :
+
+>>> [hex(w) for w in hex_str_to_array('CAFEDECA', 16)]
+['0xcafe', '0xdeca']
+
+>>> [hex(w) for w in hex_str_to_array('CAFEDECA', 16, little_endian=True)]
+['0xfeca', '0xcade']
+
+>>> hex_str_to_array('CAFEDECADEADBEEF', 64).tolist() == [0xcafedecadeadbeef]
+True
+
+>>> hex_str_to_array('CAFEDE', 16)
+Traceback (most recent call last):
+...
+HexUtilsInputSizeError
+
+>>> hex_str_to_array('CAFE', 12)
+Traceback (most recent call last):
+...
+HexUtilsParamError
+    """
+    if width not in _ARRAY_TYPECODES:
+        raise HexUtilsParamError
+    if len(hex_str) % (width // 4) != 0:
         raise HexUtilsInputSizeError
-    else:
-        return [int(hex_str[i:i + 16], 16)
-                for i in range(0, len(hex_str), 16)]
+    l_words = array.array(_ARRAY_TYPECODES[width])
+    _array_from_bytes(l_words, _unhexlify(hex_str))
+    if width > 8 and little_endian != _NATIVE_LITTLE_ENDIAN:
+        l_words.byteswap()
+    return l_words
+
+
+def _unhexlify(hex_str):
+    try:
+        return binascii.unhexlify(hex_str)
+    except TypeError:
+        # Python 2 : non-hexadecimal digits
+        raise ValueError(hex_str)
+
+
+def _hex_str_to_list(hex_str, width):
+    if width in _ARRAY_TYPECODES:
+        return hex_str_to_array(hex_str, width).tolist()
+    # No array type for 64-bits words (on some python 2 platforms)
+    if len(hex_str) % (width // 4) != 0:
+        raise HexUtilsInputSizeError
+    return list(struct.unpack('>%dQ' % (len(hex_str) // 16), _unhexlify(hex_str)))
+
+
+# The array typecodes of the unsigned integers of each width (the size of the C types varies)
+_ARRAY_TYPECODES = {}
+for _typecode in 'BHILQ':
+    try:
+        _ARRAY_TYPECODES.setdefault(array.array(_typecode).itemsize * 8, _typecode)
+    except ValueError:
+        # 'Q' is not supported on python 2
+        pass
+del _typecode
+_NATIVE_LITTLE_ENDIAN = (sys.byteorder == 'little')
+_array_from_bytes = array.array.frombytes if hasattr(array.array, 'frombytes') else \
+    array.array.fromstring
 
 # TODO: to_byte_addr renamed to_bitwise_addr
 def to_bitwise_addr(offset):
@@ -395,21 +574,214 @@ Example :
 ...  for (l_offset, l_width) in l_tests]
 [['0xca'], ['0x57'], ['0xfe'], ['0xfb'], ['0xca', '0xf8'], ['0x57', '0xf0'], ['0xfe', '0xd8'], ['0xfb', '0x78']]
     """
-    # First compute the range so as to narrow the data down to what's useful
-    (l_start_byte, l_start_offset) = to_bitwise_addr(offset)
-    l_end_byte = to_bitwise_addr(offset + width - 1)[0]
+    # Rather than left-shifting the bytes one by one (see cross_byte_left_shift), the bits are
+    # turned into a single integer and back, which is done natively
+    return uint_to_bits(extract_uint(data, offset, width), width)
 
-    # If there is enough data, left-shift the required subset
-    if l_end_byte < len(data):
-        l_shifted_data = cross_byte_left_shift(data[l_start_byte:l_end_byte + 1], l_start_offset)
-    else:
+
+def extract_uint(data, offset, width):
+    """Extract WIDTH bits of DATA (a list of bytes), starting at OFFSET, as an unsigned integer.
+
+Example :
+>>> l_data = [0xCA, 0xFE, 0xDE, 0xCA] # 11001010111111101101111011001010
+>>> [hex(extract_uint(l_data, l_offset, l_width))
+...  for (l_offset, l_width) in [(0, 8), (3, 8), (10, 13), (0, 32), (31, 1)]]
+['0xca', '0x57', '0x1f6f', '0xcafedeca', '0x0']
+
+>>> extract_uint(l_data, 30, 3)
+Traceback (most recent call last):
+...
+HexUtilsInputSizeError
+    """
+    l_start_byte = offset // 8
+    l_end_byte = (offset + width + 7) // 8
+    if l_end_byte > len(data):
+        raise HexUtilsInputSizeError
+    l_value = _bytes_to_uint(data[l_start_byte:l_end_byte])
+    return (l_value >> (l_end_byte * 8 - offset - width)) & ((1 << width) - 1)
+
+
+def bits_equal(data_a, offset_a, data_b, offset_b, width):
+    """Tells whether the WIDTH bits of DATA_A starting at OFFSET_A are the same as the WIDTH bits of
+    DATA_B starting at OFFSET_B (DATA_A and DATA_B being lists of bytes).
+
+    When both ranges start at the same bit offset within a byte, their whole bytes are compared
+    natively, without building any integer : give views on the data (see byte_view) so that they are
+    not copied either.
+
+Example :
+>>> l_data = [0xCA, 0xFE, 0xDE, 0xCA] # 11001010111111101101111011001010
+>>> bits_equal(l_data, 0, [0xCA, 0xFE, 0xDE, 0xCB], 0, 31)
+True
+>>> bits_equal(l_data, 0, [0xCA, 0xFE, 0xDE, 0xCB], 0, 32)
+False
+>>> bits_equal(l_data, 4, [0x0A, 0xFE, 0xDE, 0xC0], 4, 24)
+True
+>>> bits_equal(l_data, 8, [0x7F], 1, 7)
+True
+>>> bits_equal(l_data, 8, [0x7F], 1, 8)
+Traceback (most recent call last):
+...
+HexUtilsInputSizeError
+    """
+    if (offset_a - offset_b) % 8 != 0 or width <= 64:
+        return extract_uint(data_a, offset_a, width) == extract_uint(data_b, offset_b, width)
+    if (offset_a + width + 7) // 8 > len(data_a) or (offset_b + width + 7) // 8 > len(data_b):
         raise HexUtilsInputSizeError
+    # Partial first byte, whole bytes, partial last byte
+    l_head = (-offset_a) % 8
+    l_start_a = (offset_a + l_head) // 8
+    l_start_b = (offset_b + l_head) // 8
+    l_nb_bytes = (width - l_head) // 8
+    l_tail = width - l_head - l_nb_bytes * 8
+    return (extract_uint(data_a, offset_a, l_head) == extract_uint(data_b, offset_b, l_head) and
+            extract_uint(data_a, offset_a + width - l_tail, l_tail) ==
+            extract_uint(data_b, offset_b + width - l_tail, l_tail) and
+            _bytes_equal(_byte_view(data_a)[l_start_a:l_start_a + l_nb_bytes],
+                         _byte_view(data_b)[l_start_b:l_start_b + l_nb_bytes]))
+
+
+def uint_to_bits(value, width):
+    """Converts the unsigned integer VALUE into a list of bytes containing its WIDTH bits.
+    This is the reverse operation of extracting an integer : the most significant bit of the value
+    ends up as the first bit of the returned list of bytes, and the last byte is right-padded with
+    0-bits if WIDTH is not a multiple of 8.
+
+Example :
+>>> [hex(b) for b in uint_to_bits(0x6, 3)]
+['0xc0']
+>>> [hex(b) for b in uint_to_bits(0xCAFE, 16)]
+['0xca', '0xfe']
+>>> [hex(b) for b in uint_to_bits(0x1FFF, 13)]
+['0xff', '0xf8']
+    """
+    l_nb_bytes = (width + 7) // 8
+    return _uint_to_bytes(value << (l_nb_bytes * 8 - width), l_nb_bytes)
+
+
+def concat_bits(chunks):
+    """Concatenates bit strings.
+    CHUNKS is a list of (data, width) tuples, where DATA is a list of bytes holding WIDTH bits (as
+    returned by extract). Returns a list of bytes holding all the bits, one chunk after the other,
+    right-padded with 0-bits if the total width is not a multiple of 8.
+
+Example :
+>>> [hex(b) for b in concat_bits([])]
+[]
+>>> [hex(b) for b in concat_bits([([0xC0], 3), ([0xD0], 5)])]
+['0xda']
+>>> [hex(b) for b in concat_bits([([0xC0], 3), ([0xCA, 0xFE], 16), ([0x80], 1)])]
+['0xd9', '0x5f', '0xd0']
+    """
+    l_result = bytearray()
+    l_pending = 0
+    l_nb_pending_bits = 0
+    for (l_data, l_width) in chunks:
+        (l_nb_full_bytes, l_nb_extra_bits) = to_bitwise_addr(l_width)
+        for i in range(l_nb_full_bytes):
+            l_pending = (l_pending << 8) | l_data[i]
+            l_result.append((l_pending >> l_nb_pending_bits) & 0xFF)
+            l_pending &= (1 << l_nb_pending_bits) - 1
+        if l_nb_extra_bits > 0:
+            l_pending = (l_pending << l_nb_extra_bits) | \
+                (l_data[l_nb_full_bytes] >> (8 - l_nb_extra_bits))
+            l_nb_pending_bits += l_nb_extra_bits
+            if l_nb_pending_bits >= 8:
+                l_nb_pending_bits -= 8
+                l_result.append((l_pending >> l_nb_pending_bits) & 0xFF)
+                l_pending &= (1 << l_nb_pending_bits) - 1
+    if l_nb_pending_bits > 0:
+        l_result.append((l_pending << (8 - l_nb_pending_bits)) & 0xFF)
+    return l_result
 
-    # Get rid of the useless last bytes, if any
-    (l_last_byte, l_last_bit) = to_bitwise_addr(width - 1)
-    l_shifted_data[l_last_byte] &= (~(0xFF >> (l_last_bit + 1)) & 0xFF)
 
-    return bytearray(l_shifted_data[0:l_last_byte+1])
+class BitReader(object):
+    """Sequential reader of the bits of DATA (a list of bytes), starting at bit POSITION.
+
+    Fields are usually read one after the other : rather than computing the bitwise address of
+    each of them and extracting it from the data, the reader keeps a window of (at least)
+    WINDOW_BITS bits, as a single integer, and only refills it when a read goes past its end.
+
+Example :
+>>> l_reader = BitReader(hex_str_to_bytes('CAFEDECA'))  # 11001010111111101101111011001010
+>>> l_reader.read_uint(3), l_reader.read_bool(), l_reader.read_bool()
+(6, False, True)
+>>> hex(l_reader.peek(11)), l_reader.position
+('0x2fe', 5)
+>>> l_reader.skip(3)
+>>> [hex(b) for b in l_reader.read_bytes(2)]
+['0xfe', '0xde']
+>>> [hex(b) for b in l_reader.read_bits(5)]
+['0xc8']
+>>> l_reader.position, l_reader.remaining()
+(29, 3)
+>>> l_reader.read_uint(4)
+Traceback (most recent call last):
+...
+HexUtilsInputSizeError
+    """
+    WINDOW_BITS = 256
+
+    def __init__(self, data, position=0):
+        self.data = byte_view(data)
+        self.position = position
+        self._nb_bits = len(self.data) * 8
+        # The window holds the bits from _window_start (included) to _window_end (excluded)
+        self._window = 0
+        self._window_start = 0
+        self._window_end = 0
+
+    def remaining(self):
+        """Return the number of bits left after the current position."""
+        return self._nb_bits - self.position
+
+    def peek(self, nb_bits):
+        """Return the unsigned integer made of the next NB_BITS bits, without moving forward."""
+        l_end = self.position + nb_bits
+        if l_end > self._window_end or self.position < self._window_start:
+            self._fill(nb_bits)
+        # int() turns back the (python 2) long window into a plain int, when it fits
+        return int((self._window >> (self._window_end - l_end)) & ((1 << nb_bits) - 1))
+
+    def read_uint(self, nb_bits):
+        """Read the next NB_BITS bits as an unsigned integer."""
+        l_value = self.peek(nb_bits)
+        self.position += nb_bits
+        return l_value
+
+    def read_bool(self):
+        """Read the next bit as a boolean."""
+        return self.read_uint(1) == 1
+
+    def read_bits(self, nb_bits):
+        """Read the next NB_BITS bits as a list of bytes, right-padded with 0-bits (see extract)."""
+        if nb_bits > self.WINDOW_BITS:
+            # Don't drag a huge integer around in the window
+            l_bits = extract(self.data, self.position, nb_bits)
+            self.position += nb_bits
+            return l_bits
+        else:
+            return uint_to_bits(self.read_uint(nb_bits), nb_bits)
+
+    def read_bytes(self, nb_bytes):
+        """Read the next NB_BYTES bytes (which need not be byte-aligned)."""
+        return self.read_bits(nb_bytes * 8)
+
+    def skip(self, nb_bits):
+        """Move forward by NB_BITS bits."""
+        if self.position + nb_bits > self._nb_bits:
+            raise HexUtilsInputSizeError
+        self.position += nb_bits
+
+    def _fill(self, nb_bits):
+        l_end = self.position + nb_bits
+        if l_end > self._nb_bits:
+            raise HexUtilsInputSizeError
+        l_start_byte = self.position // 8
+        l_end_byte = min((max(l_end, self.position + self.WINDOW_BITS) + 7) // 8, len(self.data))
+        self._window = _bytes_to_uint(self.data[l_start_byte:l_end_byte])
+        self._window_start = l_start_byte * 8
+        self._window_end = l_end_byte * 8
 
 
 if __name__ == "__main__":
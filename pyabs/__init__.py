@@ -1,2 +1,15 @@
 ﻿# -*- coding: utf-8-unix -*-
 __author__ = 'pef'
+
+# Only the decoding engine is loaded by 'import pyabs' : the pretty-printer, the compact
+# serialisation, the plain values decoder and the exporters are loaded on first use.
+# The AdvancedBinaryStructure class itself is not exported : pyabs.AdvancedBinaryStructure is the
+# module.
+from .AdvancedBinaryStructure import (
+    TAGGED, SWITCH, DYN_ARRAY, SIZE_EXCL, SIZE_INCL, NB_ELTS, DEFAULT, FILTERED,
+    AbsFactory, AbsSwitchTable, AbsDecodeLimits,
+    AbsError, AbsFieldSpecError, AbsDecodingError, AbsOutOfRangeError, AbsLimitExceededError,
+    AbsCompactError,
+    AbsFieldMixin, AbsFieldHelperClass, AbsFieldPlaceholder, AbsFieldInteger, AbsFieldIntegerLE,
+    AbsFieldBoolean, AbsFieldAscii, AbsFieldRawData, AbsFieldStruct, AbsFieldDynArray,
+)
@@ -0,0 +1,10 @@
+﻿# -*- coding: utf-8-unix -*-
+"""
+Command-line bulk decoder : python -m pyabs SPEC [FILE ...] [options] (see the AbsCli module).
+"""
+import sys
+
+from pyabs.AbsCli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
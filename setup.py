@@ -3,12 +3,18 @@ from distutils.core import setup
 setup(
     name='PyABS',
     version='0.79',
-    packages=['pyabs', 'backports'],
+    packages=['pyabs'],
+    scripts=['scripts/pyabs'],
     url='https://github.com/pefgomez/PyABS',
     license='MIT',
     author='Pierre-François Gomez',
     author_email='pef.gomez@gmail.com',
     description='Python Advanced Binary Structure',
     long_description='A library to easily decode any kind of binary data',
-    download_url=''
+    download_url='',
+    classifiers=[
+        'License :: OSI Approved :: MIT License',
+        'Programming Language :: Python :: 2.7',
+        'Programming Language :: Python :: 3',
+    ]
 )